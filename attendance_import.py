@@ -0,0 +1,303 @@
+import csv
+import logging
+import re
+from datetime import date
+from itertools import islice
+from search import vn_fold
+from utils import format_currency
+
+# Nhập điểm danh hàng loạt từ file CSV (bảng điểm danh giữ trên bảng tính).
+# File có dòng tiêu đề với các cột learner, date, attended và salary (tùy chọn):
+# - learner: mã hoặc tên người học (không phân biệt dấu nếu tên không trùng)
+# - date: YYYY-MM-DD hoặc DD/MM/YYYY
+# - attended: 1/0, x, có/không, true/false, ...
+# - salary: lương của buổi; để trống thì giữ lương hiện có của ngày, hoặc lương mặc định của bảng lương
+#   (lương cao nhất, tính cả lương trong file) nếu buổi được điểm danh mà ngày chưa có lương. Dòng điểm danh
+#   để trống lương của bảng lương chưa có lương nào bị coi là không hợp lệ (không ghi buổi phí 0).
+#   Lương trong file chỉ được tính từ đầu file đến hết lô đang xử lý (CHUNK_ROWS dòng): trong một lô thứ tự dòng
+#   không quan trọng, nhưng dòng có lương nằm ở lô sau không làm mặc định cho dòng để trống lương ở lô trước.
+#   Hãy đặt dòng có lương của mỗi bảng lương trước hoặc gần các dòng để trống lương của bảng lương đó.
+# File được đọc theo từng lô CHUNK_ROWS dòng nên bộ nhớ không phụ thuộc kích thước file; mỗi lô được ghi
+# trong một giao dịch (Database.import_days) và tóm tắt được tính lại một lần cho mỗi bảng lương sau lô cuối
+# (Database.refresh_summaries; bị ngắt giữa chừng thì được tính lại khi khởi động, xem Database.repair_summaries).
+# Chế độ chạy thử chỉ so sánh với dữ liệu hiện có và báo cáo.
+
+CHUNK_ROWS = 50000
+
+# Số dòng lỗi và thay đổi được liệt kê chi tiết trong báo cáo
+REPORT_LIMIT = 20
+
+REQUIRED_COLUMNS = ("learner", "date", "attended")
+
+# Lương có dấu phân cách hàng nghìn như bảng tính xuất ra: 150.000 hoặc 150,000
+THOUSANDS = re.compile(r"\d{1,3}([.,]\d{3})+")
+
+ATTENDED_VALUES = {
+    "1": 1, "x": 1, "true": 1, "yes": 1, "y": 1, "có": 1, "co": 1,
+    "0": 0, "": 0, "false": 0, "no": 0, "n": 0, "không": 0, "khong": 0,
+}
+
+class ImportReport:
+    """Kết quả nhập (hoặc chạy thử): số dòng theo từng loại, các dòng lỗi và các thay đổi tiêu biểu."""
+
+    def __init__(self, username, dry_run):
+        self.username = username
+        self.dry_run = dry_run
+        self.rows = 0
+        self.imported = 0
+        self.invalid = 0
+        self.unknown_learners = {}
+        self.sheets_created = 0
+        self.checked = 0
+        self.unchecked = 0
+        self.salary_changed = 0
+        self.unchanged = 0
+        self.changed = 0
+        self.errors = []
+        self.changes = []
+        self.failed = False
+
+    def error(self, line, message):
+        """Ghi nhận một dòng không hợp lệ."""
+        self.invalid += 1
+        if len(self.errors) < REPORT_LIMIT:
+            self.errors.append(f"Dòng {line}: {message}")
+
+    @property
+    def ok(self):
+        """Không có lỗi ghi cơ sở dữ liệu và mọi dòng đều hợp lệ."""
+        return not self.failed and not self.invalid and not self.unknown_learners
+
+    def lines(self):
+        """Báo cáo dạng văn bản, mỗi phần tử một dòng."""
+        title = "Chạy thử (không ghi dữ liệu)" if self.dry_run else "Nhập điểm danh"
+        lines = [f"{title} cho {self.username}: {self.rows} dòng"]
+        if self.dry_run:
+            lines.append(f"  Bảng lương sẽ tạo: {self.sheets_created}")
+            lines.append(f"  Điểm danh thêm: {self.checked}, bỏ điểm danh: {self.unchecked}, "
+                         f"đổi lương: {self.salary_changed}, không đổi: {self.unchanged}")
+        else:
+            lines.append(f"  Đã ghi: {self.imported} dòng, tạo {self.sheets_created} bảng lương")
+        if self.invalid:
+            lines.append(f"  Dòng không hợp lệ: {self.invalid}")
+        if self.unknown_learners:
+            lines.append("  Không tìm thấy người học: " + ", ".join(
+                f"{name} ({count} dòng)" for name, count in list(self.unknown_learners.items())[:REPORT_LIMIT]))
+        if self.failed:
+            lines.append("  Lỗi khi ghi cơ sở dữ liệu, các dòng còn lại không được nhập (xem logs/app.log).")
+        lines += [f"  {line}" for line in self.errors]
+        if self.changes:
+            lines.append("  Thay đổi:")
+            lines += [f"    {change}" for change in self.changes]
+            more = self.changed - len(self.changes)
+            if more > 0:
+                lines.append(f"    ... và {more} thay đổi khác")
+        return lines
+
+class LearnerLookup:
+    """Tra cứu người học của một người dùng theo mã hoặc tên, đọc danh sách một lần và nhớ kết quả."""
+
+    def __init__(self, db, username):
+        self.by_key = {}
+        self.names = {}
+        folded = {}
+        for learner_id, name in db.get_learners(username):
+            self.names[learner_id] = name
+            self.by_key[str(learner_id)] = learner_id
+            self.by_key.setdefault(name, learner_id)
+            folded.setdefault(vn_fold(name), []).append(learner_id)
+        # Tên không dấu chỉ dùng khi không trùng với người học khác
+        self.by_folded = {key: ids[0] for key, ids in folded.items() if len(ids) == 1}
+
+    def get(self, learner):
+        """learner_id của người học (mã hoặc tên), hoặc None nếu không tìm thấy."""
+        learner_id = self.by_key.get(learner)
+        if learner_id is None and learner not in self.by_key:
+            learner_id = self.by_folded.get(vn_fold(learner.strip()))
+            self.by_key[learner] = learner_id
+        return learner_id
+
+class DateParser:
+    """Đọc ngày YYYY-MM-DD hoặc DD/MM/YYYY, nhớ kết quả vì file điểm danh lặp lại cùng các ngày."""
+
+    def __init__(self):
+        self.cache = {}
+
+    def parse(self, text):
+        """(ngày, tháng, năm) của chuỗi ngày; ValueError nếu không hợp lệ."""
+        result = self.cache.get(text)
+        if result is None:
+            value = text.strip()
+            if "-" in value:
+                year, month, day = value.split("-")
+            else:
+                day, month, year = value.split("/")
+            parsed = date(int(year), int(month), int(day))
+            result = self.cache[text] = (parsed.day, parsed.month, parsed.year)
+        return result
+
+def read_chunks(f, chunk_rows=CHUNK_ROWS):
+    """
+    Đọc file CSV theo từng lô: sinh danh sách (số dòng, learner, date, attended, salary).
+    ValueError nếu thiếu cột bắt buộc.
+    """
+    reader = csv.reader(f)
+    header = [column.strip().lower() for column in next(reader, [])]
+    missing = [column for column in REQUIRED_COLUMNS if column not in header]
+    if missing:
+        raise ValueError(f"thiếu cột: {', '.join(missing)}")
+    learner_col, date_col, attended_col = (header.index(column) for column in REQUIRED_COLUMNS)
+    salary_col = header.index("salary") if "salary" in header else None
+    width = max(learner_col, date_col, attended_col, salary_col or 0) + 1
+    line = 1
+    while True:
+        records = list(islice(reader, chunk_rows))
+        if not records:
+            return
+        chunk = []
+        for record in records:
+            line += 1
+            if not record:
+                continue
+            if len(record) < width:
+                record = record + [""] * (width - len(record))
+            chunk.append((line, record[learner_col], record[date_col], record[attended_col],
+                          record[salary_col] if salary_col is not None else ""))
+        yield chunk
+
+def parse_salary(text):
+    """Lương của buổi (số nguyên không âm), None nếu để trống, False nếu không hợp lệ."""
+    text = text.strip()
+    if not text:
+        return None
+    if THOUSANDS.fullmatch(text):
+        text = text.replace(".", "").replace(",", "")
+    try:
+        salary = int(text)
+    except ValueError:
+        return False
+    return salary if salary >= 0 else False
+
+def parse_chunk(chunk, learners, dates, report):
+    """Chuyển một lô dòng CSV thành danh sách (số dòng, tháng, năm, learner_id, 'ngày/tháng', điểm danh, lương)."""
+    rows = []
+    for line, learner, day_text, attended, salary in chunk:
+        report.rows += 1
+        learner_id = learners.get(learner)
+        if learner_id is None:
+            name = learner.strip()
+            report.unknown_learners[name] = report.unknown_learners.get(name, 0) + 1
+            continue
+        try:
+            day, month, year = dates.parse(day_text)
+        except ValueError:
+            report.error(line, f"ngày không hợp lệ: {day_text!r}")
+            continue
+        checked = ATTENDED_VALUES.get(attended.strip().lower())
+        if checked is None:
+            report.error(line, f"trạng thái điểm danh không hợp lệ: {attended!r}")
+            continue
+        salary = parse_salary(salary)
+        if salary is False:
+            report.error(line, "lương không hợp lệ")
+            continue
+        rows.append((line, month, year, learner_id, f"{day}/{month}", checked, salary))
+    return rows
+
+def check_salaries(rows, defaults, report):
+    """
+    Cập nhật lương mặc định của các bảng lương trong lô (defaults, giữ qua cả lần nhập) theo lương có trong file,
+    rồi bỏ các dòng đã điểm danh để trống lương của bảng lương chưa có lương. Trả về các dòng còn lại.
+    Chỉ lương của lô này và các lô trước được tính: kết quả không phụ thuộc thứ tự dòng trong một lô,
+    nhưng phụ thuộc việc dòng có lương nằm ở lô nào (xem đầu module).
+    """
+    for _, month, year, learner_id, _, _, salary in rows:
+        key = (month, year, learner_id)
+        if salary and salary > defaults.get(key, 0):
+            defaults[key] = salary
+    valid = []
+    for row in rows:
+        line, month, year, learner_id, _, checked, salary = row
+        if checked and salary is None and not defaults.get((month, year, learner_id)):
+            report.error(line, "đã điểm danh nhưng để trống lương và bảng lương chưa có lương "
+                               "(trong cơ sở dữ liệu và các dòng trước của file)")
+            continue
+        valid.append(row)
+    return valid
+
+def diff_chunk(db, username, rows, names, report, current, defaults):
+    """
+    So sánh một lô với dữ liệu hiện có (chạy thử): đếm các thay đổi và giữ vài thay đổi tiêu biểu.
+    current: {(tháng, năm, learner_id): {ngày: (điểm danh, lương)}} đã xem, giữ qua mọi lô của lần chạy thử.
+    """
+    for line, month, year, learner_id, day, checked, salary in rows:
+        key = (month, year, learner_id)
+        days = current.get(key)
+        if days is None:
+            data = db.get_payroll_data(username, month, year, learner_id)
+            if not data:
+                report.sheets_created += 1
+            days = current[key] = {d: (c, s) for d, c, s in data}
+        old_checked, old_salary = days.get(day, (0, 0))
+        old_checked = 1 if old_checked else 0
+        if salary is not None:
+            new_salary = salary
+        elif checked and not old_salary:
+            new_salary = defaults[key]
+        else:
+            new_salary = old_salary
+        days[day] = (checked, new_salary)
+        described = []
+        if checked != old_checked:
+            if checked:
+                report.checked += 1
+            else:
+                report.unchecked += 1
+            described.append("điểm danh" if checked else "bỏ điểm danh")
+        if new_salary != old_salary:
+            report.salary_changed += 1
+            described.append(f"lương {format_currency(old_salary)} → {format_currency(new_salary)}")
+        if not described:
+            report.unchanged += 1
+            continue
+        report.changed += 1
+        if len(report.changes) < REPORT_LIMIT:
+            report.changes.append(f"Dòng {line}: {names.get(learner_id, learner_id)} {day}/{year}: {', '.join(described)}")
+
+def import_attendance(db, username, f, dry_run=False, chunk_rows=CHUNK_ROWS):
+    """
+    Nhập điểm danh của username từ file CSV đã mở f (xem đầu module). Mỗi lô được ghi trong một giao dịch;
+    khi một lô lỗi, các lô trước đã được ghi và việc nhập dừng lại. dry_run=True chỉ so sánh và báo cáo.
+    Trả về ImportReport; ValueError nếu file thiếu cột bắt buộc.
+    """
+    report = ImportReport(username, dry_run)
+    learners = LearnerLookup(db, username)
+    dates = DateParser()
+    defaults = db.get_default_salaries(username)
+    current = {}
+    sheets = set()
+    for chunk in read_chunks(f, chunk_rows):
+        rows = check_salaries(parse_chunk(chunk, learners, dates, report), defaults, report)
+        if not rows:
+            continue
+        if dry_run:
+            diff_chunk(db, username, rows, learners.names, report, current, defaults)
+            continue
+        created = db.import_days(username, [row[1:] for row in rows], defaults)
+        if created is None:
+            report.failed = True
+            break
+        sheets.update((month, year, learner_id) for _, month, year, learner_id, _, _, _ in rows)
+        report.imported += len(rows)
+        report.sheets_created += created
+    if sheets and not db.refresh_summaries(username, sheets):
+        report.failed = True
+    logging.info(f"{'Chạy thử nhập' if dry_run else 'Nhập'} điểm danh cho {username}: {report.rows} dòng, "
+                 f"{report.imported} dòng đã ghi, {report.invalid} dòng lỗi, "
+                 f"{sum(report.unknown_learners.values())} dòng không tìm thấy người học")
+    return report
+
+def import_attendance_file(db, username, path, dry_run=False, chunk_rows=CHUNK_ROWS):
+    """Như import_attendance nhưng mở file theo đường dẫn (UTF-8, có hoặc không có BOM)."""
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        return import_attendance(db, username, f, dry_run, chunk_rows)
@@ -0,0 +1,229 @@
+import atexit
+import json
+import logging
+import os
+import time
+from settings import APP_DATA_DIR
+
+# Nhật ký các thay đổi điểm danh chưa ghi vào cơ sở dữ liệu, mỗi dòng một thao tác (JSON).
+# Được phát lại ở lần khởi động sau nếu ứng dụng bị tắt trước khi kịp ghi.
+JOURNAL_FILE = os.path.join(APP_DATA_DIR, "pending_ops.jsonl")
+
+# Thời gian chờ tối đa giữa các lần ghi lại khi ghi lô thất bại (ví dụ "database is locked"), tăng gấp đôi mỗi lần
+MAX_RETRY_MS = 30000
+
+class AttendanceJournal:
+    """
+    Ghi sau (write-behind) các lần bấm điểm danh: gom thay đổi theo bảng lương,
+    ghi vào cơ sở dữ liệu trong một giao dịch sau một khoảng trễ ngắn hoặc khi rời màn hình.
+    Khi có executor (background.BackgroundExecutor), lô được ghi trên luồng cơ sở dữ liệu (submit_db) nên
+    luồng Tk không chờ commit; các truy vấn gửi sau đó qua submit_db chạy sau lô này trên cùng luồng.
+    """
+
+    def __init__(self, db, root=None, delay_ms=800, path=JOURNAL_FILE, executor=None):
+        self.db = db
+        self.root = root
+        self.executor = executor
+        self.delay_ms = delay_ms
+        self.path = path
+        self.pending = {}
+        self.pending_ops = 0
+        # Các lô (thay đổi, số lần bấm) đã gửi sang luồng cơ sở dữ liệu, chưa nhận kết quả, theo thứ tự gửi
+        self._inflight = []
+        # single_ms/single_flushes: thời gian của các lần ghi chỉ có một lần bấm (mẫu đo chi phí ghi từng lần);
+        # saved_ms: thời gian tiết kiệm so với ghi riêng từng lần bấm, tính từ mẫu đo đó
+        self.stats = {"flushes": 0, "ops": 0, "writes": 0, "flush_ms": 0.0,
+                      "single_flushes": 0, "single_ms": 0.0, "saved_ms": 0.0}
+        self._retries = 0
+        self._after_id = None
+        self._log = None
+
+    def record(self, username, month, year, learner_id, day, checked, salary):
+        """Ghi nhận một lần bấm điểm danh: thêm vào nhật ký, gom vào lô chờ và hẹn giờ ghi."""
+        op = {"username": username, "month": month, "year": year, "learner_id": learner_id,
+              "day": day, "checked": int(checked), "salary": salary}
+        if self._log is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._log = open(self.path, "a", encoding="utf-8")
+        self._log.write(json.dumps(op) + "\n")
+        self._log.flush()
+        self.pending.setdefault((username, month, year, learner_id), {})[day] = (int(checked), salary)
+        self.pending_ops += 1
+        self._schedule()
+
+    def _schedule(self, delay_ms=None):
+        """Đặt lại hẹn giờ ghi (debounce) trên vòng lặp Tk."""
+        if self.root is None:
+            return
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+        self._after_id = self.root.after(delay_ms or self.delay_ms, self.flush)
+
+    def _retry(self):
+        """Hẹn ghi lại các thay đổi sau khi ghi thất bại, thời gian chờ tăng dần đến MAX_RETRY_MS."""
+        self._retries += 1
+        delay_ms = min(self.delay_ms * 2 ** self._retries, MAX_RETRY_MS)
+        logging.warning(f"Ghi điểm danh thất bại, thử lại sau {delay_ms} ms (lần {self._retries}).")
+        self._schedule(delay_ms)
+
+    def _cancel_timer(self):
+        """Hủy hẹn giờ ghi đang chờ (nếu có)."""
+        if self._after_id is not None and self.root is not None:
+            try:
+                self.root.after_cancel(self._after_id)
+            except Exception:
+                pass
+        self._after_id = None
+
+    def flush(self):
+        """
+        Ghi toàn bộ thay đổi đang chờ trong một giao dịch: gửi sang luồng cơ sở dữ liệu nếu có executor,
+        ngược lại ghi ngay (xem flush_now). Nhật ký được xóa khi mọi lô đã gửi đều ghi xong.
+        """
+        self._cancel_timer()
+        if self.executor is None:
+            if self.flush_now():
+                return True
+            self._retry()
+            return False
+        if not self.pending:
+            return True
+        batch = (self.pending, self.pending_ops)
+        self.pending, self.pending_ops = {}, 0
+        self._inflight.append(batch)
+        self.executor.submit_db(self._write, batch[0],
+                                on_done=lambda result: self._flushed(batch, *result),
+                                on_error=lambda error: self._flushed(batch, False, 0.0))
+        return True
+
+    def flush_now(self):
+        """
+        Ghi ngay trên luồng hiện tại (không có executor, hoặc khi thoát ứng dụng sau khi executor đã dừng).
+        Các lô đã gửi mà chưa nhận kết quả được ghi lại cùng các thay đổi đang chờ (ghi lại cùng giá trị không sao).
+        """
+        self._cancel_timer()
+        if self._inflight:
+            changes, ops = {}, 0
+            for days_by_sheet, count in self._inflight + [(self.pending, self.pending_ops)]:
+                for key, days in days_by_sheet.items():
+                    changes.setdefault(key, {}).update(days)
+                ops += count
+            self.pending, self.pending_ops = changes, ops
+            self._inflight = []
+        if not self.pending:
+            return True
+        changes, ops = self.pending, self.pending_ops
+        ok, elapsed_ms = self._write(self.db, changes)
+        if not ok:
+            # Giữ nguyên nhật ký để phát lại ở lần khởi động sau
+            return False
+        self.pending, self.pending_ops = {}, 0
+        self._record_stats(changes, ops, elapsed_ms)
+        self._truncate_log()
+        return True
+
+    @staticmethod
+    def _write(db, changes):
+        """Ghi một lô bằng db (chạy trên luồng của db). Trả về (thành công, thời gian ghi ms)."""
+        start = time.perf_counter()
+        ok = db.apply_day_changes(changes)
+        return ok, (time.perf_counter() - start) * 1000
+
+    def _flushed(self, batch, ok, elapsed_ms):
+        """Nhận kết quả ghi một lô từ luồng cơ sở dữ liệu (trên luồng Tk)."""
+        if not any(item is batch for item in self._inflight):
+            # Lô đã được flush_now ghi lại
+            return
+        self._inflight = [item for item in self._inflight if item is not batch]
+        changes, ops = batch
+        if not ok:
+            # Đưa lại vào lô chờ để ghi lần sau, trừ các ngày đã có thay đổi mới hơn; nhật ký được giữ nguyên
+            newer = [self.pending] + [days_by_sheet for days_by_sheet, _ in self._inflight]
+            for key, days in changes.items():
+                for day, value in days.items():
+                    if not any(day in days_by_sheet.get(key, ()) for days_by_sheet in newer):
+                        self.pending.setdefault(key, {})[day] = value
+            self.pending_ops += ops
+            self._retry()
+            return
+        self._record_stats(changes, ops, elapsed_ms)
+        if not self._inflight and not self.pending:
+            self._truncate_log()
+
+    def _record_stats(self, changes, ops, elapsed_ms):
+        """
+        Cộng dồn số liệu của một lần ghi thành công và ghi log. Thời gian tiết kiệm của lô là số lần bấm nhân
+        thời gian trung bình đo được của các lần ghi chỉ có một lần bấm, trừ thời gian ghi lô; chưa có mẫu đo thì bỏ qua.
+        """
+        self._retries = 0
+        writes = sum(len(days) for days in changes.values())
+        self.stats["flushes"] += 1
+        self.stats["ops"] += ops
+        self.stats["writes"] += writes
+        self.stats["flush_ms"] += elapsed_ms
+        if ops == 1:
+            self.stats["single_flushes"] += 1
+            self.stats["single_ms"] += elapsed_ms
+        message = f"Đã ghi {ops} lần bấm ({writes} ngày, {len(changes)} bảng lương) trong {elapsed_ms:.1f} ms"
+        if ops > 1 and self.stats["single_flushes"]:
+            single_ms = self.stats["single_ms"] / self.stats["single_flushes"]
+            saved_ms = max(ops * single_ms - elapsed_ms, 0.0)
+            self.stats["saved_ms"] += saved_ms
+            message += f", tiết kiệm {saved_ms:.1f} ms so với ghi riêng từng lần ({single_ms:.1f} ms/lần đo được)"
+        logging.info(message + ".")
+
+    def _truncate_log(self):
+        """Xóa nội dung nhật ký sau khi đã ghi vào cơ sở dữ liệu."""
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+        try:
+            open(self.path, "w", encoding="utf-8").close()
+        except OSError as e:
+            logging.error(f"Không thể xóa nhật ký điểm danh {self.path}: {e}")
+
+    def replay(self):
+        """Phát lại các thao tác còn trong nhật ký (ứng dụng bị tắt trước khi ghi). Trả về số thao tác."""
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return 0
+        except OSError as e:
+            logging.error(f"Không thể đọc nhật ký điểm danh {self.path}: {e}")
+            return 0
+        count = 0
+        for line in lines:
+            try:
+                op = json.loads(line)
+            except ValueError:
+                # Dòng cuối có thể bị ghi dở khi ứng dụng bị tắt đột ngột
+                continue
+            key = (op["username"], op["month"], op["year"], op["learner_id"])
+            self.pending.setdefault(key, {})[op["day"]] = (op["checked"], op["salary"])
+            self.pending_ops += 1
+            count += 1
+        if count:
+            logging.info(f"Phát lại {count} thao tác điểm danh từ nhật ký.")
+            self.flush_now()
+        elif lines:
+            self._truncate_log()
+        return count
+
+_journal = None
+
+def get_journal(db, root=None, executor=None):
+    """
+    Lấy nhật ký điểm danh dùng chung; lần gọi đầu tiên phát lại các thao tác còn tồn đọng.
+    executor: bộ thực thi nền để ghi các lô trên luồng cơ sở dữ liệu thay vì luồng gọi.
+    """
+    global _journal
+    if _journal is None:
+        _journal = AttendanceJournal(db, root)
+        _journal.replay()
+        atexit.register(_journal.flush_now)
+    elif root is not None:
+        _journal.root = root
+    if executor is not None:
+        _journal.executor = executor
+    return _journal
@@ -0,0 +1,145 @@
+import logging
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from tkinter import ttk
+
+# Chạy công việc nặng (truy vấn cơ sở dữ liệu, tạo PDF) ngoài luồng giao diện Tk.
+# Kết quả được đưa về luồng chính qua hàng đợi, đọc bằng root.after, vì Tk chỉ được gọi từ luồng chính.
+
+class BackgroundExecutor:
+    """
+    Bộ thực thi nền cho giao diện:
+    - submit_db: chạy trên một luồng cơ sở dữ liệu riêng (một kết nối SQLite cố định cho luồng đó),
+      hàm nhận đối tượng Database của luồng này làm tham số đầu tiên.
+    - submit: chạy trên luồng công việc chung (ví dụ tạo PDF).
+    on_done(kết quả) / on_error(lỗi) luôn được gọi trên luồng Tk.
+    """
+
+    def __init__(self, root, workers=2, poll_ms=30):
+        self.root = root
+        self.poll_ms = poll_ms
+        self._db_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tutorpay-db")
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tutorpay-worker")
+        self._results = queue.Queue()
+        self._pending = 0
+        self._busy = 0
+        self._after_id = None
+        self._indicator = None
+
+    def submit_db(self, fn, *args, on_done=None, on_error=None, busy=False):
+        """Chạy fn(db, *args) trên luồng cơ sở dữ liệu. Trả về Future."""
+        return self._submit(self._db_pool, self._run_db, (fn, *args), on_done, on_error, busy)
+
+    def submit(self, fn, *args, on_done=None, on_error=None, busy=False):
+        """Chạy fn(*args) trên luồng công việc. Trả về Future."""
+        return self._submit(self._pool, fn, args, on_done, on_error, busy)
+
+    def post(self, callback, *args):
+        """Gọi callback(*args) trên luồng Tk; dùng được từ luồng nền (ví dụ báo tiến độ)."""
+        self._results.put((callback, args))
+
+    @staticmethod
+    def _run_db(fn, *args):
+        """Lấy Database của luồng hiện tại (kết nối riêng của luồng cơ sở dữ liệu) rồi chạy fn."""
+        from database import open_database
+        return fn(open_database(), *args)
+
+    def _submit(self, pool, fn, args, on_done, on_error, busy):
+        """Đưa công việc vào pool, khi xong thì xếp callback vào hàng đợi cho luồng Tk."""
+        self._pending += 1
+        if busy:
+            self._set_busy(1)
+
+        def finished(future):
+            if future.cancelled():
+                # Công việc bị hủy trước khi chạy (ví dụ lần tìm kiếm đã cũ): chỉ cập nhật bộ đếm
+                self._results.put((self._finish_done, (None, None, busy)))
+                return
+            error = future.exception()
+            if error is not None:
+                self._results.put((self._finish_error, (error, on_error, busy)))
+            else:
+                self._results.put((self._finish_done, (future.result(), on_done, busy)))
+
+        future = pool.submit(fn, *args)
+        future.add_done_callback(finished)
+        self._schedule()
+        return future
+
+    def _finish_done(self, result, on_done, busy):
+        """Hoàn tất một công việc thành công (trên luồng Tk)."""
+        self._pending -= 1
+        if busy:
+            self._set_busy(-1)
+        if on_done:
+            on_done(result)
+
+    def _finish_error(self, error, on_error, busy):
+        """Hoàn tất một công việc bị lỗi (trên luồng Tk)."""
+        self._pending -= 1
+        if busy:
+            self._set_busy(-1)
+        logging.error(f"Lỗi trong công việc nền: {error!r}")
+        if on_error:
+            on_error(error)
+
+    def _schedule(self):
+        """Hẹn lần đọc hàng đợi kết quả tiếp theo trên vòng lặp Tk."""
+        if self._after_id is None:
+            self._after_id = self.root.after(self.poll_ms, self._poll)
+
+    def _poll(self):
+        """Gọi các callback đã hoàn tất; tiếp tục đọc khi còn công việc đang chạy."""
+        self._after_id = None
+        while True:
+            try:
+                callback, args = self._results.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                callback(*args)
+            except Exception:
+                logging.exception("Lỗi khi xử lý kết quả công việc nền.")
+        if self._pending > 0:
+            self._schedule()
+
+    def _set_busy(self, delta):
+        """Hiện hoặc ẩn chỉ báo bận (con trỏ chờ và thanh tiến trình chạy liên tục ở đáy cửa sổ)."""
+        self._busy += delta
+        try:
+            if self._busy > 0:
+                if self._indicator is None or not self._indicator.winfo_exists():
+                    self._indicator = ttk.Progressbar(self.root, mode="indeterminate")
+                self._indicator.place(relx=0, rely=1, relwidth=1, anchor="sw")
+                self._indicator.lift()
+                self._indicator.start(15)
+                self.root.config(cursor="watch")
+            else:
+                self._busy = 0
+                if self._indicator is not None and self._indicator.winfo_exists():
+                    self._indicator.stop()
+                    self._indicator.place_forget()
+                self.root.config(cursor="")
+        except Exception as e:
+            logging.warning(f"Không thể cập nhật chỉ báo bận: {e}")
+
+    def shutdown(self):
+        """Chờ các công việc đang chạy hoàn tất rồi dừng các luồng nền."""
+        self._db_pool.shutdown(wait=True)
+        self._pool.shutdown(wait=True)
+
+_executor = None
+
+def get_executor(root):
+    """Lấy bộ thực thi nền dùng chung cho cửa sổ Tk."""
+    global _executor
+    if _executor is None:
+        _executor = BackgroundExecutor(root)
+    return _executor
+
+def shutdown_executor():
+    """Dừng bộ thực thi nền dùng chung (nếu đã tạo) khi đóng ứng dụng: chờ các công việc còn lại chạy xong."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown()
+        _executor = None
@@ -0,0 +1,223 @@
+import gzip
+import logging
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+from settings import APP_DATA_DIR, load_settings
+from migrations import SCHEMA_VERSION, migrate
+
+# Sao lưu trực tuyến bằng API backup của SQLite: sao chép từng nhóm trang trong khi ứng dụng vẫn chạy
+# (ở chế độ WAL người đọc không chặn người ghi nên việc điểm danh không bị chặn). Mỗi bản sao lưu được kiểm
+# tra toàn vẹn rồi nén gzip thành backups/tutorpay-YYYYmmdd-HHMMSS-mmm.db.gz (đến mili giây, không trùng tên
+# với bản đã có nên hai lần sao lưu trong cùng một giây không ghi đè nhau); các bản cũ bị xóa theo chính sách
+# giữ lại (N bản mới nhất và bản mới nhất của mỗi tháng trong M tháng gần đây).
+# Khôi phục: giải nén và kiểm tra bản sao lưu trước, sao lưu dữ liệu hiện tại, rồi chép đè vào cơ sở dữ liệu
+# đang dùng cũng bằng API backup (an toàn với file WAL và với các kết nối đang mở, kể cả trên Windows
+# khi không thể thay file đang mở).
+
+BACKUP_DIR = os.path.join(APP_DATA_DIR, "backups")
+# Bản sao lưu cũ không có phần mili giây
+SNAPSHOT_PATTERN = re.compile(r"tutorpay-(\d{8}-\d{6})(?:-(\d{3}))?(-[\w-]+)?\.db\.gz$")
+
+# Số trang mỗi bước sao chép (trang 4 KB: 1 MB mỗi bước) và thời gian nghỉ sau mỗi bước (giây)
+PAGES_PER_STEP = 256
+STEP_SLEEP = 0.005
+
+def backup_dir(settings=None):
+    """Thư mục chứa bản sao lưu: "backup_dir" trong settings.json hoặc APP_DATA_DIR/backups."""
+    settings = settings if settings is not None else load_settings()
+    return os.path.expanduser(settings.get("backup_dir") or BACKUP_DIR)
+
+def list_backups(directory=None):
+    """Các bản sao lưu trong thư mục, mới nhất trước: danh sách (đường dẫn, thời điểm, kích thước byte)."""
+    directory = directory or backup_dir()
+    snapshots = []
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    for name in names:
+        match = SNAPSHOT_PATTERN.match(name)
+        if match:
+            path = os.path.join(directory, name)
+            taken = datetime.strptime(f"{match.group(1)}-{match.group(2) or '000'}", "%Y%m%d-%H%M%S-%f")
+            snapshots.append((path, taken, os.path.getsize(path)))
+    snapshots.sort(key=lambda snapshot: (snapshot[1], snapshot[0]), reverse=True)
+    return snapshots
+
+def prune_backups(directory=None, keep_last=7, keep_monthly=12, protect=()):
+    """
+    Xóa các bản sao lưu ngoài chính sách giữ lại: keep_last bản mới nhất và bản mới nhất của mỗi tháng
+    trong keep_monthly tháng gần nhất có bản sao lưu. Các file trong protect không bị xóa.
+    Trả về danh sách file đã xóa.
+    """
+    snapshots = list_backups(directory)
+    protected = {os.path.normcase(os.path.abspath(path)) for path in protect}
+    keep = {path for path, _, _ in snapshots[:keep_last]}
+    keep |= {path for path, _, _ in snapshots if os.path.normcase(os.path.abspath(path)) in protected}
+    months = []
+    for path, taken, _ in snapshots:
+        month = (taken.year, taken.month)
+        if month not in months:
+            months.append(month)
+            if len(months) <= keep_monthly:
+                keep.add(path)
+    removed = []
+    for path, _, _ in snapshots:
+        if path not in keep:
+            try:
+                os.remove(path)
+                removed.append(path)
+            except OSError as e:
+                logging.error(f"Không thể xóa bản sao lưu cũ {path}: {e}")
+    if removed:
+        logging.info(f"Đã xóa {len(removed)} bản sao lưu cũ theo chính sách giữ lại.")
+    return removed
+
+def _check(conn):
+    """Kiểm tra toàn vẹn và lược đồ của một cơ sở dữ liệu; ValueError nếu không dùng được."""
+    result = conn.execute("PRAGMA integrity_check").fetchone()[0]
+    if result != "ok":
+        raise ValueError(f"cơ sở dữ liệu bị hỏng: {result}")
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version > SCHEMA_VERSION:
+        raise ValueError(f"bản sao lưu được tạo bởi phiên bản mới hơn (lược đồ {version})")
+    tables = {name for name, in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    if not {"users", "learners"} <= tables:
+        raise ValueError("không phải cơ sở dữ liệu TutorPay")
+
+def snapshot_path(directory, label=None, now=None):
+    """Đường dẫn cho bản sao lưu mới: thời điểm đến mili giây, lùi sang mili giây sau nếu tên đã có."""
+    now = now or datetime.now()
+    while True:
+        name = f"tutorpay-{now:%Y%m%d-%H%M%S}-{now.microsecond // 1000:03d}{'-' + label if label else ''}.db.gz"
+        path = os.path.join(directory, name)
+        if not os.path.exists(path) and not os.path.exists(path + ".part"):
+            return path
+        now += timedelta(milliseconds=1)
+
+def create_backup(conn, directory=None, pages=PAGES_PER_STEP, progress=None, label=None, keep_last=None,
+                  keep_monthly=None, protect=()):
+    """
+    Sao lưu cơ sở dữ liệu của conn thành một file nén mới trong directory rồi áp dụng chính sách giữ lại
+    (keep_last/keep_monthly, mặc định theo settings.json; không xóa các file trong protect).
+    progress(đã chép, tổng số trang) được gọi sau mỗi bước.
+    Nên dùng một kết nối riêng trên luồng nền. Trả về đường dẫn bản sao lưu; ValueError/sqlite3.Error nếu thất bại.
+    """
+    settings = load_settings()
+    directory = directory or backup_dir(settings)
+    os.makedirs(directory, exist_ok=True)
+    path = snapshot_path(directory, label)
+    fd, temp_db = tempfile.mkstemp(prefix="backup-", suffix=".db", dir=directory)
+    os.close(fd)
+    start = time.perf_counter()
+
+    def on_step(status, remaining, total):
+        if progress:
+            progress(total - remaining, total)
+        # Nhường đĩa và GIL cho luồng giao diện và các lần ghi giữa hai bước
+        time.sleep(STEP_SLEEP)
+
+    try:
+        target = sqlite3.connect(temp_db)
+        target.execute("PRAGMA synchronous = OFF")
+        if conn.in_transaction:
+            conn.commit()
+        try:
+            # Giữ một giao dịch đọc trong suốt quá trình sao chép: mọi bước đọc cùng một ảnh chụp (WAL) nên việc
+            # ghi từ kết nối khác không làm quá trình sao lưu bắt đầu lại, và người ghi không bị chặn
+            conn.execute("BEGIN")
+            conn.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+            conn.backup(target, pages=pages, progress=on_step)
+        finally:
+            conn.rollback()
+        try:
+            # Bản sao lưu là một file độc lập, không kèm file -wal
+            target.execute("PRAGMA journal_mode = DELETE")
+            _check(target)
+        finally:
+            target.close()
+        with open(temp_db, "rb") as source, gzip.open(path + ".part", "wb", compresslevel=6) as packed:
+            shutil.copyfileobj(source, packed, 1024 * 1024)
+        os.replace(path + ".part", path)
+    finally:
+        for leftover in (temp_db, path + ".part"):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+    logging.info(f"Đã sao lưu cơ sở dữ liệu vào {path} ({os.path.getsize(path)} byte, "
+                 f"{time.perf_counter() - start:.2f} giây).")
+    prune_backups(directory,
+                  keep_last if keep_last is not None else settings.get("backup_keep_last", 7),
+                  keep_monthly if keep_monthly is not None else settings.get("backup_keep_monthly", 12), protect)
+    return path
+
+def backup_due(settings=None, directory=None):
+    """Đã đến lúc sao lưu tự động: bật "backup_interval_hours" và bản mới nhất cũ hơn khoảng thời gian đó."""
+    settings = settings if settings is not None else load_settings()
+    hours = settings.get("backup_interval_hours", 24)
+    if not hours:
+        return False
+    snapshots = list_backups(directory or backup_dir(settings))
+    return not snapshots or (datetime.now() - snapshots[0][1]).total_seconds() >= hours * 3600
+
+def run_scheduled_backup(force=False, progress=None):
+    """
+    Sao lưu bằng kết nối riêng của luồng hiện tại (gọi trên luồng nền) nếu đã đến hạn hoặc force.
+    Trả về đường dẫn bản sao lưu, hoặc None nếu chưa đến hạn.
+    """
+    from database import get_connection_manager
+    if not force and not backup_due():
+        return None
+    return create_backup(get_connection_manager().get(), progress=progress)
+
+def verify_backup(snapshot, directory):
+    """
+    Giải nén bản sao lưu vào file tạm trong directory và kiểm tra toàn vẹn, lược đồ.
+    Trả về đường dẫn file tạm (người gọi xóa); ValueError nếu bản sao lưu không dùng được.
+    """
+    fd, temp_db = tempfile.mkstemp(prefix="restore-", suffix=".db", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as target, gzip.open(snapshot, "rb") as packed:
+            shutil.copyfileobj(packed, target, 1024 * 1024)
+        conn = sqlite3.connect(temp_db)
+        try:
+            _check(conn)
+        finally:
+            conn.close()
+        return temp_db
+    except (OSError, EOFError, sqlite3.DatabaseError) as e:
+        os.remove(temp_db)
+        raise ValueError(f"bản sao lưu không đọc được: {e}") from None
+    except ValueError:
+        os.remove(temp_db)
+        raise
+
+def restore_backup(snapshot, conn, directory=None):
+    """
+    Khôi phục bản sao lưu vào cơ sở dữ liệu của conn: kiểm tra bản sao lưu, sao lưu dữ liệu hiện tại
+    (nhãn "truoc-khoi-phuc"), chép đè trong một bước rồi kiểm tra lại và cập nhật lược đồ nếu bản sao lưu cũ hơn.
+    Trả về đường dẫn bản sao lưu dữ liệu cũ; ValueError nếu bản sao lưu không dùng được.
+    """
+    directory = directory or backup_dir()
+    os.makedirs(directory, exist_ok=True)
+    temp_db = verify_backup(snapshot, directory)
+    try:
+        if conn.in_transaction:
+            conn.commit()
+        # Không để chính sách giữ lại xóa bản sao lưu người dùng vừa chọn khôi phục
+        previous = create_backup(conn, directory, label="truoc-khoi-phuc", protect=(snapshot,))
+        source = sqlite3.connect(temp_db)
+        try:
+            source.backup(conn)
+        finally:
+            source.close()
+        _check(conn)
+        migrate(conn)
+    finally:
+        os.remove(temp_db)
+    logging.info(f"Đã khôi phục cơ sở dữ liệu từ {snapshot}; dữ liệu trước đó được lưu tại {previous}.")
+    return previous
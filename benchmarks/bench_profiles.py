@@ -0,0 +1,57 @@
+"""
+Đo số lần bấm điểm danh mỗi giây (Database.update_day ghi đồng bộ, tóm tắt do trigger cập nhật)
+dưới từng cấu hình hiệu năng SQLite, so với cấu hình mặc định của SQLite (không đặt pragma).
+
+Cách chạy: python benchmarks/bench_profiles.py [--clicks 500] [--storage rows|compact]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import ConnectionManager, Database, PERFORMANCE_PROFILES
+
+# "default": journal rollback, synchronous=FULL như trước khi có cấu hình hiệu năng
+PROFILES = {"default": {}, **PERFORMANCE_PROFILES}
+
+def bench_profile(name, clicks, storage):
+    """Chạy một lượt đo với cấu hình hiệu năng cho trước, trả về số lần bấm mỗi giây."""
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = ConnectionManager(os.path.join(tmp, "bench.db"), PROFILES[name])
+        if storage == "compact":
+            from payroll_compact import CompactDatabase
+            db = CompactDatabase(manager)
+        else:
+            db = Database(manager)
+        db.add_learner("admin", "Học sinh")
+        learner_id = db.get_learners("admin")[0][0]
+        db.create_payroll("admin", 1, 2025, learner_id)
+        db.update_default_salary("admin", 1, 2025, learner_id, 150000)
+        checked_days = set()
+        start = time.perf_counter()
+        for i in range(clicks):
+            day = f"{i % 31 + 1}/1"
+            checked = day not in checked_days
+            if checked:
+                checked_days.add(day)
+            else:
+                checked_days.discard(day)
+            db.update_day("admin", 1, 2025, learner_id, day, int(checked), 150000 if checked else 0)
+        elapsed = time.perf_counter() - start
+        manager.close_all()
+    return clicks / elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Đo số lần bấm điểm danh mỗi giây theo cấu hình hiệu năng.")
+    parser.add_argument("--clicks", type=int, default=500)
+    parser.add_argument("--storage", choices=("rows", "compact"), default="rows")
+    args = parser.parse_args()
+    print(f"{'Cấu hình':<10}{'Lần bấm/giây':>15}")
+    for name in PROFILES:
+        print(f"{name:<10}{bench_profile(name, args.clicks, args.storage):>15.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+"""
+Bộ đo hiệu năng: tạo dữ liệu tổng hợp ở nhiều quy mô (benchmarks/dataset.py), đo thời gian từng phương thức
+của Database, utils.get_weeks_in_month, utils.format_currency và pdf_utils.export_to_pdf (truyền sẵn tên file
+nên không mở hộp thoại). Kết quả là JSON để so sánh giữa các phiên bản.
+
+Cách chạy: python benchmarks/bench_suite.py [--scales small,medium] [--storage rows|compact]
+           [--profile safe|fast] [--db :temp:|:memory:|thư_mục] [--repeat 20] [--label v1.2]
+           [--output kết_quả.json] [--compare kết_quả_cũ.json]
+Quy mô tùy chọn viết dạng người_dùng×người_học×năm, ví dụ --scales 2x50x1.
+"""
+import argparse
+import inspect
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from database import Database, PERFORMANCE_PROFILES, MEMORY_DB, TEMP_DB
+from payroll_sheet import PayrollSheet
+from utils import get_weeks_in_month, format_currency
+from dataset import open_db, generate_dataset
+
+# Phiên bản định dạng file kết quả, tăng khi đổi cấu trúc JSON
+RESULT_FORMAT = 1
+
+# (người dùng, người học mỗi người dùng, số năm)
+SCALES = {
+    "small": (1, 10, 1),
+    "medium": (3, 30, 2),
+    "large": (5, 100, 3),
+}
+
+START_YEAR = 2024
+
+# Phương thức công khai không đo riêng: lý do
+SKIPPED = {
+    "create_tables": "chạy migration, chỉ một lần khi mở cơ sở dữ liệu",
+    "add_payroll_sheet": "không commit, được đo trong create_payroll",
+    "remove_payroll_sheet": "không commit, được đo trong delete_payroll",
+}
+
+class Case:
+    """Một phép đo: setup(i) chuẩn bị tham số (không tính giờ), run(*tham số) là phần được đo."""
+
+    def __init__(self, run, setup=None, repeat=None, number=1):
+        self.run = run
+        self.setup = setup
+        self.repeat = repeat
+        self.number = number
+
+def measure(case, repeat):
+    """Chạy case một lần làm nóng rồi repeat lần; trả về thống kê thời gian mỗi lần gọi (ms)."""
+    repeat = case.repeat or repeat
+    samples = []
+    for i in range(repeat + 1):
+        args = case.setup(i) if case.setup else ()
+        start = time.perf_counter()
+        for _ in range(case.number):
+            case.run(*args)
+        elapsed = (time.perf_counter() - start) * 1000 / case.number
+        if i:
+            samples.append(elapsed)
+    samples.sort()
+    return {
+        "calls": repeat * case.number,
+        "min_ms": round(samples[0], 4),
+        "median_ms": round(statistics.median(samples), 4),
+        "mean_ms": round(statistics.fmean(samples), 4),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 4),
+        "max_ms": round(samples[-1], 4),
+    }
+
+def find_learner(db, username, name):
+    """ID của người học vừa thêm (tên là duy nhất)."""
+    return next(lid for lid, lname in db.get_learners(username) if lname == name)
+
+def find_user(db, username):
+    """ID của tài khoản vừa thêm."""
+    return next(uid for uid, uname, _ in db.search_users(username) if uname == username)
+
+def database_cases(db, dataset):
+    """Các phép đo cho từng phương thức của Database trên bộ dữ liệu đã tạo."""
+    username = dataset["usernames"][0]
+    learners = db.get_learners(username)
+    learner_id = learners[0][0]
+    month, year = 6, START_YEAR
+    days = [day for day, _, _ in db.get_payroll_data(username, month, year, learner_id)]
+    # Năm cuối của bộ dữ liệu (đọc trước khi các phép đo tạo thêm bảng lương ở năm 3000+)
+    last_year = db.get_payroll_years(username)[0][0]
+    salary = 150000
+
+    def setup_learner(i):
+        name = f"Bench xóa {i}"
+        db.add_learner(username, name)
+        return (find_learner(db, username, name),)
+
+    def setup_payroll(i):
+        db.create_payroll(username, 2, 5000 + i, learner_id)
+        return (username, 2, 5000 + i, learner_id)
+
+    def setup_user(i):
+        name = f"bench_del_{i}"
+        db.register_user(name, "Bench", "123")
+        db.add_learner(name, "Bench")
+        db.create_payroll(name, 1, START_YEAR, find_learner(db, name, "Bench"))
+        return (name,)
+
+    def setup_user_id(prefix):
+        def setup(i):
+            name = f"{prefix}_{i}"
+            db.add_user(name, "Bench", "123")
+            return (find_user(db, name), name)
+        return setup
+
+    return {
+        "register_user": Case(lambda i: db.register_user(f"bench_reg_{i}", "Bench", "123"), lambda i: (i,)),
+        "login_user": Case(lambda: db.login_user(username, "123")),
+        "add_learner": Case(lambda i: db.add_learner(username, f"Bench thêm {i}"), lambda i: (i,)),
+        "get_learners": Case(lambda: db.get_learners(username)),
+        "search_learners": Case(lambda: db.search_learners(username, "nguyen an")),
+        "update_learner": Case(lambda i: db.update_learner(learner_id, learners[0][1]), lambda i: (i,)),
+        "delete_learner": Case(db.delete_learner, setup_learner),
+        "create_payroll": Case(lambda i: db.create_payroll(username, 1, 3000 + i, learner_id), lambda i: (i,)),
+        "open_month": Case(lambda i: db.open_month(username, 1, 4000 + i), lambda i: (i,)),
+        "get_payrolls": Case(lambda: db.get_payrolls(username)),
+        "get_payroll_years": Case(lambda: db.get_payroll_years(username)),
+        "get_payroll_months": Case(lambda: db.get_payroll_months(username, year)),
+        "get_payroll_page": Case(lambda: db.get_payroll_page(username, year, month)),
+        "get_payroll_keys": Case(lambda: db.get_payroll_keys(username, year)),
+        "get_payroll_data": Case(lambda: db.get_payroll_data(username, month, year, learner_id)),
+        "get_payroll_sheet": Case(lambda: db.get_payroll_sheet(username, month, year, learner_id)),
+        "get_payroll_summary": Case(lambda: db.get_payroll_summary(username, month, year, learner_id)),
+        "get_month_totals": Case(lambda: db.get_month_totals(username, month, year)),
+        "get_earnings_by_month": Case(lambda: db.get_earnings_by_month(username, START_YEAR, last_year)),
+        "get_earnings_by_quarter": Case(lambda: db.get_earnings_by_quarter(username, START_YEAR, last_year)),
+        "get_earnings_by_year": Case(lambda: db.get_earnings_by_year(username, START_YEAR, last_year)),
+        "get_earnings_by_learner": Case(lambda: db.get_earnings_by_learner(username, START_YEAR, last_year)),
+        "get_year_to_date": Case(lambda: db.get_year_to_date(username, last_year, month)),
+        "update_day": Case(lambda i: db.update_day(username, month, year, learner_id, days[i % len(days)], i % 2,
+                                                   salary), lambda i: (i,)),
+        "apply_day_changes": Case(lambda i: db.apply_day_changes(
+            {(username, month, year, learner_id): {day: (i % 2, salary) for day in days}}), lambda i: (i,)),
+        "import_days": Case(lambda i: db.import_days(
+            username, [(month, year, lid, day, i % 2, None) for lid, _ in learners for day in days]), lambda i: (i,)),
+        "update_default_salary": Case(lambda: db.update_default_salary(username, month, year, learner_id, salary)),
+        "apply_salary": Case(lambda: db.apply_salary(username, month, year, learner_id, salary)),
+        "delete_payroll": Case(db.delete_payroll, setup_payroll),
+        "delete_user": Case(db.delete_user, setup_user),
+        "update_password": Case(lambda: db.update_password(username, "123")),
+        "get_all_users": Case(db.get_all_users),
+        "search_users": Case(lambda: db.search_users("nguoi dung 1")),
+        "add_user": Case(lambda i: db.add_user(f"bench_add_{i}", "Bench", "123"), lambda i: (i,)),
+        "update_user": Case(lambda user_id, name: db.update_user(user_id, name, "Bench đã sửa", "123"),
+                            setup_user_id("bench_upd")),
+        "delete_user_by_id": Case(lambda user_id, name: db.delete_user_by_id(user_id), setup_user_id("bench_rm")),
+    }
+
+def function_cases(db, dataset, pdf_dir):
+    """Các phép đo cho hàm tiện ích và xuất PDF (không phụ thuộc quy mô trừ dữ liệu bảng lương)."""
+    import pdf_utils
+    username = dataset["usernames"][0]
+    learner_id = db.get_learners(username)[0][0]
+    sheet = PayrollSheet.load(db, username, 6, START_YEAR, learner_id)
+    filename = os.path.join(pdf_dir, "bench.pdf")
+
+    def export():
+        success, _ = pdf_utils.export_to_pdf(username, sheet.month, sheet.year, sheet.data(), sheet.learner_name,
+                                             learner_id, sheet.sessions, sheet.fee, filename)
+        if not success:
+            raise RuntimeError("export_to_pdf thất bại, xem logs/app.log")
+
+    return {
+        "utils.get_weeks_in_month": Case(lambda: [get_weeks_in_month(2025, m) for m in range(1, 13)], number=100),
+        "utils.format_currency": Case(lambda: format_currency(1234567), number=1000),
+        "pdf_utils.export_to_pdf": Case(export, repeat=5),
+    }
+
+def run_scale(name, scale, args, pdf_dir):
+    """Tạo dữ liệu cho một quy mô rồi chạy tất cả phép đo; trả về kết quả của quy mô đó."""
+    users, learners, years = scale
+    if args.db in (MEMORY_DB, TEMP_DB):
+        path = args.db
+    else:
+        path = os.path.join(args.db, f"bench-{name}-{args.storage}.db")
+        if os.path.exists(path):
+            raise SystemExit(f"{path} đã tồn tại, hãy xóa hoặc chọn thư mục khác.")
+    db = open_db(path, args.storage, PERFORMANCE_PROFILES[args.profile])
+    print(f"[{name}] tạo dữ liệu {users}×{learners}×{years}...", file=sys.stderr)
+    dataset = generate_dataset(db, users, learners, years, START_YEAR, seed=args.seed)
+    cases = {**database_cases(db, dataset), **function_cases(db, dataset, pdf_dir)}
+    results = {}
+    for case_name, case in cases.items():
+        try:
+            results[case_name] = measure(case, args.repeat)
+        except Exception as e:
+            results[case_name] = {"error": f"{type(e).__name__}: {e}"}
+        print(f"[{name}] {case_name:<28}{results[case_name].get('median_ms', 'lỗi'):>12}", file=sys.stderr)
+    db.manager.close_all()
+    dataset.pop("usernames")
+    return {"scale": name, "users": users, "learners": learners, "years": years, "dataset": dataset, "cases": results}
+
+def parse_scales(text):
+    """Đọc danh sách quy mô: tên có sẵn hoặc dạng người_dùng×người_học×năm."""
+    scales = {}
+    for item in text.split(","):
+        item = item.strip()
+        if item in SCALES:
+            scales[item] = SCALES[item]
+        else:
+            try:
+                users, learners, years = (int(n) for n in item.lower().replace("×", "x").split("x"))
+            except ValueError:
+                raise SystemExit(f"Quy mô không hợp lệ: {item}")
+            scales[item] = (users, learners, years)
+    return scales
+
+def git_revision():
+    """Mã commit hiện tại nếu chạy trong kho git."""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(report, old_path):
+    """In tỉ lệ thời gian trung vị so với một file kết quả cũ (lớn hơn 1 là chậm hơn)."""
+    with open(old_path, encoding="utf-8") as f:
+        old = {(r["scale"], name): case for r in json.load(f)["results"] for name, case in r["cases"].items()}
+    print(f"{'Quy mô':<10}{'Phép đo':<30}{'Cũ (ms)':>12}{'Mới (ms)':>12}{'Tỉ lệ':>8}", file=sys.stderr)
+    for result in report["results"]:
+        for name, case in result["cases"].items():
+            before = old.get((result["scale"], name), {}).get("median_ms")
+            after = case.get("median_ms")
+            if before and after:
+                print(f"{result['scale']:<10}{name:<30}{before:>12}{after:>12}{after / before:>8.2f}", file=sys.stderr)
+
+def main():
+    parser = argparse.ArgumentParser(description="Đo hiệu năng các phương thức Database, tiện ích và xuất PDF.")
+    parser.add_argument("--scales", default="small,medium", help="small, medium, large hoặc dạng 2x50x1, cách nhau bởi dấu phẩy")
+    parser.add_argument("--storage", choices=("rows", "compact"), default="rows")
+    parser.add_argument("--profile", choices=sorted(PERFORMANCE_PROFILES), default="safe")
+    parser.add_argument("--db", default=TEMP_DB, help='":temp:", ":memory:" hoặc thư mục chứa file cơ sở dữ liệu đo')
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--label", help="nhãn phiên bản ghi vào kết quả")
+    parser.add_argument("--output", default="-", help="file JSON kết quả ('-' là stdout)")
+    parser.add_argument("--compare", help="file JSON kết quả cũ để so sánh")
+    args = parser.parse_args()
+
+    report = {
+        "format": RESULT_FORMAT,
+        "label": args.label,
+        "git": git_revision(),
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "storage": args.storage,
+        "profile": args.profile,
+        "db": args.db,
+        "repeat": args.repeat,
+        "skipped": SKIPPED,
+        "results": [],
+    }
+    with tempfile.TemporaryDirectory() as pdf_dir:
+        for name, scale in parse_scales(args.scales).items():
+            report["results"].append(run_scale(name, scale, args, pdf_dir))
+    measured = set(report["results"][0]["cases"]) if report["results"] else set()
+    report["not_benchmarked"] = sorted(
+        name for name, _ in inspect.getmembers(Database, inspect.isfunction)
+        if not name.startswith("_") and name not in measured and name not in SKIPPED)
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output == "-":
+        print(text)
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        print(f"Đã ghi kết quả vào {args.output}", file=sys.stderr)
+    if report["not_benchmarked"]:
+        print(f"Chưa có phép đo cho: {', '.join(report['not_benchmarked'])}", file=sys.stderr)
+    if args.compare:
+        compare(report, args.compare)
+
+if __name__ == "__main__":
+    main()
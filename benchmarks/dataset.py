@@ -0,0 +1,109 @@
+"""
+Tạo bộ dữ liệu tổng hợp cho đo hiệu năng: N người dùng × M người học × Y năm điểm danh.
+Dữ liệu được ghi qua các phương thức của Database nên dùng được cho cả kiểu lưu trữ rows và compact.
+
+Cách chạy: python benchmarks/dataset.py --db đường_dẫn.db [--users 5] [--learners 20] [--years 2]
+           [--start-year 2024] [--attendance 0.5] [--storage rows|compact] [--seed 0] [--traffic bulk|gui]
+
+--traffic gui ghi dữ liệu giống giao diện: đặt lương mặc định cho cả bảng lương (mọi ngày), rồi điểm danh từng ngày;
+một phần ngày chưa điểm danh đã được bấm rồi bỏ bấm nên có lương 0 (PayrollScreen.update_day).
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from calendar import monthrange
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import ConnectionManager, Database
+
+FAMILY_NAMES = ["Nguyễn", "Trần", "Lê", "Phạm", "Hoàng", "Huỳnh", "Phan", "Vũ", "Võ", "Đặng", "Bùi", "Đỗ"]
+MIDDLE_NAMES = ["Văn", "Thị", "Minh", "Ngọc", "Thanh", "Quốc", "Gia", "Hữu", "Đức", "Thùy"]
+GIVEN_NAMES = ["An", "Bình", "Châu", "Dũng", "Giang", "Hà", "Khánh", "Linh", "Mai", "Nam", "Phúc", "Quân",
+               "Sơn", "Trang", "Uyên", "Vy", "Yến", "Ánh", "Đạt", "Hương"]
+SALARIES = [100000, 120000, 150000, 180000, 200000, 250000]
+
+def open_db(path, storage="rows", pragmas=None):
+    """Mở Database (rows hoặc compact) tại path; path có thể là ":memory:" hoặc ":temp:"."""
+    manager = ConnectionManager(path, pragmas)
+    if storage == "compact":
+        from payroll_compact import CompactDatabase
+        return CompactDatabase(manager)
+    return Database(manager)
+
+def learner_name(rng, index):
+    """Tên người học ngẫu nhiên có dấu, thêm số thứ tự để không trùng."""
+    return f"{rng.choice(FAMILY_NAMES)} {rng.choice(MIDDLE_NAMES)} {rng.choice(GIVEN_NAMES)} {index}"
+
+# Tỷ lệ ngày chưa điểm danh đã từng được bấm rồi bỏ bấm (lương 0) với --traffic gui
+UNCHECKED_TOGGLED = 0.3
+
+def generate_dataset(db, users, learners, years, start_year=2024, attendance=0.5, seed=0, traffic="bulk"):
+    """
+    Ghi users người dùng, mỗi người learners người học, mỗi người học một bảng lương cho mỗi tháng của years năm
+    (bắt đầu từ start_year); mỗi ngày được điểm danh với xác suất attendance.
+    traffic="bulk": mỗi tháng của một người dùng được ghi trong hai giao dịch (mở tháng, ghi điểm danh), mọi ngày
+    có lương của người học. traffic="gui": như giao diện, đặt lương cho từng bảng lương rồi ghi điểm danh; ngày bỏ
+    điểm danh có lương 0 (tỷ lệ UNCHECKED_TOGGLED trong các ngày chưa điểm danh).
+    Trả về thống kê {"users", "learners", "sheets", "checked_days", "seconds", "usernames"}.
+    """
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    stats = {"users": 0, "learners": 0, "sheets": 0, "checked_days": 0, "usernames": []}
+    for u in range(1, users + 1):
+        username = f"user{u:03d}"
+        if not db.register_user(username, f"Người dùng {u}", "123"):
+            raise ValueError(f"Người dùng {username} đã tồn tại, hãy dùng một cơ sở dữ liệu trống.")
+        stats["users"] += 1
+        stats["usernames"].append(username)
+        for i in range(1, learners + 1):
+            db.add_learner(username, learner_name(rng, i))
+        learner_ids = [learner_id for learner_id, _ in db.get_learners(username)]
+        salaries = {learner_id: rng.choice(SALARIES) for learner_id in learner_ids}
+        stats["learners"] += len(learner_ids)
+        for year in range(start_year, start_year + years):
+            for month in range(1, 13):
+                created, _ = db.open_month(username, month, year)
+                stats["sheets"] += created
+                _, days = monthrange(year, month)
+                changes = {}
+                for learner_id in learner_ids:
+                    salary = salaries[learner_id]
+                    if traffic == "gui":
+                        db.apply_salary(username, month, year, learner_id, salary)
+                    sheet = {}
+                    for day in range(1, days + 1):
+                        checked = int(rng.random() < attendance)
+                        stats["checked_days"] += checked
+                        if traffic != "gui" or checked:
+                            sheet[f"{day}/{month}"] = (checked, salary)
+                        elif rng.random() < UNCHECKED_TOGGLED:
+                            sheet[f"{day}/{month}"] = (0, 0)
+                    changes[(username, month, year, learner_id)] = sheet
+                db.apply_day_changes(changes)
+    stats["seconds"] = round(time.perf_counter() - start, 3)
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Tạo bộ dữ liệu tổng hợp cho đo hiệu năng.")
+    parser.add_argument("--db", required=True, help='đường dẫn file cơ sở dữ liệu mới (hoặc ":temp:")')
+    parser.add_argument("--users", type=int, default=5)
+    parser.add_argument("--learners", type=int, default=20)
+    parser.add_argument("--years", type=int, default=2)
+    parser.add_argument("--start-year", type=int, default=2024)
+    parser.add_argument("--attendance", type=float, default=0.5)
+    parser.add_argument("--storage", choices=("rows", "compact"), default="rows")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--traffic", choices=("bulk", "gui"), default="bulk")
+    args = parser.parse_args()
+    db = open_db(args.db, args.storage)
+    stats = generate_dataset(db, args.users, args.learners, args.years, args.start_year, args.attendance, args.seed,
+                             args.traffic)
+    db.manager.close_all()
+    print(f"Đã tạo {stats['users']} người dùng, {stats['learners']} người học, {stats['sheets']} bảng lương, "
+          f"{stats['checked_days']} ngày điểm danh trong {stats['seconds']} giây tại {db.manager.path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import tkinter as tk
+from utils import get_weeks_in_month
+
+DAYS_OF_WEEK = ["T2", "T3", "T4", "T5", "T6", "T7", "CN"]
+# Một tháng trải dài tối đa 6 tuần
+MAX_WEEKS = 6
+
+class CalendarGrid(tk.Frame):
+    """
+    Lưới điểm danh theo tuần, dựng một lần (tiêu đề, nhãn tuần và 6 x 7 ô) rồi dùng lại cho mọi bảng lương:
+    show() gán tháng mới bằng cách đổi chữ, biến và trạng thái của các ô có sẵn, không tạo widget mới.
+    on_toggle(ngày, điểm danh) được gọi khi người dùng bấm một ô.
+    """
+
+    def __init__(self, master, on_toggle, **kwargs):
+        kwargs.setdefault("bg", "#FFFFFF")
+        super().__init__(master, **kwargs)
+        self.on_toggle = on_toggle
+        self.enabled = True
+        self.days = {}
+        self.week_labels = []
+        self.cells = []
+
+        for col, day in enumerate(DAYS_OF_WEEK, 1):
+            tk.Label(self, text=day, font=("Segoe UI", 11, "bold"), bg="#FFFFFF", width=8, borderwidth=1, relief="solid").grid(row=0, column=col, padx=1, pady=1, sticky="nsew")
+        for row in range(1, MAX_WEEKS + 1):
+            label = tk.Label(self, text=f"Tuần {row}", font=("Segoe UI", 11), bg="#FFFFFF", width=8, borderwidth=1, relief="solid")
+            label.grid(row=row, column=0, padx=1, pady=1, sticky="nsew")
+            self.week_labels.append(label)
+            cells = []
+            for col in range(1, len(DAYS_OF_WEEK) + 1):
+                var = tk.BooleanVar()
+                cb = tk.Checkbutton(self, text="", font=("Segoe UI", 11), variable=var, bg="#FFFFFF")
+                cb.configure(command=lambda c=cb, v=var: self._toggled(c, v))
+                cb.grid(row=row, column=col, padx=1, pady=1, sticky="nsew")
+                cb.day = None
+                cells.append((cb, var))
+            self.cells.append(cells)
+
+        for i in range(len(DAYS_OF_WEEK) + 1):
+            self.grid_columnconfigure(i, weight=1, uniform="column")
+        for i in range(MAX_WEEKS + 1):
+            self.grid_rowconfigure(i, weight=1)
+
+    def _toggled(self, cb, var):
+        """Chuyển lần bấm ô sang on_toggle với khóa ngày đang gán cho ô."""
+        if cb.day is not None:
+            self.on_toggle(cb.day, var.get())
+
+    def show(self, year, month, is_checked, enabled):
+        """Gán lưới cho một tháng: cập nhật chữ, trạng thái điểm danh và ẩn/hiện các ô, chỉ đổi những gì khác trước."""
+        weeks = get_weeks_in_month(year, month)
+        state = "normal" if enabled else "disabled"
+        self.enabled = enabled
+        self.days = {}
+        for row, cells in enumerate(self.cells):
+            week = weeks[row] if row < len(weeks) else None
+            if week is None:
+                self.week_labels[row].grid_remove()
+                self.grid_rowconfigure(row + 1, weight=0)
+            else:
+                self.week_labels[row].grid()
+                self.grid_rowconfigure(row + 1, weight=1)
+            for col, (cb, var) in enumerate(cells):
+                day = week[col] if week else None
+                cb.day = day
+                if day is None:
+                    cb.grid_remove()
+                    continue
+                self.days[day] = (cb, var)
+                if cb.cget("text") != day:
+                    cb.configure(text=day)
+                if cb.cget("state") != state:
+                    cb.configure(state=state)
+                checked = bool(is_checked(day))
+                if var.get() != checked:
+                    var.set(checked)
+                cb.grid()
+
+    def set_enabled(self, enabled):
+        """Cho phép hoặc khóa điểm danh (khi chưa có lương mặc định), chỉ đổi khi trạng thái khác."""
+        if enabled == self.enabled:
+            return
+        self.enabled = enabled
+        state = "normal" if enabled else "disabled"
+        for cb, _ in self.days.values():
+            cb.configure(state=state)
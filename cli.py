@@ -0,0 +1,340 @@
+"""
+Chế độ dòng lệnh của TutorPay cho các thao tác hàng loạt, không nạp giao diện Tk
+(chạy được từ cron/Task Scheduler). Mọi lệnh chạy trong một tiến trình, dùng chung một kết nối
+cơ sở dữ liệu cho tất cả người dùng được chọn.
+
+Cách chạy: python main.py --cli <lệnh> ...   hoặc   python cli.py <lệnh> ...
+  open-month --month M --year Y [--user U ...]             mở tháng (tạo bảng lương cho mọi người học)
+  import-attendance FILE --user U [--dry-run]              nhập điểm danh từ CSV: learner,date,attended[,salary]
+  totals --month M --year Y [--user U ...] [--format F]    tổng buổi/tổng phí (text, csv hoặc json)
+  export-pdf --month M --year Y --output DIR [--user U ...] [--merged] [--workers N]
+  report [--from Y] [--to Y] [--user U ...] [--format F] [--pdf DIR]   báo cáo thu nhập theo năm/quý/người học
+  export-data FILE [--user U ...]                          xuất dữ liệu ra JSON Lines nén gzip (chuyển máy)
+  import-data FILE [--on-conflict error|skip|replace]      nhập file do export-data tạo
+  backup [--dir D] | list-backups [--dir D]                sao lưu trực tuyến, liệt kê bản sao lưu
+  restore SNAPSHOT --yes                                   khôi phục sau khi kiểm tra toàn vẹn
+Không có --user: chạy cho tất cả người dùng. --db chọn cơ sở dữ liệu khác (như biến TUTORPAY_DB).
+Mã thoát: 0 thành công, 1 có lỗi ở ít nhất một người dùng, 2 sai tham số.
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from attendance_import import CHUNK_ROWS, import_attendance_file
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+
+def select_users(db, usernames):
+    """Danh sách người dùng cần chạy: các --user được chỉ định (phải tồn tại) hoặc tất cả người dùng."""
+    existing = [username for _, username, _ in db.get_all_users()]
+    if not usernames:
+        return existing, []
+    known = set(existing)
+    return [u for u in usernames if u in known], [u for u in usernames if u not in known]
+
+def cmd_open_month(db, args, out):
+    """Mở tháng cho từng người dùng."""
+    users, missing = select_users(db, args.user)
+    failed = len(missing)
+    for username in missing:
+        print(f"{username}: không tồn tại", file=sys.stderr)
+    for username in users:
+        result = db.open_month(username, args.month, args.year)
+        if result is None:
+            print(f"{username}: lỗi khi mở tháng {args.month}/{args.year}", file=sys.stderr)
+            failed += 1
+            continue
+        created, skipped = result
+        print(f"{username}: tạo {created} bảng lương, bỏ qua {skipped}", file=out)
+    return EXIT_FAILED if failed else EXIT_OK
+
+def cmd_import_attendance(db, args, out):
+    """Nhập điểm danh của một người dùng từ CSV theo từng lô (xem attendance_import.py), hoặc chỉ báo cáo khi --dry-run."""
+    users, missing = select_users(db, [args.user])
+    if missing:
+        print(f"{args.user}: không tồn tại", file=sys.stderr)
+        return EXIT_FAILED
+    try:
+        report = import_attendance_file(db, args.user, args.file, args.dry_run, args.chunk)
+    except (OSError, ValueError) as e:
+        print(f"Không đọc được {args.file}: {e}", file=sys.stderr)
+        return EXIT_FAILED
+    print("\n".join(report.lines()), file=out if report.ok else sys.stderr)
+    return EXIT_OK if report.ok else EXIT_FAILED
+
+def cmd_totals(db, args, out):
+    """In tổng buổi và tổng phí của từng bảng lương trong tháng."""
+    users, missing = select_users(db, args.user)
+    for username in missing:
+        print(f"{username}: không tồn tại", file=sys.stderr)
+    results = [(username, db.get_month_totals(username, args.month, args.year)) for username in users]
+    if args.format == "json":
+        json.dump([{"username": username, "month": args.month, "year": args.year,
+                    "sheets": [{"learner_id": lid, "learner": name, "sessions": sessions, "fee": fee}
+                               for lid, name, sessions, fee in totals],
+                    "sessions": sum(t[2] for t in totals), "fee": sum(t[3] for t in totals)}
+                   for username, totals in results], out, ensure_ascii=False, indent=2)
+        out.write("\n")
+    elif args.format == "csv":
+        writer = csv.writer(out)
+        writer.writerow(["username", "month", "year", "learner_id", "learner", "sessions", "fee"])
+        for username, totals in results:
+            writer.writerows([username, args.month, args.year, *row] for row in totals)
+    else:
+        from utils import format_currency
+        for username, totals in results:
+            print(f"{username} - tháng {args.month}/{args.year}:", file=out)
+            for _, name, sessions, fee in totals:
+                print(f"  {name}: {sessions} buổi, {format_currency(fee)}", file=out)
+            print(f"  Tổng: {sum(t[2] for t in totals)} buổi, {format_currency(sum(t[3] for t in totals))}", file=out)
+    return EXIT_FAILED if missing else EXIT_OK
+
+def cmd_export_pdf(db, args, out):
+    """Xuất PDF bảng lương của tháng cho từng người dùng vào thư mục con theo tên người dùng."""
+    from pdf_utils import export_batch_pdf, _safe_filename
+    from payroll_sheet import PayrollSheet
+    users, missing = select_users(db, args.user)
+    failed = len(missing)
+    for username in missing:
+        print(f"{username}: không tồn tại", file=sys.stderr)
+    # Một pool tiến trình cho tất cả người dùng thay vì khởi động lại cho mỗi người
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        for username in users:
+            sheets = []
+            for learner_id, month, year in db.get_payroll_keys(username, args.year, month=args.month):
+                sheet = PayrollSheet.load(db, username, month, year, learner_id)
+                sheets.append((month, year, sheet.data(), sheet.learner_name, sheet.sessions, sheet.fee))
+            if not sheets:
+                print(f"{username}: không có bảng lương tháng {args.month}/{args.year}", file=out)
+                continue
+            directory = os.path.join(args.output, _safe_filename(username)) if len(users) > 1 else args.output
+            os.makedirs(directory, exist_ok=True)
+            success, files = export_batch_pdf(username, sheets, directory, args.merged, pool=pool)
+            if success:
+                print(f"{username}: xuất {len(sheets)} bảng lương ra {len(files)} file tại {directory}", file=out)
+            else:
+                print(f"{username}: lỗi khi xuất PDF (xem logs/app.log)", file=sys.stderr)
+                failed += 1
+    return EXIT_FAILED if failed else EXIT_OK
+
+def cmd_report(db, args, out):
+    """Báo cáo thu nhập của từng người dùng (mặc định mọi năm có bảng lương), tùy chọn xuất PDF."""
+    from reports import EarningsReport
+    users, missing = select_users(db, args.user)
+    failed = len(missing)
+    for username in missing:
+        print(f"{username}: không tồn tại", file=sys.stderr)
+    reports = []
+    for username in users:
+        years = [year for year, _ in db.get_payroll_years(username, descending=False)]
+        if not years and (args.first_year is None or args.last_year is None):
+            print(f"{username}: không có bảng lương", file=out)
+            continue
+        first = args.first_year if args.first_year is not None else years[0]
+        last = args.last_year if args.last_year is not None else years[-1]
+        reports.append(EarningsReport.load(db, username, min(first, last), max(first, last)))
+    if args.format == "json":
+        json.dump([report.to_dict() for report in reports], out, ensure_ascii=False, indent=2)
+        out.write("\n")
+    else:
+        for report in reports:
+            print("\n".join(report.lines()), file=out)
+    if args.pdf:
+        from pdf_utils import export_report_pdf, report_filename
+        os.makedirs(args.pdf, exist_ok=True)
+        # Không ghi thêm dòng nào vào kết quả JSON
+        status = sys.stderr if args.format == "json" else out
+        for report in reports:
+            success, filename = export_report_pdf(report, os.path.join(args.pdf, report_filename(report)))
+            if success:
+                print(f"{report.username}: đã xuất {filename}", file=status)
+            else:
+                print(f"{report.username}: lỗi khi xuất PDF (xem logs/app.log)", file=sys.stderr)
+                failed += 1
+    return EXIT_FAILED if failed else EXIT_OK
+
+def cmd_export_data(db, args, out):
+    """Xuất dữ liệu (tất cả hoặc các --user) ra file JSON Lines nén gzip."""
+    from data_transfer import export_data
+    users, missing = select_users(db, args.user)
+    if missing:
+        print(f"Không tồn tại: {', '.join(missing)}", file=sys.stderr)
+        return EXIT_FAILED
+    counts = export_data(db.conn, args.file, args.user)
+    print(f"Đã xuất {len(users)} người dùng ra {args.file}: "
+          + ", ".join(f"{table} {count}" for table, count in counts.items()), file=out)
+    return EXIT_OK
+
+def cmd_import_data(db, args, out):
+    """Nhập file do export-data tạo, rồi chuyển bảng lương về kiểu lưu trữ đang dùng nếu cần."""
+    import sqlite3
+    from data_transfer import import_data, convert_storage
+    try:
+        result = import_data(db.conn, args.file, args.on_conflict)
+        converted = convert_storage(db)
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(f"Không nhập được {args.file}: {e}", file=sys.stderr)
+        return EXIT_FAILED
+    print(f"Đã nhập từ {args.file}: " + ", ".join(f"{table} {count}" for table, count in result["counts"].items()),
+          file=out)
+    if result["skipped"]:
+        print(f"Bỏ qua người dùng đã có dữ liệu: {', '.join(result['skipped'])}", file=out)
+    if result["replaced"]:
+        print(f"Đã ghi đè dữ liệu của: {', '.join(result['replaced'])}", file=out)
+    if converted:
+        print(f"Đã chuyển {converted} bảng lương sang kiểu lưu trữ đang dùng", file=out)
+    return EXIT_OK
+
+def cmd_backup(db, args, out):
+    """Sao lưu trực tuyến cơ sở dữ liệu (an toàn khi ứng dụng đang chạy) và áp dụng chính sách giữ lại."""
+    import sqlite3
+    from backup import create_backup
+
+    def progress(done, total):
+        if not args.quiet and sys.stderr.isatty():
+            print(f"\r{done}/{total} trang", end="", file=sys.stderr)
+
+    try:
+        path = create_backup(db.conn, args.dir, progress=progress)
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(f"Sao lưu thất bại: {e}", file=sys.stderr)
+        return EXIT_FAILED
+    if not args.quiet and sys.stderr.isatty():
+        print(file=sys.stderr)
+    print(f"Đã sao lưu vào {path}", file=out)
+    return EXIT_OK
+
+def cmd_list_backups(db, args, out):
+    """Liệt kê các bản sao lưu, mới nhất trước."""
+    from backup import list_backups
+    for path, taken, size in list_backups(args.dir):
+        print(f"{taken:%Y-%m-%d %H:%M:%S}  {size / 1024 / 1024:8.2f} MB  {path}", file=out)
+    return EXIT_OK
+
+def cmd_restore(db, args, out):
+    """Khôi phục một bản sao lưu sau khi kiểm tra toàn vẹn (dữ liệu hiện tại được sao lưu trước)."""
+    import sqlite3
+    from backup import restore_backup
+    if not args.yes:
+        print("Khôi phục sẽ thay toàn bộ dữ liệu hiện tại; thêm --yes để xác nhận.", file=sys.stderr)
+        return EXIT_USAGE
+    try:
+        previous = restore_backup(args.snapshot, db.conn, args.dir)
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(f"Khôi phục thất bại, dữ liệu hiện tại không thay đổi: {e}", file=sys.stderr)
+        return EXIT_FAILED
+    print(f"Đã khôi phục từ {args.snapshot}; dữ liệu trước đó được lưu tại {previous}", file=out)
+    return EXIT_OK
+
+def month_number(text):
+    """Kiểu tham số tháng (1-12)."""
+    month = int(text)
+    if not 1 <= month <= 12:
+        raise argparse.ArgumentTypeError("tháng phải từ 1 đến 12")
+    return month
+
+def build_parser():
+    """Bộ phân tích tham số dòng lệnh."""
+    today = date.today()
+    parser = argparse.ArgumentParser(prog="tutorpay --cli", description="Thao tác hàng loạt trên dữ liệu TutorPay.")
+    parser.add_argument("--db", help='đường dẫn cơ sở dữ liệu (mặc định như ứng dụng; ":memory:" hoặc ":temp:" để chạy thử)')
+    parser.add_argument("--quiet", action="store_true", help="chỉ in lỗi")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def add_period(command):
+        command.add_argument("--month", type=month_number, default=today.month)
+        command.add_argument("--year", type=int, default=today.year)
+
+    def add_users(command):
+        command.add_argument("--user", action="append", help="tên người dùng (lặp lại được); mặc định tất cả")
+
+    command = commands.add_parser("open-month", help="tạo bảng lương của tháng cho mọi người học")
+    add_period(command)
+    add_users(command)
+    command.set_defaults(run=cmd_open_month)
+
+    command = commands.add_parser("import-attendance", help="nhập điểm danh từ file CSV")
+    command.add_argument("file", help="file CSV với các cột learner,date,attended[,salary]")
+    command.add_argument("--user", required=True, help="người dùng sở hữu các người học")
+    command.add_argument("--dry-run", action="store_true", help="chỉ so sánh với dữ liệu hiện có và in báo cáo, không ghi")
+    command.add_argument("--chunk", type=int, default=CHUNK_ROWS, help="số dòng mỗi lô (mỗi lô một giao dịch)")
+    command.set_defaults(run=cmd_import_attendance)
+
+    command = commands.add_parser("totals", help="tổng buổi và tổng phí của tháng")
+    add_period(command)
+    add_users(command)
+    command.add_argument("--format", choices=("text", "csv", "json"), default="text")
+    command.set_defaults(run=cmd_totals)
+
+    command = commands.add_parser("export-pdf", help="xuất PDF bảng lương của tháng")
+    add_period(command)
+    add_users(command)
+    command.add_argument("--output", required=True, help="thư mục lưu PDF (mỗi người dùng một thư mục con)")
+    command.add_argument("--merged", action="store_true", help="gộp bảng lương của mỗi người dùng vào một file")
+    command.add_argument("--workers", type=int, default=None, help="số tiến trình tạo PDF (mặc định số nhân CPU)")
+    command.set_defaults(run=cmd_export_pdf)
+
+    command = commands.add_parser("report", help="báo cáo thu nhập theo năm, quý, tháng và người học")
+    command.add_argument("--from", dest="first_year", type=int, help="năm đầu (mặc định năm đầu tiên có bảng lương)")
+    command.add_argument("--to", dest="last_year", type=int, help="năm cuối (mặc định năm gần nhất có bảng lương)")
+    add_users(command)
+    command.add_argument("--format", choices=("text", "json"), default="text")
+    command.add_argument("--pdf", metavar="DIR", help="xuất thêm báo cáo PDF của mỗi người dùng vào thư mục")
+    command.set_defaults(run=cmd_report)
+
+    command = commands.add_parser("export-data", help="xuất dữ liệu ra file JSON Lines nén (.jsonl.gz) để chuyển máy")
+    command.add_argument("file", help="file đích, ví dụ tutorpay.jsonl.gz")
+    add_users(command)
+    command.set_defaults(run=cmd_export_data)
+
+    command = commands.add_parser("import-data", help="nhập file do export-data tạo")
+    command.add_argument("file")
+    command.add_argument("--on-conflict", choices=("error", "skip", "replace"), default="error",
+                         help="khi người dùng trong file đã có dữ liệu: báo lỗi (mặc định), bỏ qua hoặc ghi đè")
+    command.set_defaults(run=cmd_import_data)
+
+    command = commands.add_parser("backup", help="sao lưu cơ sở dữ liệu (chạy được khi ứng dụng đang mở)")
+    command.add_argument("--dir", help="thư mục sao lưu (mặc định như settings.json)")
+    command.set_defaults(run=cmd_backup)
+
+    command = commands.add_parser("list-backups", help="liệt kê các bản sao lưu")
+    command.add_argument("--dir", help="thư mục sao lưu (mặc định như settings.json)")
+    command.set_defaults(run=cmd_list_backups)
+
+    command = commands.add_parser("restore", help="khôi phục một bản sao lưu sau khi kiểm tra toàn vẹn")
+    command.add_argument("snapshot", help="file .db.gz do lệnh backup tạo")
+    command.add_argument("--dir", help="thư mục lưu bản sao lưu dữ liệu hiện tại trước khi khôi phục")
+    command.add_argument("--yes", action="store_true", help="xác nhận thay toàn bộ dữ liệu hiện tại")
+    command.set_defaults(run=cmd_restore)
+    return parser
+
+def main(argv=None):
+    """Chạy một lệnh, trả về mã thoát."""
+    try:
+        args = build_parser().parse_args(argv)
+    except SystemExit as e:
+        return e.code if isinstance(e.code, int) else EXIT_USAGE
+    if args.db:
+        # Phải đặt trước khi mở kết nối đầu tiên (xem database.resolve_db_path)
+        os.environ["TUTORPAY_DB"] = args.db
+    from database import open_database
+    db = open_database()
+    out = open(os.devnull, "w", encoding="utf-8") if args.quiet else sys.stdout
+    try:
+        return args.run(db, args, out)
+    except Exception as e:
+        logging.exception(f"Lỗi khi chạy lệnh {args.command}: {e}")
+        print(f"Lỗi: {e}", file=sys.stderr)
+        return EXIT_FAILED
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,248 @@
+import base64
+import gzip
+import json
+import logging
+from datetime import datetime
+from database import pause_summary_triggers
+from migrations import SCHEMA_VERSION
+
+# Xuất/nhập toàn bộ dữ liệu (hoặc dữ liệu của một số người dùng) dạng JSON Lines nén gzip để chuyển máy.
+# Cấu trúc file, mỗi dòng một giá trị JSON:
+#   {"format": "tutorpay-export", "version": 1, "schema": ..., "users": [...] hoặc null, "created": ...}
+#   {"table": "learners", "columns": [...]}      tiêu đề của mỗi bảng, theo sau là các dòng dạng mảng
+#   [1, "Nguyễn Văn An", "user001"]
+#   ...
+#   {"end": true, "counts": {"learners": ..., ...}}   dòng cuối; thiếu dòng này nghĩa là file bị cắt
+# Khi xuất, mỗi bảng được đọc theo từng lô bằng fetchmany trong một giao dịch đọc (ảnh chụp nhất quán,
+# ứng dụng vẫn ghi được nhờ WAL). Khi nhập, toàn bộ file được ghi trong một giao dịch: chỉ mục phụ được
+# xóa trước và tạo lại sau khi nạp, trigger tóm tắt được tạm dừng vì payroll_sum có sẵn trong file.
+
+FORMAT = "tutorpay-export"
+FORMAT_VERSION = 1
+
+# Số dòng mỗi lần fetchmany khi xuất và mỗi lần executemany khi nhập
+BATCH_ROWS = 10000
+
+# Các bảng theo thứ tự xuất/nhập và các cột được chuyển. id của users và payroll không được giữ
+# (các bảng khác tham chiếu người dùng theo username); id của learners được giữ, dời đi nếu trùng.
+TABLES = [
+    ("users", ("username", "fullname", "password")),
+    ("learners", ("id", "name", "username")),
+    ("payroll_sheets", ("username", "learner_id", "month", "year")),
+    ("payroll", ("username", "month", "year", "learner_id", "day", "checked", "salary")),
+    ("payroll_sum", ("username", "month", "year", "learner_id", "sessions", "fee")),
+    ("payroll_compact", ("username", "month", "year", "learner_id", "mask", "salary", "salaries", "sessions", "fee")),
+]
+
+# Cột BLOB được ghi dạng base64
+BLOB_COLUMNS = {("payroll_compact", "salaries")}
+
+# Chính sách khi người dùng trong file đã có dữ liệu trong cơ sở dữ liệu đích
+CONFLICT_ERROR = "error"
+CONFLICT_SKIP = "skip"
+CONFLICT_REPLACE = "replace"
+
+def _dumps(value):
+    """JSON gọn trên một dòng, giữ nguyên chữ tiếng Việt."""
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+def export_data(conn, path, usernames=None, batch_rows=BATCH_ROWS):
+    """
+    Xuất dữ liệu của usernames (mặc định tất cả người dùng) ra file JSON Lines nén gzip tại path.
+    Trả về số dòng đã xuất của từng bảng.
+    """
+    counts = {}
+    where, params = "", []
+    if usernames:
+        where = f" WHERE username IN ({', '.join('?' for _ in usernames)})"
+        params = list(usernames)
+    if conn.in_transaction:
+        conn.commit()
+    cursor = conn.cursor()
+    cursor.execute("BEGIN")
+    try:
+        with gzip.open(path, "wt", encoding="utf-8", compresslevel=6) as f:
+            f.write(_dumps({"format": FORMAT, "version": FORMAT_VERSION, "schema": SCHEMA_VERSION,
+                            "users": list(usernames) if usernames else None,
+                            "created": datetime.now().isoformat(timespec="seconds")}) + "\n")
+            for table, columns in TABLES:
+                blobs = [i for i, column in enumerate(columns) if (table, column) in BLOB_COLUMNS]
+                f.write(_dumps({"table": table, "columns": list(columns)}) + "\n")
+                cursor.execute(f"SELECT {', '.join(columns)} FROM {table}{where}", params)
+                counts[table] = 0
+                for rows in iter(lambda: cursor.fetchmany(batch_rows), []):
+                    if blobs:
+                        rows = [_encode_blobs(row, blobs) for row in rows]
+                    f.write("\n".join(map(_dumps, rows)) + "\n")
+                    counts[table] += len(rows)
+            f.write(_dumps({"end": True, "counts": counts}) + "\n")
+    finally:
+        conn.rollback()
+    logging.info(f"Đã xuất dữ liệu {'của ' + ', '.join(usernames) if usernames else 'toàn bộ'} ra {path}: {counts}")
+    return counts
+
+def _encode_blobs(row, blobs):
+    """Đổi các cột BLOB của một dòng sang chuỗi base64."""
+    row = list(row)
+    for i in blobs:
+        if row[i] is not None:
+            row[i] = base64.b64encode(row[i]).decode("ascii")
+    return row
+
+def _decode_blobs(row, blobs):
+    """Đổi các cột base64 của một dòng về BLOB."""
+    for i in blobs:
+        if row[i] is not None:
+            row[i] = base64.b64decode(row[i])
+    return row
+
+def _read_lines(f):
+    """Đọc từng giá trị JSON của file (bỏ dòng trống)."""
+    for number, line in enumerate(f, 1):
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"dòng {number} không phải JSON hợp lệ: {e}") from None
+
+def _deferred_indexes(cursor, tables):
+    """Xóa các chỉ mục phụ (không phải ràng buộc UNIQUE/PRIMARY KEY) của tables; trả về câu lệnh để tạo lại."""
+    cursor.execute(f'''
+        SELECT name, sql FROM sqlite_master
+        WHERE type = 'index' AND sql IS NOT NULL AND tbl_name IN ({', '.join('?' for _ in tables)})
+    ''', list(tables))
+    indexes = cursor.fetchall()
+    for name, _ in indexes:
+        cursor.execute(f'DROP INDEX "{name}"')
+    return [sql for _, sql in indexes]
+
+def _delete_user_data(cursor, username):
+    """Xóa người học và bảng lương của một người dùng (giữ tài khoản) để thay bằng dữ liệu trong file."""
+    for table in ("payroll", "payroll_sum", "payroll_compact", "payroll_sheets", "learners"):
+        cursor.execute(f"DELETE FROM {table} WHERE username = ?", (username,))
+
+class _Importer:
+    """Trạng thái của một lần nhập: người dùng bỏ qua, độ dời id người học, số dòng đã ghi."""
+
+    def __init__(self, cursor, on_conflict):
+        self.cursor = cursor
+        self.on_conflict = on_conflict
+        self.skipped = set()
+        self.replaced = []
+        self.counts = {}
+        self.learner_shift = None
+
+    def check_user(self, username):
+        """Xử lý người dùng đã tồn tại: tài khoản chưa có người học được ghi đè, còn lại theo on_conflict."""
+        self.cursor.execute("SELECT EXISTS (SELECT 1 FROM learners WHERE username = ?)", (username,))
+        if not self.cursor.fetchone()[0]:
+            return True
+        if self.on_conflict == CONFLICT_SKIP:
+            self.skipped.add(username)
+            return False
+        if self.on_conflict == CONFLICT_REPLACE:
+            _delete_user_data(self.cursor, username)
+            self.replaced.append(username)
+            return True
+        raise ValueError(f"người dùng {username} đã có dữ liệu (chọn ghi đè hoặc bỏ qua người dùng đã có)")
+
+    def shift_for_learners(self):
+        """
+        Độ dời id người học, tính một lần trước lô người học đầu tiên: giữ nguyên id khi cơ sở dữ liệu đích
+        chưa có người học, ngược lại dời toàn bộ id trong file lên sau id lớn nhất hiện có.
+        """
+        if self.learner_shift is None:
+            self.cursor.execute("SELECT COALESCE(MAX(id), 0) FROM learners")
+            self.learner_shift = self.cursor.fetchone()[0]
+        return self.learner_shift
+
+    def write(self, table, columns, rows):
+        """Ghi một lô dòng của table (đã bỏ các dòng của người dùng bị bỏ qua)."""
+        if self.skipped:
+            user_col = columns.index("username")
+            rows = [row for row in rows if row[user_col] not in self.skipped]
+        if not rows:
+            return
+        if table == "users":
+            rows = [row for row in rows if self.check_user(row[0])]
+            self.cursor.executemany('''
+                INSERT INTO users (username, fullname, password) VALUES (?, ?, ?)
+                ON CONFLICT (username) DO UPDATE SET fullname = excluded.fullname, password = excluded.password
+            ''', rows)
+        else:
+            id_col = columns.index("id" if table == "learners" else "learner_id")
+            shift = self.shift_for_learners() if table == "learners" else self.learner_shift or 0
+            if shift:
+                for row in rows:
+                    row[id_col] += shift
+            self.cursor.executemany(
+                f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})", rows)
+        self.counts[table] = self.counts.get(table, 0) + len(rows)
+
+def import_data(conn, path, on_conflict=CONFLICT_ERROR, batch_rows=BATCH_ROWS):
+    """
+    Nhập file do export_data tạo vào cơ sở dữ liệu của conn trong một giao dịch; lỗi ở bất kỳ đâu
+    (kể cả file bị cắt) thì không có gì được ghi. Người dùng chưa có sẽ được tạo; người dùng đã có người học
+    được xử lý theo on_conflict ("error", "skip" hoặc "replace").
+    Trả về {"counts": số dòng đã ghi của từng bảng, "skipped": [...], "replaced": [...]}.
+    ValueError nếu file không hợp lệ hoặc có xung đột; sqlite3.Error nếu ghi thất bại.
+    """
+    known = dict(TABLES)
+    if conn.in_transaction:
+        conn.commit()
+    cursor = conn.cursor()
+    importer = _Importer(cursor, on_conflict)
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        lines = _read_lines(f)
+        header = next(lines, None)
+        if not isinstance(header, dict) or header.get("format") != FORMAT:
+            raise ValueError("không phải file xuất dữ liệu TutorPay")
+        if header.get("version", 0) > FORMAT_VERSION:
+            raise ValueError(f"file được tạo bởi phiên bản mới hơn (định dạng {header['version']})")
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            indexes = _deferred_indexes(cursor, [table for table, _ in TABLES])
+            table, columns, blobs, batch, ended = None, None, [], [], False
+            with pause_summary_triggers(cursor):
+                for value in lines:
+                    if isinstance(value, list):
+                        if table is None:
+                            raise ValueError("dòng dữ liệu nằm ngoài bảng")
+                        batch.append(_decode_blobs(value, blobs) if blobs else value)
+                        if len(batch) >= batch_rows:
+                            importer.write(table, columns, batch)
+                            batch = []
+                        continue
+                    if batch:
+                        importer.write(table, columns, batch)
+                        batch = []
+                    if value.get("end"):
+                        ended = True
+                        break
+                    table, columns = value["table"], tuple(value["columns"])
+                    if known.get(table) != columns:
+                        raise ValueError(f"bảng hoặc cột không được hỗ trợ: {table} {columns}")
+                    blobs = [i for i, column in enumerate(columns) if (table, column) in BLOB_COLUMNS]
+            if not ended:
+                raise ValueError("file không đầy đủ (thiếu dòng kết thúc)")
+            for sql in indexes:
+                cursor.execute(sql)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    logging.info(f"Đã nhập dữ liệu từ {path}: {importer.counts}, bỏ qua {sorted(importer.skipped)}, "
+                 f"ghi đè {importer.replaced}")
+    return {"counts": importer.counts, "skipped": sorted(importer.skipped), "replaced": importer.replaced}
+
+def convert_storage(db):
+    """
+    Đưa dữ liệu vừa nhập về kiểu lưu trữ của db: file xuất từ máy dùng kiểu khác chứa bảng lương
+    ở payroll hoặc payroll_compact. Trả về số bảng lương đã chuyển.
+    """
+    from payroll_compact import CompactDatabase, migrate_to_compact, migrate_to_rows
+    compact = isinstance(db, CompactDatabase)
+    db.cursor.execute(f"SELECT EXISTS (SELECT 1 FROM {'payroll' if compact else 'payroll_compact'})")
+    if not db.cursor.fetchone()[0]:
+        return 0
+    return migrate_to_compact(db.conn) if compact else migrate_to_rows(db.conn)
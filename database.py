@@ -1,11 +1,19 @@
 import sqlite3
 import os
-from pathlib import Path
+import atexit
+import shutil
+import tempfile
+import threading
 import logging
 from calendar import monthrange
+from contextlib import contextmanager
+from settings import APP_DATA_DIR, load_settings
+from migrations import migrate
+from search import register_functions, like_patterns, parse_payroll_query
+from diagnostics import InstrumentedConnection, instrument_methods, get_stats
 
 # Thiết lập logging để ghi lại các sự kiện và lỗi
-log_dir = os.path.join(Path.home(), "AppData", "Local", "TutorPay", "logs")
+log_dir = os.path.join(APP_DATA_DIR, "logs")
 os.makedirs(log_dir, exist_ok=True)
 logging.basicConfig(
     filename=os.path.join(log_dir, "app.log"),
@@ -13,77 +21,206 @@ logging.basicConfig(
     format='%(asctime)s - %(levelname)s - %(message)s',
 )
 
+DB_PATH = os.path.join(APP_DATA_DIR, "tutorpay.db")
+
+# Vị trí đặc biệt của cơ sở dữ liệu (dùng cho kiểm thử, đo hiệu năng hoặc chạy thử không ghi dữ liệu thật):
+# - ":memory:": cơ sở dữ liệu trong bộ nhớ, mất khi đóng kết nối cuối cùng
+# - ":temp:": file tạm trong thư mục tạm của hệ thống, bị xóa khi thoát
+MEMORY_DB = ":memory:"
+TEMP_DB = ":temp:"
+
+# Cấu hình hiệu năng SQLite, áp dụng khi mở kết nối.
+# - safe: WAL + synchronous=FULL, không mất giao dịch đã commit kể cả khi mất điện
+# - fast: WAL + synchronous=NORMAL, cache lớn và mmap; chỉ có thể mất giao dịch cuối khi mất điện
+PERFORMANCE_PROFILES = {
+    "safe": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "cache_size": -8000,
+        "mmap_size": 0,
+        "temp_store": "DEFAULT",
+        "busy_timeout": 5000,
+    },
+    "fast": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -32000,
+        "mmap_size": 268435456,
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,
+    },
+}
+
+# Giá trị hợp lệ cho các pragma dạng chuỗi (các pragma còn lại nhận số nguyên)
+PRAGMA_CHOICES = {
+    "journal_mode": {"DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"},
+    "synchronous": {"OFF", "NORMAL", "FULL", "EXTRA"},
+    "temp_store": {"DEFAULT", "FILE", "MEMORY"},
+}
+
+def resolve_profile(settings=None):
+    """Lấy các pragma của cấu hình hiệu năng trong settings.json, kèm các giá trị ghi đè trong 'sqlite_pragmas'."""
+    settings = settings if settings is not None else load_settings()
+    name = settings.get("performance_profile", "safe")
+    if name not in PERFORMANCE_PROFILES:
+        logging.warning(f"Cấu hình hiệu năng không hợp lệ: {name}. Sử dụng cấu hình 'safe'.")
+        name = "safe"
+    pragmas = dict(PERFORMANCE_PROFILES[name])
+    pragmas.update(settings.get("sqlite_pragmas") or {})
+    return pragmas
+
+def apply_profile(conn, pragmas):
+    """Áp dụng các pragma hiệu năng cho kết nối, bỏ qua giá trị không hợp lệ."""
+    for name, value in pragmas.items():
+        if name in PRAGMA_CHOICES:
+            value = str(value).upper()
+            if value not in PRAGMA_CHOICES[name]:
+                logging.warning(f"Giá trị pragma không hợp lệ: {name}={value}")
+                continue
+        elif name in ("cache_size", "mmap_size", "busy_timeout"):
+            try:
+                value = int(value)
+            except (TypeError, ValueError):
+                logging.warning(f"Giá trị pragma không hợp lệ: {name}={value}")
+                continue
+        else:
+            logging.warning(f"Pragma không được hỗ trợ: {name}")
+            continue
+        conn.execute(f"PRAGMA {name} = {value}")
+
+def resolve_db_path(settings=None):
+    """
+    Vị trí cơ sở dữ liệu: biến môi trường TUTORPAY_DB, rồi 'database_path' trong settings.json,
+    mặc định DB_PATH. Chấp nhận đường dẫn file, ":memory:" hoặc ":temp:".
+    """
+    settings = settings if settings is not None else load_settings()
+    return os.path.expanduser(os.environ.get("TUTORPAY_DB") or settings.get("database_path") or DB_PATH)
+
+class ConnectionManager:
+    """Quản lý kết nối SQLite dùng chung cho toàn tiến trình: mỗi luồng một kết nối, đóng tất cả khi thoát."""
+
+    def __init__(self, path, pragmas=None, stats=None):
+        self.uri = None
+        if path == TEMP_DB:
+            temp_dir = tempfile.mkdtemp(prefix="tutorpay-")
+            path = os.path.join(temp_dir, "tutorpay.db")
+            # Đăng ký trước close_all nên chạy sau nó khi thoát (atexit chạy theo thứ tự ngược)
+            atexit.register(shutil.rmtree, temp_dir, True)
+        elif path == MEMORY_DB:
+            # Mỗi luồng một kết nối: dùng bộ nhớ chia sẻ có tên riêng để các kết nối cùng thấy một cơ sở dữ liệu
+            self.uri = f"file:tutorpay-{id(self)}?mode=memory&cache=shared"
+        self.path = path
+        self.pragmas = pragmas if pragmas is not None else resolve_profile()
+        # Bộ thu thập thống kê truy vấn (diagnostics.QueryStats) khi bật chẩn đoán, None nếu tắt
+        self.query_stats = stats
+        self.open_count = 0
+        self.close_count = 0
+        self.prepared_schemas = set()
+        self._connections = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def get(self):
+        """Lấy kết nối của luồng hiện tại, mở mới nếu luồng chưa có."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # check_same_thread=False chỉ để close_all() có thể đóng kết nối của luồng khác khi thoát
+            factory = InstrumentedConnection if self.query_stats is not None else sqlite3.Connection
+            conn = sqlite3.connect(self.uri or self.path, uri=self.uri is not None, check_same_thread=False,
+                                   factory=factory)
+            if self.query_stats is not None:
+                conn.stats = self.query_stats
+            apply_profile(conn, self.pragmas)
+            register_functions(conn)
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+                self.open_count += 1
+            logging.info(f"Đã mở kết nối cơ sở dữ liệu ({threading.current_thread().name}).")
+        return conn
+
+    def close_all(self):
+        """Đóng tất cả các kết nối đang mở."""
+        with self._lock:
+            connections, self._connections = self._connections, []
+            for conn in connections:
+                try:
+                    conn.close()
+                    self.close_count += 1
+                except sqlite3.Error as e:
+                    logging.error(f"Lỗi khi đóng kết nối cơ sở dữ liệu: {e}")
+            self._local = threading.local()
+            self.prepared_schemas.clear()
+        if connections:
+            logging.info(f"Đã đóng kết nối cơ sở dữ liệu: {self.stats()}")
+
+    def stats(self):
+        """Thống kê số lần mở, đóng và số kết nối đang mở."""
+        with self._lock:
+            return {"open": self.open_count, "close": self.close_count, "active": len(self._connections)}
+
+@contextmanager
+def pause_summary_triggers(cursor):
+    """
+    Tạm dừng trigger của payroll_sum trong giao dịch đang mở của cursor bằng một dòng trong payroll_sum_pause;
+    dòng được xóa trước khi giao dịch kết thúc nên kết nối khác không bị ảnh hưởng. Người gọi tự tính lại tóm tắt.
+    """
+    cursor.execute("INSERT INTO payroll_sum_pause (paused) VALUES (1)")
+    try:
+        yield
+    finally:
+        cursor.execute("DELETE FROM payroll_sum_pause")
+
+_manager = None
+_manager_lock = threading.Lock()
+
+def get_connection_manager():
+    """Lấy trình quản lý kết nối dùng chung, tạo mới ở lần gọi đầu tiên."""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            path = resolve_db_path()
+            if path not in (MEMORY_DB, TEMP_DB):
+                os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            _manager = ConnectionManager(path, stats=get_stats())
+            atexit.register(_manager.close_all)
+        return _manager
+
 class Database:
-    def __init__(self):
-        """Khởi tạo kết nối cơ sở dữ liệu và tạo thư mục lưu trữ."""
-        app_data_dir = os.path.join(Path.home(), "AppData", "Local", "TutorPay")
-        os.makedirs(app_data_dir, exist_ok=True)
-        self.conn = sqlite3.connect(os.path.join(app_data_dir, "tutorpay.db"))
+    # Bảng tóm tắt theo (người dùng, người học, tháng) với tổng buổi và tổng phí, luôn được cập nhật khi ghi
+    # (trigger của payroll_sum); các truy vấn báo cáo thu nhập chỉ đọc bảng này. CompactDatabase dùng payroll_compact.
+    SUMMARY_TABLE = "payroll_sum"
+
+    def __init__(self, manager=None):
+        """Lấy kết nối dùng chung từ trình quản lý kết nối; chỉ kiểm tra lược đồ ở lần đầu trong tiến trình."""
+        self.manager = manager or get_connection_manager()
+        self.conn = self.manager.get()
         self.cursor = self.conn.cursor()
-        self.create_tables()
+        if self.manager.query_stats is not None:
+            instrument_methods(self, self.manager.query_stats)
+        if type(self) not in self.manager.prepared_schemas:
+            self.create_tables()
+            self.manager.prepared_schemas.add(type(self))
 
     def create_tables(self):
-        """Tạo các bảng trong cơ sở dữ liệu nếu chưa tồn tại."""
-        cursor = self.conn.cursor()
-        # Bảng users: lưu thông tin người dùng
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT NOT NULL UNIQUE,
-                fullname TEXT NOT NULL,
-                password TEXT NOT NULL
-            )
-        ''')
-
-        # Tạo tài khoản admin mặc định
-        cursor.execute('''
-            INSERT OR IGNORE INTO users (username, fullname, password)
-            VALUES (?, ?, ?)
-        ''', ('admin', 'Administrator', '123'))
-        
-        # Bảng learners: lưu thông tin người học
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS learners (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                username TEXT,
-                FOREIGN KEY (username) REFERENCES users(username) ON DELETE CASCADE
-            )
-        ''')
-
-        # Bảng payroll: lưu chi tiết bảng lương (ngày, trạng thái điểm danh, lương mỗi ngày)
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS payroll (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT,
-                month INTEGER,
-                year INTEGER,
-                learner_id INTEGER,
-                day TEXT,
-                checked INTEGER,
-                salary INTEGER DEFAULT 0,
-                UNIQUE(username, month, year, learner_id, day),
-                FOREIGN KEY (username) REFERENCES users(username) ON DELETE CASCADE,
-                FOREIGN KEY (learner_id) REFERENCES learners(id) ON DELETE CASCADE
-            )
-        ''')
-
-        # Bảng payroll_sum: lưu tóm tắt bảng lương (tổng buổi, tổng phí)
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS payroll_sum (
-                username TEXT,
-                month INTEGER,
-                year INTEGER,
-                learner_id INTEGER,
-                sessions INTEGER,
-                fee INTEGER DEFAULT 0,
-                UNIQUE(username, month, year, learner_id),
-                FOREIGN KEY (username) REFERENCES users(username) ON DELETE CASCADE,
-                FOREIGN KEY (learner_id) REFERENCES learners(id) ON DELETE CASCADE
-            )
-        ''')
-        self.conn.commit()
-        logging.info("Cơ sở dữ liệu đã được tạo và tài khoản admin được khởi tạo.")
+        """Tạo hoặc cập nhật lược đồ cơ sở dữ liệu (xem migrations.py) và sửa tóm tắt của lần nhập bị ngắt."""
+        migrate(self.conn)
+        self.repair_summaries()
+
+    def repair_summaries(self):
+        """
+        Tính lại tóm tắt của các bảng lương còn đánh dấu trong payroll_sum_dirty (lần nhập điểm danh trước
+        bị ngắt trước khi kịp gọi refresh_summaries). Trả về số bảng lương đã sửa.
+        """
+        self.cursor.execute("SELECT username, month, year, learner_id FROM payroll_sum_dirty")
+        dirty = {}
+        for username, month, year, learner_id in self.cursor.fetchall():
+            dirty.setdefault(username, []).append((month, year, learner_id))
+        for username, sheets in dirty.items():
+            logging.warning(f"Tóm tắt của {len(sheets)} bảng lương của {username} chưa được tính lại "
+                            f"sau lần nhập điểm danh trước, đang tính lại.")
+            self.refresh_summaries(username, sheets)
+        return sum(len(sheets) for sheets in dirty.values())
 
     def register_user(self, username, fullname, password):
         """Đăng ký người dùng mới."""
@@ -118,6 +255,23 @@ class Database:
         self.cursor.execute('SELECT id, name FROM learners WHERE username = ?', (username,))
         return self.cursor.fetchall()
 
+    def search_learners(self, username, query, limit=-1):
+        """
+        Tìm người học theo tên, không phân biệt dấu (chỉ mục learner_search).
+        Từ khóa rỗng trả về tất cả; limit âm nghĩa là không giới hạn.
+        """
+        patterns = like_patterns(query)
+        if not patterns:
+            self.cursor.execute('SELECT id, name FROM learners WHERE username = ? ORDER BY id LIMIT ?', (username, limit))
+            return self.cursor.fetchall()
+        self.cursor.execute(f'''
+            SELECT id, name FROM learners
+            WHERE username = ? AND id IN (SELECT rowid FROM learner_search WHERE {" AND ".join("name LIKE ?" for _ in patterns)})
+            ORDER BY id
+            LIMIT ?
+        ''', [username, *patterns, limit])
+        return self.cursor.fetchall()
+
     def update_learner(self, learner_id, name):
         """Cập nhật tên người học."""
         self.cursor.execute('UPDATE learners SET name = ? WHERE id = ?', (name, learner_id))
@@ -131,50 +285,317 @@ class Database:
     def create_payroll(self, username, month, year, learner_id):
         """Tạo bảng lương mới cho người học trong tháng/năm cụ thể."""
         try:
-            self.cursor.execute("SELECT id FROM payroll WHERE username = ? AND month = ? AND year = ? AND learner_id = ?",
-                               (username, month, year, learner_id))
-            if self.cursor.fetchone():
+            if not self.add_payroll_sheet(username, month, year, learner_id):
                 return False
-            _, days = monthrange(year, month)
-            for day in range(1, days + 1):
-                day_str = f"{day}/{month}"
-                self.cursor.execute("INSERT INTO payroll (username, month, year, learner_id, day, checked, salary) "
-                                   "VALUES (?, ?, ?, ?, ?, ?, ?)",
-                                   (username, month, year, learner_id, day_str, 0, 0))
-            self.cursor.execute("INSERT OR REPLACE INTO payroll_sum (username, month, year, learner_id, sessions, fee) "
-                               "VALUES (?, ?, ?, ?, ?, ?)",
-                               (username, month, year, learner_id, 0, 0))
+            self._create_sheet_rows(username, month, year, [learner_id])
             self.conn.commit()
             logging.info(f"Đã tạo bảng lương cho {username} - {month}/{year} - Người học ID: {learner_id}")
             return True
         except sqlite3.Error as e:
+            self.conn.rollback()
             logging.error(f"Lỗi khi tạo bảng lương: {e}")
             return False
 
+    def open_month(self, username, month, year, learner_ids=None):
+        """
+        Mở tháng: tạo bảng lương cho tất cả người học của người dùng (hoặc chỉ learner_ids)
+        trong một giao dịch. Trả về (số bảng lương đã tạo, số bảng lương đã tồn tại nên bỏ qua),
+        hoặc None nếu có lỗi.
+        """
+        try:
+            # Một truy vấn cho biết người học nào đã có bảng lương của tháng này
+            self.cursor.execute('''
+                SELECT l.id, s.learner_id IS NOT NULL
+                FROM learners l
+                LEFT JOIN payroll_sheets s
+                    ON s.username = l.username AND s.learner_id = l.id AND s.year = ? AND s.month = ?
+                WHERE l.username = ?
+            ''', (year, month, username))
+            wanted = set(learner_ids) if learner_ids is not None else None
+            created, skipped = [], 0
+            for learner_id, exists in self.cursor.fetchall():
+                if wanted is not None and learner_id not in wanted:
+                    continue
+                if exists:
+                    skipped += 1
+                else:
+                    created.append(learner_id)
+            if created:
+                self.cursor.executemany('''
+                    INSERT INTO payroll_sheets (username, learner_id, month, year)
+                    VALUES (?, ?, ?, ?)
+                ''', [(username, learner_id, month, year) for learner_id in created])
+                self._create_sheet_rows(username, month, year, created)
+            self.conn.commit()
+            logging.info(f"Mở tháng {month}/{year} cho {username}: tạo {len(created)} bảng lương, bỏ qua {skipped}")
+            return len(created), skipped
+        except sqlite3.Error as e:
+            self.conn.rollback()
+            logging.error(f"Lỗi khi mở tháng: {e}")
+            return None
+
+    def _create_sheet_rows(self, username, month, year, learner_ids):
+        """Thêm các ngày của tháng cho từng người học (không commit), dãy ngày sinh ngay trong SQLite."""
+        _, days = monthrange(year, month)
+        self.cursor.executemany('''
+            WITH RECURSIVE days(d) AS (SELECT 1 UNION ALL SELECT d + 1 FROM days WHERE d < ?)
+            INSERT INTO payroll (username, month, year, learner_id, day, checked, salary)
+            SELECT ?, ?, ?, ?, d || '/' || ?, 0, 0 FROM days
+        ''', [(days, username, month, year, learner_id, month) for learner_id in learner_ids])
+
+    def add_payroll_sheet(self, username, month, year, learner_id):
+        """Thêm dòng tiêu đề bảng lương (không commit). Trả về False nếu bảng lương đã tồn tại."""
+        self.cursor.execute('''
+            INSERT OR IGNORE INTO payroll_sheets (username, learner_id, month, year)
+            VALUES (?, ?, ?, ?)
+        ''', (username, learner_id, month, year))
+        return self.cursor.rowcount == 1
+
+    def remove_payroll_sheet(self, username, month, year, learner_id):
+        """Xóa dòng tiêu đề bảng lương (không commit)."""
+        self.cursor.execute('''
+            DELETE FROM payroll_sheets
+            WHERE username = ? AND learner_id = ? AND year = ? AND month = ?
+        ''', (username, learner_id, year, month))
+
     def get_payrolls(self, username):
-        """Lấy danh sách bảng lương của người dùng."""
+        """Lấy danh sách bảng lương của người dùng từ bảng tiêu đề payroll_sheets."""
         self.cursor.execute('''
-            SELECT DISTINCT p.month, p.year, l.name, p.learner_id
-            FROM payroll p
-            JOIN learners l ON p.learner_id = l.id
-            WHERE p.username = ?
-            ORDER BY p.year DESC, p.month DESC
+            SELECT s.month, s.year, l.name, s.learner_id
+            FROM payroll_sheets s
+            JOIN learners l ON s.learner_id = l.id
+            WHERE s.username = ?
+            ORDER BY s.year DESC, s.month DESC
+        ''', (username,))
+        return self.cursor.fetchall()
+
+    def get_payroll_years(self, username, descending=True):
+        """Danh sách (năm, số bảng lương) của người dùng, đọc từ chỉ mục idx_payroll_sheets_list."""
+        order = "DESC" if descending else "ASC"
+        self.cursor.execute(f'''
+            SELECT year, COUNT(*) FROM payroll_sheets
+            WHERE username = ?
+            GROUP BY year
+            ORDER BY year {order}
         ''', (username,))
         return self.cursor.fetchall()
 
+    def get_payroll_months(self, username, year, descending=True):
+        """Danh sách (tháng, số bảng lương) của người dùng trong một năm."""
+        order = "DESC" if descending else "ASC"
+        self.cursor.execute(f'''
+            SELECT month, COUNT(*) FROM payroll_sheets
+            WHERE username = ? AND year = ?
+            GROUP BY month
+            ORDER BY month {order}
+        ''', (username, year))
+        return self.cursor.fetchall()
+
+    def get_payroll_page(self, username, year=None, month=None, query=None, after=None, limit=50, descending=False):
+        """
+        Lấy một trang bảng lương (tháng, năm, tên người học, learner_id), sắp theo tên người học.
+        Phân trang theo khóa (keyset): after là khóa (tên, learner_id, năm, tháng) của dòng cuối
+        trang trước, nên mỗi trang chỉ đọc đúng limit dòng dù người dùng có nhiều năm dữ liệu.
+        Có thể lọc theo năm, tháng và từ khóa tìm kiếm (tên người học không dấu và/hoặc 'tháng/năm',
+        xem search.parse_payroll_query).
+        """
+        conditions = ["s.username = ?"]
+        params = [username]
+        if year is not None:
+            conditions.append("s.year = ?")
+            params.append(year)
+        if month is not None:
+            conditions.append("s.month = ?")
+            params.append(month)
+        if query:
+            # Tháng/năm trong từ khóa lọc theo chỉ mục; phần chữ so khớp tên không dấu qua learner_search
+            patterns, query_month, query_year = parse_payroll_query(query)
+            if query_month is not None:
+                conditions.append("s.month = ?")
+                params.append(query_month)
+            if query_year is not None:
+                conditions.append("s.year = ?")
+                params.append(query_year)
+            if patterns:
+                conditions.append("s.learner_id IN (SELECT rowid FROM learner_search WHERE "
+                                  + " AND ".join("name LIKE ?" for _ in patterns) + ")")
+                params += patterns
+        if after is not None:
+            conditions.append(f"(l.name, s.learner_id, s.year, s.month) {'<' if descending else '>'} (?, ?, ?, ?)")
+            params += list(after)
+        order = "DESC" if descending else "ASC"
+        self.cursor.execute(f'''
+            SELECT s.month, s.year, l.name, s.learner_id
+            FROM payroll_sheets s
+            JOIN learners l ON s.learner_id = l.id
+            WHERE {" AND ".join(conditions)}
+            ORDER BY l.name {order}, s.learner_id {order}, s.year {order}, s.month {order}
+            LIMIT ?
+        ''', params + [limit])
+        return self.cursor.fetchall()
+
+    def get_payroll_keys(self, username, year, month=None, learner_id=None):
+        """Khóa (learner_id, tháng, năm) của các bảng lương trong một năm, lọc thêm theo tháng hoặc người học."""
+        query = "SELECT learner_id, month, year FROM payroll_sheets WHERE username = ? AND year = ?"
+        params = [username, year]
+        if month is not None:
+            query += " AND month = ?"
+            params.append(month)
+        if learner_id is not None:
+            query += " AND learner_id = ?"
+            params.append(learner_id)
+        self.cursor.execute(query + " ORDER BY month, learner_id", params)
+        return self.cursor.fetchall()
+
     def get_payroll_data(self, username, month, year, learner_id):
         """Lấy chi tiết bảng lương (ngày, trạng thái điểm danh, lương)."""
         self.cursor.execute("SELECT day, checked, salary FROM payroll WHERE username = ? AND month = ? AND year = ? AND learner_id = ?",
                            (username, month, year, learner_id))
         return self.cursor.fetchall()
 
+    def get_payroll_sheet(self, username, month, year, learner_id):
+        """Lấy toàn bộ bảng lương (ngày, điểm danh, lương, tên người học, tổng buổi, tổng phí) trong một truy vấn."""
+        self.cursor.execute('''
+            SELECT p.day, p.checked, p.salary, l.name, s.sessions, s.fee
+            FROM payroll p
+            JOIN learners l ON p.learner_id = l.id
+            LEFT JOIN payroll_sum s ON s.username = p.username AND s.month = p.month
+                AND s.year = p.year AND s.learner_id = p.learner_id
+            WHERE p.username = ? AND p.month = ? AND p.year = ? AND p.learner_id = ?
+            ORDER BY p.id
+        ''', (username, month, year, learner_id))
+        return self.cursor.fetchall()
+
     def get_payroll_summary(self, username, month, year, learner_id):
-        """Lấy tóm tắt bảng lương (tổng buổi, tổng phí)."""
+        """Lấy tóm tắt bảng lương (tổng buổi, tổng phí), được trigger cập nhật theo bảng payroll."""
         self.cursor.execute("SELECT sessions, fee FROM payroll_sum WHERE username = ? AND month = ? AND year = ? AND learner_id = ?",
                            (username, month, year, learner_id))
         result = self.cursor.fetchone()
         return result if result else (0, 0)
 
+    def get_month_totals(self, username, month, year):
+        """Tổng buổi và tổng phí của mọi bảng lương trong tháng: danh sách (learner_id, tên người học, tổng buổi, tổng phí)."""
+        self.cursor.execute('''
+            SELECT s.learner_id, l.name, COALESCE(t.sessions, 0), COALESCE(t.fee, 0)
+            FROM payroll_sheets s
+            JOIN learners l ON s.learner_id = l.id
+            LEFT JOIN payroll_sum t
+                ON t.username = s.username AND t.learner_id = s.learner_id AND t.year = s.year AND t.month = s.month
+            WHERE s.username = ? AND s.year = ? AND s.month = ?
+            ORDER BY l.name, s.learner_id
+        ''', (username, year, month))
+        return self.cursor.fetchall()
+
+    # Báo cáo thu nhập: tổng hợp trên bảng tóm tắt theo tháng nên mười năm dữ liệu chỉ là vài nghìn dòng.
+    # Năm liền trước first_year cũng được đọc để năm đầu tiên có số liệu so sánh.
+    def get_earnings_by_month(self, username, first_year, last_year):
+        """
+        Thu nhập theo tháng: danh sách (năm, tháng, số người học có buổi, tổng buổi, tổng phí,
+        lũy kế buổi trong năm, lũy kế phí trong năm, phí cùng tháng năm trước hoặc None).
+        """
+        self.cursor.execute(f'''
+            WITH monthly AS (
+                SELECT year, month, SUM(sessions > 0) AS learners, SUM(sessions) AS sessions, SUM(fee) AS fee
+                FROM {self.SUMMARY_TABLE}
+                WHERE username = ? AND year BETWEEN ? - 1 AND ?
+                GROUP BY year, month
+            ), compared AS (
+                SELECT year, month, learners, sessions, fee,
+                       SUM(sessions) OVER to_date AS ytd_sessions,
+                       SUM(fee) OVER to_date AS ytd_fee,
+                       LAG(year) OVER same_month AS previous_year,
+                       LAG(fee) OVER same_month AS previous_fee
+                FROM monthly
+                WINDOW to_date AS (PARTITION BY year ORDER BY month),
+                       same_month AS (PARTITION BY month ORDER BY year)
+            )
+            SELECT year, month, learners, sessions, fee, ytd_sessions, ytd_fee,
+                   CASE WHEN previous_year = year - 1 THEN previous_fee END
+            FROM compared
+            WHERE year >= ?
+            ORDER BY year, month
+        ''', (username, first_year, last_year, first_year))
+        return self.cursor.fetchall()
+
+    def get_earnings_by_quarter(self, username, first_year, last_year):
+        """
+        Thu nhập theo quý: danh sách (năm, quý, tổng buổi, tổng phí,
+        phí quý liền trước hoặc None, phí cùng quý năm trước hoặc None).
+        """
+        self.cursor.execute(f'''
+            WITH quarterly AS (
+                SELECT year, (month + 2) / 3 AS quarter, SUM(sessions) AS sessions, SUM(fee) AS fee
+                FROM {self.SUMMARY_TABLE}
+                WHERE username = ? AND year BETWEEN ? - 1 AND ?
+                GROUP BY year, quarter
+            ), compared AS (
+                SELECT year, quarter, sessions, fee,
+                       LAG(year * 4 + quarter) OVER in_order AS previous_index,
+                       LAG(fee) OVER in_order AS previous_fee,
+                       LAG(year) OVER same_quarter AS previous_year,
+                       LAG(fee) OVER same_quarter AS previous_year_fee
+                FROM quarterly
+                WINDOW in_order AS (ORDER BY year, quarter),
+                       same_quarter AS (PARTITION BY quarter ORDER BY year)
+            )
+            SELECT year, quarter, sessions, fee,
+                   CASE WHEN previous_index = year * 4 + quarter - 1 THEN previous_fee END,
+                   CASE WHEN previous_year = year - 1 THEN previous_year_fee END
+            FROM compared
+            WHERE year >= ?
+            ORDER BY year, quarter
+        ''', (username, first_year, last_year, first_year))
+        return self.cursor.fetchall()
+
+    def get_earnings_by_year(self, username, first_year, last_year):
+        """Thu nhập theo năm: danh sách (năm, số người học có buổi, tổng buổi, tổng phí, phí năm trước hoặc None)."""
+        self.cursor.execute(f'''
+            WITH yearly AS (
+                SELECT year, COUNT(DISTINCT CASE WHEN sessions > 0 THEN learner_id END) AS learners,
+                       SUM(sessions) AS sessions, SUM(fee) AS fee
+                FROM {self.SUMMARY_TABLE}
+                WHERE username = ? AND year BETWEEN ? - 1 AND ?
+                GROUP BY year
+            ), compared AS (
+                SELECT year, learners, sessions, fee,
+                       LAG(year) OVER (ORDER BY year) AS previous_year,
+                       LAG(fee) OVER (ORDER BY year) AS previous_fee
+                FROM yearly
+            )
+            SELECT year, learners, sessions, fee, CASE WHEN previous_year = year - 1 THEN previous_fee END
+            FROM compared
+            WHERE year >= ?
+            ORDER BY year
+        ''', (username, first_year, last_year, first_year))
+        return self.cursor.fetchall()
+
+    def get_earnings_by_learner(self, username, first_year, last_year):
+        """
+        Thu nhập theo người học trong các năm: danh sách (hạng, learner_id, tên, số tháng có buổi, tổng buổi,
+        tổng phí, tỷ lệ % trên tổng thu nhập), thu nhập cao nhất trước.
+        """
+        self.cursor.execute(f'''
+            SELECT RANK() OVER (ORDER BY SUM(t.fee) DESC), t.learner_id, l.name,
+                   SUM(t.sessions > 0), SUM(t.sessions), SUM(t.fee),
+                   ROUND(100.0 * SUM(t.fee) / NULLIF(SUM(SUM(t.fee)) OVER (), 0), 1)
+            FROM {self.SUMMARY_TABLE} t
+            JOIN learners l ON t.learner_id = l.id
+            WHERE t.username = ? AND t.year BETWEEN ? AND ?
+            GROUP BY t.learner_id
+            ORDER BY 1, l.name, t.learner_id
+        ''', (username, first_year, last_year))
+        return self.cursor.fetchall()
+
+    def get_year_to_date(self, username, year, month):
+        """Thu nhập từ đầu năm đến hết tháng month của year và cùng kỳ năm trước: {năm: (tổng buổi, tổng phí)}."""
+        self.cursor.execute(f'''
+            SELECT year, SUM(sessions), SUM(fee)
+            FROM {self.SUMMARY_TABLE}
+            WHERE username = ? AND year IN (?, ? - 1) AND month <= ?
+            GROUP BY year
+        ''', (username, year, year, month))
+        return {year: (sessions, fee) for year, sessions, fee in self.cursor.fetchall()}
+
     def update_day(self, username, month, year, learner_id, day, checked, salary):
         """Cập nhật trạng thái điểm danh và lương cho một ngày cụ thể."""
         try:
@@ -187,38 +608,148 @@ class Database:
             logging.error(f"Lỗi khi cập nhật ngày: {e}")
             return False
 
-    def update_default_salary(self, username, month, year, learner_id, salary):
-        """Cập nhật lương mặc định cho tất cả các ngày trong bảng lương."""
+    def apply_day_changes(self, changes):
+        """
+        Ghi một lô thay đổi điểm danh trong một giao dịch (tóm tắt do trigger cập nhật).
+        changes: {(username, month, year, learner_id): {ngày: (điểm danh, lương)}}
+        """
         try:
-            self.cursor.execute("UPDATE payroll SET salary = ? WHERE username = ? AND month = ? AND year = ? AND learner_id = ?",
-                               (salary, username, month, year, learner_id))
+            for (username, month, year, learner_id), days in changes.items():
+                self.cursor.executemany(
+                    "UPDATE payroll SET checked = ?, salary = ? WHERE username = ? AND month = ? AND year = ? AND learner_id = ? AND day = ?",
+                    [(checked, salary, username, month, year, learner_id, day) for day, (checked, salary) in days.items()])
             self.conn.commit()
-            logging.info(f"Lương mặc định cập nhật: {salary} cho {username} - {month}/{year} - Người học ID: {learner_id}")
+            logging.info(f"Đã ghi {sum(len(days) for days in changes.values())} thay đổi điểm danh cho {len(changes)} bảng lương.")
             return True
         except sqlite3.Error as e:
-            logging.error(f"Lỗi khi cập nhật lương mặc định: {e}")
+            self.conn.rollback()
+            logging.error(f"Lỗi khi ghi lô thay đổi điểm danh: {e}")
             return False
 
-    def update_payroll_summary(self, username, month, year, learner_id, sessions, fee):
-        """Cập nhật tóm tắt bảng lương (tổng buổi, tổng phí)."""
+    def import_days(self, username, rows, defaults=None):
+        """
+        Ghi một lô điểm danh nhập từ file trong một giao dịch (xem attendance_import.py):
+        tạo các bảng lương chưa có và ghi các ngày bằng executemany (upsert) với trigger tóm tắt tạm dừng.
+        payroll_sum không được tính lại ở đây: các bảng lương của lô được đánh dấu trong payroll_sum_dirty cùng
+        giao dịch, người gọi gọi refresh_summaries một lần sau lô cuối (bị ngắt giữa chừng thì repair_summaries
+        tính lại khi khởi động).
+        rows: danh sách (tháng, năm, learner_id, 'ngày/tháng', điểm danh, lương hoặc None để giữ lương hiện có).
+        defaults: {(tháng, năm, learner_id): lương mặc định} cho ngày đã điểm danh để trống lương mà chưa có lương.
+        Trả về số bảng lương đã tạo, hoặc None nếu có lỗi (lô bị hủy toàn bộ).
+        """
+        defaults = defaults or {}
+        sheets = {(month, year, learner_id) for month, year, learner_id, _, _, _ in rows}
+        try:
+            with pause_summary_triggers(self.cursor):
+                created = self._create_missing_sheets(username, sheets)
+                self.cursor.executemany('''
+                    INSERT INTO payroll (username, month, year, learner_id, day, checked, salary)
+                    VALUES (?1, ?2, ?3, ?4, ?5, ?6, COALESCE(?7, ?8, 0))
+                    ON CONFLICT (username, month, year, learner_id, day) DO UPDATE SET
+                        checked = excluded.checked,
+                        salary = COALESCE(?7, CASE WHEN COALESCE(salary, 0) = 0 THEN ?8 END, salary)
+                ''', [(username, month, year, learner_id, day, checked, salary,
+                       defaults.get((month, year, learner_id)) if checked and salary is None else None)
+                      for month, year, learner_id, day, checked, salary in rows])
+                self.cursor.executemany('''
+                    INSERT OR IGNORE INTO payroll_sum_dirty (username, month, year, learner_id) VALUES (?, ?, ?, ?)
+                ''', [(username, month, year, learner_id) for month, year, learner_id in sheets])
+            self.conn.commit()
+            logging.info(f"Đã nhập {len(rows)} ngày điểm danh cho {username} vào {len(sheets)} bảng lương (tạo mới {created}).")
+            return created
+        except sqlite3.Error as e:
+            self.conn.rollback()
+            logging.error(f"Lỗi khi nhập điểm danh cho {username}: {e}")
+            return None
+
+    def refresh_summaries(self, username, sheets):
+        """
+        Tính lại payroll_sum một lần cho mỗi bảng lương (tháng, năm, learner_id) trong sheets sau khi nhập
+        điểm danh với trigger tóm tắt tạm dừng (xem import_days) và xóa đánh dấu payroll_sum_dirty trong cùng
+        giao dịch. Trả về True nếu thành công.
+        """
+        keys = [(username, month, year, learner_id) for month, year, learner_id in sheets]
         try:
-            self.cursor.execute("INSERT OR REPLACE INTO payroll_sum (username, month, year, learner_id, sessions, fee) "
-                               "VALUES (?, ?, ?, ?, ?, ?)",
-                               (username, month, year, learner_id, sessions, fee))
+            self.cursor.executemany('''
+                INSERT INTO payroll_sum (username, month, year, learner_id, sessions, fee)
+                SELECT username, month, year, learner_id,
+                       SUM(COALESCE(checked, 0) <> 0),
+                       SUM(CASE WHEN COALESCE(checked, 0) <> 0 THEN COALESCE(salary, 0) ELSE 0 END)
+                FROM payroll
+                WHERE username = ? AND month = ? AND year = ? AND learner_id = ?
+                GROUP BY username, month, year, learner_id
+                ON CONFLICT (username, month, year, learner_id) DO UPDATE SET
+                    sessions = excluded.sessions, fee = excluded.fee
+            ''', keys)
+            self.cursor.executemany(
+                "DELETE FROM payroll_sum_dirty WHERE username = ? AND month = ? AND year = ? AND learner_id = ?", keys)
             self.conn.commit()
-            logging.info(f"Tóm tắt bảng lương cập nhật: {sessions} buổi, {fee} phí cho {username} - {month}/{year} - Người học ID: {learner_id}")
+            logging.info(f"Đã tính lại tóm tắt của {len(sheets)} bảng lương cho {username}.")
             return True
         except sqlite3.Error as e:
-            logging.error(f"Lỗi khi cập nhật tóm tắt bảng lương: {e}")
+            self.conn.rollback()
+            logging.error(f"Lỗi khi tính lại tóm tắt bảng lương cho {username}: {e}")
             return False
 
+    def get_default_salaries(self, username):
+        """Lương mặc định (lương cao nhất của các ngày) của mọi bảng lương của username: {(tháng, năm, learner_id): lương}."""
+        self.cursor.execute('''
+            SELECT month, year, learner_id, MAX(salary) FROM payroll
+            WHERE username = ?
+            GROUP BY month, year, learner_id
+        ''', (username,))
+        return {(month, year, learner_id): salary or 0 for month, year, learner_id, salary in self.cursor.fetchall()}
+
+    def _create_missing_sheets(self, username, sheets):
+        """Tạo các bảng lương (tháng, năm, learner_id) chưa có (không commit). Trả về số bảng lương đã tạo."""
+        created = {}
+        for month, year, learner_id in sheets:
+            if self.add_payroll_sheet(username, month, year, learner_id):
+                created.setdefault((month, year), []).append(learner_id)
+        for (month, year), learner_ids in created.items():
+            self._create_sheet_rows(username, month, year, learner_ids)
+        return sum(len(learner_ids) for learner_ids in created.values())
+
+    def update_default_salary(self, username, month, year, learner_id, salary):
+        """Cập nhật lương mặc định cho tất cả các ngày trong bảng lương."""
+        return self.apply_salary(username, month, year, learner_id, salary) is not None
+
+    def apply_salary(self, username, month, year, learner_id, salary, only_checked=False, first_day=None, last_day=None):
+        """
+        Áp dụng mức lương mới trong một giao dịch: cho tất cả các ngày, chỉ các ngày đã điểm danh
+        và/hoặc các ngày trong khoảng [first_day, last_day]. Trả về tóm tắt mới (tổng buổi, tổng phí),
+        hoặc None nếu có lỗi.
+        """
+        query = "UPDATE payroll SET salary = ? WHERE username = ? AND month = ? AND year = ? AND learner_id = ?"
+        params = [salary, username, month, year, learner_id]
+        if only_checked:
+            query += " AND checked <> 0"
+        if first_day is not None or last_day is not None:
+            # Khóa ngày dạng 'ngày/tháng', lấy phần số ngày để so sánh
+            query += " AND CAST(substr(day, 1, instr(day, '/') - 1) AS INTEGER) BETWEEN ? AND ?"
+            params += [first_day or 1, last_day or 31]
+        try:
+            self.cursor.execute(query, params)
+            self.cursor.execute("SELECT sessions, fee FROM payroll_sum WHERE username = ? AND month = ? AND year = ? AND learner_id = ?",
+                               (username, month, year, learner_id))
+            summary = self.cursor.fetchone() or (0, 0)
+            self.conn.commit()
+            logging.info(f"Lương cập nhật: {salary} cho {username} - {month}/{year} - Người học ID: {learner_id}")
+            return summary
+        except sqlite3.Error as e:
+            self.conn.rollback()
+            logging.error(f"Lỗi khi cập nhật lương: {e}")
+            return None
+
     def delete_payroll(self, username, month, year, learner_id):
         """Xóa bảng lương và tóm tắt liên quan."""
         try:
-            self.cursor.execute("DELETE FROM payroll WHERE username = ? AND month = ? AND year = ? AND learner_id = ?",
-                               (username, month, year, learner_id))
+            # Xóa tóm tắt trước để trigger xóa của payroll không phải cập nhật dòng sắp bị xóa
             self.cursor.execute("DELETE FROM payroll_sum WHERE username = ? AND month = ? AND year = ? AND learner_id = ?",
                                (username, month, year, learner_id))
+            self.cursor.execute("DELETE FROM payroll WHERE username = ? AND month = ? AND year = ? AND learner_id = ?",
+                               (username, month, year, learner_id))
+            self.remove_payroll_sheet(username, month, year, learner_id)
             self.conn.commit()
             logging.info(f"Bảng lương {month}/{year} đã xóa cho {username} - Người học ID: {learner_id}")
             return True
@@ -254,6 +785,25 @@ class Database:
         self.cursor.execute('SELECT id, username, fullname FROM users')
         return self.cursor.fetchall()
 
+    def search_users(self, query, limit=-1):
+        """
+        Tìm tài khoản theo tên người dùng hoặc họ tên, không phân biệt dấu.
+        Từ khóa rỗng trả về tất cả; limit âm nghĩa là không giới hạn.
+        """
+        patterns = like_patterns(query)
+        if not patterns:
+            self.cursor.execute('SELECT id, username, fullname FROM users ORDER BY id LIMIT ?', (limit,))
+            return self.cursor.fetchall()
+        # Mỗi từ phải xuất hiện trong tên người dùng hoặc họ tên
+        matches = " AND ".join("(username LIKE ? OR fullname LIKE ?)" for _ in patterns)
+        self.cursor.execute(f'''
+            SELECT id, username, fullname FROM users
+            WHERE id IN (SELECT rowid FROM user_search WHERE {matches})
+            ORDER BY id
+            LIMIT ?
+        ''', [p for pattern in patterns for p in (pattern, pattern)] + [limit])
+        return self.cursor.fetchall()
+
     def add_user(self, username, fullname, password):
         """Thêm người dùng mới (dành cho admin)."""
         try:
@@ -295,6 +845,24 @@ class Database:
             logging.error(f"Lỗi khi xóa người dùng ID {user_id}: {e}")
             return False
 
-    def __del__(self):
-        """Đóng kết nối cơ sở dữ liệu khi đối tượng bị hủy."""
-        self.conn.close()
\ No newline at end of file
+
+_databases = threading.local()
+
+def open_database():
+    """
+    Lấy đối tượng Database dùng chung của luồng hiện tại với kiểu lưu trữ bảng lương
+    được chọn trong settings.json. Các màn hình dùng chung một kết nối thay vì mở mới.
+    """
+    db = getattr(_databases, "db", None)
+    if db is not None and db.conn is get_connection_manager().get():
+        return db
+    storage = load_settings().get("storage", "rows")
+    if storage == "compact":
+        from payroll_compact import CompactDatabase
+        db = CompactDatabase()
+    else:
+        if storage != "rows":
+            logging.warning(f"Kiểu lưu trữ không hợp lệ: {storage}. Sử dụng kiểu 'rows'.")
+        db = Database()
+    _databases.db = db
+    return db
\ No newline at end of file
@@ -0,0 +1,295 @@
+import atexit
+import functools
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from settings import APP_DATA_DIR, load_settings
+
+# Đo thời gian truy vấn (tùy chọn, bật bằng "diagnostics": true trong settings.json):
+# - từng phương thức của Database: số lần gọi, biểu đồ độ trễ, số dòng trả về
+# - từng câu lệnh SQL (kể cả COMMIT): như trên, câu lệnh chậm hơn ngưỡng được ghi vào logs/slow_queries.log
+#   kèm EXPLAIN QUERY PLAN
+# Xem trên màn hình chẩn đoán của admin hoặc xuất ra logs/diagnostics.json.
+
+SLOW_LOG_FILE = os.path.join(APP_DATA_DIR, "logs", "slow_queries.log")
+DUMP_FILE = os.path.join(APP_DATA_DIR, "logs", "diagnostics.json")
+
+# Cận trên (ms) của các ngăn biểu đồ độ trễ; ngăn cuối chứa các lần gọi còn lại
+HISTOGRAM_BOUNDS = (1, 5, 20, 100, 500)
+HISTOGRAM_LABELS = [f"<{bound}ms" for bound in HISTOGRAM_BOUNDS] + [f">={HISTOGRAM_BOUNDS[-1]}ms"]
+
+def normalize_sql(sql):
+    """Gom khoảng trắng để các lần chạy cùng một câu lệnh được thống kê chung."""
+    return re.sub(r"\s+", " ", sql).strip()
+
+class Metric:
+    """Thống kê của một phương thức hoặc câu lệnh: số lần, tổng/lớn nhất thời gian, số dòng, biểu đồ độ trễ."""
+
+    __slots__ = ("count", "total_ms", "max_ms", "rows", "histogram")
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        self.histogram = [0] * len(HISTOGRAM_LABELS)
+
+    def add(self, elapsed_ms, rows):
+        """Ghi nhận một lần chạy."""
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self.rows += rows
+        bucket = next((i for i, bound in enumerate(HISTOGRAM_BOUNDS) if elapsed_ms < bound), len(HISTOGRAM_BOUNDS))
+        self.histogram[bucket] += 1
+
+    def to_dict(self):
+        """Dạng JSON của thống kê."""
+        return {
+            "count": self.count,
+            "total_ms": round(self.total_ms, 3),
+            "avg_ms": round(self.total_ms / self.count, 3) if self.count else 0,
+            "max_ms": round(self.max_ms, 3),
+            "rows": self.rows,
+            "histogram": dict(zip(HISTOGRAM_LABELS, self.histogram)),
+        }
+
+class QueryStats:
+    """Bộ thu thập thống kê dùng chung cho mọi luồng."""
+
+    def __init__(self, slow_ms=50, slow_log=SLOW_LOG_FILE, keep_slow=100):
+        self.slow_ms = slow_ms
+        self.methods = {}
+        self.statements = {}
+        self.slow = deque(maxlen=keep_slow)
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._slow_logger = None
+        self._slow_log = slow_log
+
+    def record_method(self, name, elapsed_ms, rows):
+        """Ghi nhận một lần gọi phương thức của Database."""
+        with self._lock:
+            self.methods.setdefault(name, Metric()).add(elapsed_ms, rows)
+
+    def record_statement(self, sql, elapsed_ms, rows):
+        """Ghi nhận một lần chạy câu lệnh SQL."""
+        with self._lock:
+            self.statements.setdefault(normalize_sql(sql), Metric()).add(elapsed_ms, rows)
+
+    def record_slow(self, sql, parameters, elapsed_ms, plan):
+        """Lưu câu lệnh chậm vào bộ nhớ và ghi vào slow_queries.log."""
+        entry = {
+            "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "ms": round(elapsed_ms, 3),
+            "sql": normalize_sql(sql),
+            "params": repr(parameters)[:200],
+            "plan": plan,
+        }
+        with self._lock:
+            self.slow.append(entry)
+        logger = self._get_slow_logger()
+        plan_text = "\n".join(f"    {line}" for line in plan) or "    (không có kế hoạch truy vấn)"
+        logger.warning(f"{entry['ms']} ms: {entry['sql']} {entry['params']}\n{plan_text}")
+
+    def _get_slow_logger(self):
+        """Logger riêng ghi vào slow_queries.log (không lẫn vào app.log)."""
+        if self._slow_logger is None:
+            logger = logging.getLogger("tutorpay.slow_queries")
+            logger.propagate = False
+            if not logger.handlers:
+                os.makedirs(os.path.dirname(self._slow_log), exist_ok=True)
+                handler = logging.FileHandler(self._slow_log, encoding="utf-8")
+                handler.setFormatter(logging.Formatter('%(asctime)s - %(message)s'))
+                logger.addHandler(handler)
+            self._slow_logger = logger
+        return self._slow_logger
+
+    def reset(self):
+        """Xóa toàn bộ thống kê đã thu thập."""
+        with self._lock:
+            self.methods.clear()
+            self.statements.clear()
+            self.slow.clear()
+            self.started = time.time()
+
+    def snapshot(self):
+        """Bản sao thống kê dạng JSON, câu lệnh sắp theo tổng thời gian giảm dần."""
+        with self._lock:
+            statements = sorted(self.statements.items(), key=lambda item: item[1].total_ms, reverse=True)
+            return {
+                "started": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.started)),
+                "slow_ms": self.slow_ms,
+                "histogram_bounds_ms": list(HISTOGRAM_BOUNDS),
+                "methods": {name: metric.to_dict() for name, metric in sorted(self.methods.items())},
+                "statements": [{"sql": sql, **metric.to_dict()} for sql, metric in statements],
+                "slow_queries": list(self.slow),
+            }
+
+    def dump(self, path=DUMP_FILE):
+        """Ghi thống kê ra file JSON. Trả về True nếu thành công."""
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(self.snapshot(), f, ensure_ascii=False, indent=2)
+            logging.info(f"Đã ghi thống kê truy vấn vào {path}")
+            return True
+        except OSError as e:
+            logging.error(f"Không thể ghi thống kê truy vấn {path}: {e}")
+            return False
+
+def explain(conn, sql, parameters):
+    """EXPLAIN QUERY PLAN của câu lệnh (không chạy câu lệnh); rỗng nếu câu lệnh không có kế hoạch."""
+    if not re.match(r"\s*(SELECT|INSERT|UPDATE|DELETE|REPLACE|WITH)\b", sql, re.IGNORECASE):
+        return []
+    try:
+        rows = sqlite3.Cursor(conn).execute(f"EXPLAIN QUERY PLAN {sql}", parameters).fetchall()
+        return [detail for _, _, _, detail in rows]
+    except sqlite3.Error as e:
+        return [f"không lấy được kế hoạch: {e}"]
+
+class TimedCursor(sqlite3.Cursor):
+    """
+    Cursor đo thời gian mỗi câu lệnh: thời gian chạy cộng thời gian đọc kết quả (fetch*),
+    số dòng là số dòng đọc được (SELECT) hoặc số dòng bị thay đổi.
+    """
+
+    _pending = None
+
+    def execute(self, sql, parameters=()):
+        self._finish()
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._begin(sql, parameters, start)
+
+    def executemany(self, sql, seq_of_parameters):
+        self._finish()
+        seq_of_parameters = list(seq_of_parameters)
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._begin(sql, seq_of_parameters[0] if seq_of_parameters else (), start)
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(start, 1 if row is not None else 0, done=row is None)
+        return row
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        rows = super().fetchmany(size if size is not None else self.arraysize)
+        self._fetched(start, len(rows), done=not rows)
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(start, len(rows), done=True)
+        return rows
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def _begin(self, sql, parameters, start):
+        """Bắt đầu theo dõi câu lệnh vừa chạy; câu lệnh không trả về dòng được ghi nhận ngay."""
+        elapsed = time.perf_counter() - start
+        if self.description is None:
+            self._pending = [sql, parameters, elapsed, max(self.rowcount, 0)]
+            self._finish()
+        else:
+            self._pending = [sql, parameters, elapsed, 0]
+
+    def _fetched(self, start, rows, done):
+        """Cộng thời gian và số dòng của một lần đọc kết quả."""
+        if self._pending is not None:
+            self._pending[2] += time.perf_counter() - start
+            self._pending[3] += rows
+            if done:
+                self._finish()
+
+    def _finish(self):
+        """Ghi nhận câu lệnh đang theo dõi (khi đọc hết kết quả hoặc khi chạy câu lệnh tiếp theo)."""
+        pending, self._pending = self._pending, None
+        if pending is None:
+            return
+        sql, parameters, elapsed, rows = pending
+        record(self.connection, sql, parameters, elapsed * 1000, rows)
+
+def record(conn, sql, parameters, elapsed_ms, rows):
+    """Ghi nhận câu lệnh vào thống kê của kết nối, kèm kế hoạch truy vấn nếu chậm."""
+    stats = conn.stats
+    stats.record_statement(sql, elapsed_ms, rows)
+    if elapsed_ms >= stats.slow_ms:
+        stats.record_slow(sql, parameters, elapsed_ms, explain(conn, sql, parameters))
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Kết nối dùng TimedCursor cho mọi câu lệnh và đo cả thời gian COMMIT."""
+
+    stats = None
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def commit(self):
+        start = time.perf_counter()
+        try:
+            super().commit()
+        finally:
+            self.stats.record_statement("COMMIT", (time.perf_counter() - start) * 1000, 0)
+
+def result_rows(result):
+    """Số dòng của kết quả trả về từ một phương thức Database."""
+    if isinstance(result, list):
+        return len(result)
+    return 1 if isinstance(result, tuple) else 0
+
+def instrument_methods(db, stats):
+    """Bọc các phương thức công khai của đối tượng Database để đo số lần gọi, độ trễ và số dòng trả về."""
+    for name in dir(type(db)):
+        if name.startswith("_") or name == "create_tables":
+            continue
+        method = getattr(db, name)
+        if not callable(method):
+            continue
+
+        def wrapper(*args, _method=method, _name=name, **kwargs):
+            start = time.perf_counter()
+            result = _method(*args, **kwargs)
+            stats.record_method(_name, (time.perf_counter() - start) * 1000, result_rows(result))
+            return result
+
+        setattr(db, name, functools.wraps(method)(wrapper))
+
+_stats = None
+_stats_lock = threading.Lock()
+
+def get_stats(settings=None):
+    """
+    Bộ thu thập dùng chung nếu "diagnostics" được bật trong settings.json, ngược lại None.
+    Khi bật, thống kê được ghi ra logs/diagnostics.json lúc thoát.
+    """
+    global _stats
+    settings = settings if settings is not None else load_settings()
+    if not settings.get("diagnostics"):
+        return None
+    with _stats_lock:
+        if _stats is None:
+            _stats = QueryStats(slow_ms=settings.get("slow_query_ms", 50))
+            atexit.register(_stats.dump)
+        return _stats
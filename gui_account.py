@@ -1,36 +1,22 @@
 import tkinter as tk
 from tkinter import messagebox, ttk
-from database import Database
+from database import open_database
+from background import get_executor
+from search import SearchBox, sync_tree
+from screens import Popup
 import os
 
 class AccountScreen:
-    def __init__(self, root, username, callback):
-        """Khởi tạo giao diện quản lý tài khoản."""
+    def __init__(self, root, username, callback, screens):
+        """Khởi tạo giao diện quản lý tài khoản (dựng một lần, giữ lại trong screens)."""
         self.root = root
         self.username = username
         self.callback = callback
-        self.db = Database()
-        self.root.title("TutorPay - Quản lý tài khoản")
-        self.root.geometry("700x600")
-        self.root.configure(bg="#F5F7FA")
-        self.style = ttk.Style()
-        self.configure_styles()
-        self.set_window_icon(self.root)
-        self.center_window()
-        self.show_account_screen()
-
-    def configure_styles(self):
-        """Cấu hình kiểu dáng cho các widget."""
-        self.style.configure("TEntry", padding=8, font=("Segoe UI", 11))
-        self.style.configure("TButton", padding=8, font=("Segoe UI", 11, "bold"))
-        self.style.configure("TLabel", background="#FFFFFF", font=("Segoe UI", 11))
-        self.style.configure("Header.TLabel", font=("Segoe UI", 20, "bold"), foreground="#1E88E5")
-        self.style.configure("SubHeader.TLabel", font=("Segoe UI", 11), foreground="#37474F")
-        self.style.configure("Treeview", font=("Segoe UI", 11), rowheight=30)
-        self.style.configure("Treeview.Heading", font=("Segoe UI", 11, "bold"))
-        self.style.configure("TCombobox", padding=8, font=("Segoe UI", 11))
-        self.style.configure("Hover.TButton", background="#1565C0", foreground="#1565C0")
-        self.style.configure("TCheckbutton", background="#FFFFFF", font=("Segoe UI", 11))
+        self.screens = screens
+        self.db = open_database()
+        self.executor = get_executor(self.root)
+        self.edit_popup = None
+        self.build_account_screen()
 
     def set_window_icon(self, window):
         """Đặt biểu tượng cửa sổ thành annc19324.ico."""
@@ -43,24 +29,6 @@ class AccountScreen:
         except tk.TclError as e:
             print(f"Error setting icon: {e}. Skipping icon setting.")
 
-    def center_window(self):
-        """Căn giữa cửa sổ trên màn hình."""
-        self.root.update_idletasks()
-        width = self.root.winfo_width()
-        height = self.root.winfo_height()
-        x = (self.root.winfo_screenwidth() // 2) - (width // 2)
-        y = (self.root.winfo_screenheight() // 2) - (height // 2)
-        self.root.geometry(f"{width}x{height}+{x}+{y}")
-
-    def clear_screen(self):
-        """Xóa tất cả widget trên màn hình và đặt lại cấu hình cửa sổ."""
-        for widget in self.root.winfo_children():
-            widget.destroy()
-        self.root.geometry("700x600")
-        self.root.grid_rowconfigure(0, weight=0)
-        self.root.grid_columnconfigure(0, weight=0)
-        self.root.update_idletasks()
-
     def create_button(self, frame, text, command, bg_color):
         """Tạo nút với hiệu ứng hover."""
         button = ttk.Button(frame, text=text, command=command, style="TButton")
@@ -74,12 +42,14 @@ class AccountScreen:
         """Chuyển đổi giữa hiển thị và ẩn mật khẩu."""
         entry.config(show='' if var.get() else '*')
 
-    def show_account_screen(self):
-        """Hiển thị giao diện quản lý tài khoản."""
-        self.clear_screen()
-        self.root.geometry("700x600")
+    def show(self):
+        """Hiển thị màn hình đã dựng và làm mới danh sách (chỉ các dòng thay đổi)."""
+        self.screens.show("accounts")
+
+    def build_account_screen(self):
+        """Dựng giao diện quản lý tài khoản."""
         main_frame = tk.Frame(self.root, bg="#F5F7FA")
-        main_frame.pack(expand=True, fill="both", padx=15, pady=15)
+        self.frame = main_frame
 
         header_frame = tk.Frame(main_frame, bg="#F5F7FA")
         header_frame.pack(fill="x")
@@ -101,6 +71,13 @@ class AccountScreen:
 
         self.create_button(form_frame, "Thêm", self.add_user, "#43A047").pack(side="left", padx=10)
 
+        search_frame = tk.Frame(main_frame, bg="#FFFFFF", bd=0, relief="flat")
+        search_frame.pack(fill="x", pady=(0, 10))
+        search_frame.configure(highlightbackground="#E0E0E0", highlightthickness=1)
+        ttk.Label(search_frame, text="Tìm kiếm:").pack(side="left", padx=10, pady=5)
+        search_entry = ttk.Entry(search_frame, style="TEntry")
+        search_entry.pack(side="left", padx=5, pady=5, fill="x", expand=True)
+
         tree_frame = tk.Frame(main_frame, bg="#FFFFFF")
         tree_frame.pack(expand=True, fill="both", pady=10)
         columns = ("ID", "Tên người dùng", "Họ và tên")
@@ -116,6 +93,8 @@ class AccountScreen:
         vsb = ttk.Scrollbar(tree_frame, orient="vertical", command=self.tree.yview)
         vsb.pack(side="right", fill="y")
         self.tree.configure(yscrollcommand=vsb.set)
+        self.search_box = SearchBox(search_entry, self.executor,
+                                    lambda db, query: db.search_users(query), self.show_users)
 
         button_frame = tk.Frame(main_frame, bg="#F5F7FA")
         button_frame.pack(pady=10)
@@ -123,8 +102,7 @@ class AccountScreen:
         self.create_button(button_frame, "Xóa", self.delete_user, "#EF5350")
         self.create_button(button_frame, "Quay lại", self.callback, "#78909C")
 
-        self.load_users()
-        self.center_window()
+        self.screens.add("accounts", main_frame, "TutorPay - Quản lý tài khoản", "700x600", self.load_users)
 
     def add_user(self):
         """Thêm tài khoản mới."""
@@ -143,37 +121,30 @@ class AccountScreen:
             messagebox.showerror("Lỗi", "Tên người dùng đã tồn tại hoặc không thể thêm tài khoản.")
 
     def load_users(self):
-        """Tải danh sách tài khoản vào Treeview."""
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        users = self.db.get_all_users()
-        for user in users:
-            self.tree.insert("", tk.END, values=user)
+        """Tải lại danh sách tài khoản theo từ khóa tìm kiếm hiện tại (trên luồng cơ sở dữ liệu)."""
+        self.search_box.run(force=True)
+
+    def show_users(self, query, users):
+        """Cập nhật Treeview theo kết quả tìm kiếm, chỉ thay đổi các dòng khác trước."""
+        sync_tree(self.tree, "", [(f"u{user[0]}", user) for user in users])
 
     def show_edit_user_popup(self):
-        """Hiển thị cửa sổ chỉnh sửa tài khoản."""
+        """Hiển thị cửa sổ chỉnh sửa tài khoản (dựng một lần, mỗi lần mở chỉ điền lại dữ liệu)."""
         selected_item = self.tree.selection()
         if not selected_item:
             messagebox.showerror("Lỗi", "Vui lòng chọn tài khoản để chỉnh sửa.")
             return
         
-        user_id = self.tree.item(selected_item)["values"][0]
-        current_username = self.tree.item(selected_item)["values"][1]
-        current_fullname = self.tree.item(selected_item)["values"][2]
-
-        top = tk.Toplevel(self.root)
-        top.title("Chỉnh sửa tài khoản")
-        top.geometry("350x380")
-        top.configure(bg="#F5F7FA")
+        self.edit_user = self.tree.item(selected_item)["values"][:3]
+        if self.edit_popup is None:
+            self.edit_popup = Popup(self.frame, "Chỉnh sửa tài khoản", "350x380", self.build_edit_user_popup,
+                                    self.fill_edit_user_popup)
+        self.edit_popup.open()
+
+    def build_edit_user_popup(self, top):
+        """Dựng cửa sổ chỉnh sửa tài khoản."""
         self.set_window_icon(top)
 
-        top.update_idletasks()
-        width = top.winfo_width()
-        height = top.winfo_height()
-        x = (self.root.winfo_width() - width) // 2 + self.root.winfo_x()
-        y = (self.root.winfo_height() - height) // 2 + self.root.winfo_y()
-        top.geometry(f"{width}x{height}+{x}+{y}")
-
         frame = tk.Frame(top, bg="#FFFFFF", bd=0, relief="flat")
         frame.pack(expand=True, fill="both", padx=15, pady=15)
         frame.configure(highlightbackground="#E0E0E0", highlightthickness=1)
@@ -181,12 +152,10 @@ class AccountScreen:
         ttk.Label(frame, text="Tên người dùng:", background="#FFFFFF").pack(anchor="w", pady=5)
         username_entry = ttk.Entry(frame, style="TEntry")
         username_entry.pack(fill="x", pady=5)
-        username_entry.insert(0, current_username)
 
         ttk.Label(frame, text="Họ và tên:", background="#FFFFFF").pack(anchor="w", pady=5)
         fullname_entry = ttk.Entry(frame, style="TEntry")
         fullname_entry.pack(fill="x", pady=5)
-        fullname_entry.insert(0, current_fullname)
 
         ttk.Label(frame, text="Mật khẩu mới:", background="#FFFFFF").pack(anchor="w", pady=5)
         password_entry = ttk.Entry(frame, show='*', style="TEntry")
@@ -198,18 +167,27 @@ class AccountScreen:
                                              style="TCheckbutton")
         show_password_check.pack(anchor="w", padx=10, pady=5)
 
+        self.edit_entries = (username_entry, fullname_entry, password_entry)
+        save = lambda: self.save_user(self.edit_user[0], username_entry.get(), fullname_entry.get(), password_entry.get())
+
         button_frame = tk.Frame(frame, bg="#FFFFFF")
         button_frame.pack(pady=10)
-        self.create_button(button_frame, "Lưu",
-                          lambda: self.save_user(user_id, username_entry.get(), fullname_entry.get(), password_entry.get(), top),
-                          "#1E88E5")
+        self.create_button(button_frame, "Lưu", save, "#1E88E5")
 
-        username_entry.focus_set()
         username_entry.bind("<Return>", lambda event: fullname_entry.focus_set())
         fullname_entry.bind("<Return>", lambda event: password_entry.focus_set())
-        password_entry.bind("<Return>", lambda event: self.save_user(user_id, username_entry.get(), fullname_entry.get(), password_entry.get(), top))
+        password_entry.bind("<Return>", lambda event: save())
+
+    def fill_edit_user_popup(self):
+        """Điền thông tin của tài khoản được chọn, xóa mật khẩu đã nhập lần trước."""
+        username_entry, fullname_entry, password_entry = self.edit_entries
+        _, current_username, current_fullname = self.edit_user
+        for entry, value in ((username_entry, current_username), (fullname_entry, current_fullname), (password_entry, "")):
+            entry.delete(0, tk.END)
+            entry.insert(0, value)
+        username_entry.focus_set()
 
-    def save_user(self, user_id, username, fullname, password, top):
+    def save_user(self, user_id, username, fullname, password):
         """Lưu thông tin tài khoản đã chỉnh sửa."""
         if not username or not fullname:
             messagebox.showerror("Lỗi", "Vui lòng nhập đầy đủ thông tin.")
@@ -218,7 +196,7 @@ class AccountScreen:
         if self.db.update_user(user_id, username, fullname, password):
             messagebox.showinfo("Thành công", "Đã cập nhật tài khoản!")
             self.load_users()
-            top.destroy()
+            self.edit_popup.close()
         else:
             messagebox.showerror("Lỗi", "Không thể cập nhật tài khoản. Tên người dùng có thể đã tồn tại.")
 
@@ -0,0 +1,134 @@
+import tkinter as tk
+from tkinter import messagebox, ttk, filedialog
+import os
+from database import open_database
+from search import sync_tree
+
+class DiagnosticsScreen:
+    def __init__(self, root, username, callback, screens):
+        """Khởi tạo màn hình chẩn đoán truy vấn (dành cho admin)."""
+        self.root = root
+        self.username = username
+        self.callback = callback
+        self.screens = screens
+        self.stats = open_database().manager.query_stats
+        self.slow_entries = []
+        self.build_diagnostics_screen()
+
+    def create_button(self, frame, text, command, bg_color):
+        """Tạo nút với hiệu ứng hover."""
+        button = ttk.Button(frame, text=text, command=command, style="TButton")
+        button.configure(cursor="hand2")
+        button.bind("<Enter>", lambda e: button.configure(style="Hover.TButton"))
+        button.bind("<Leave>", lambda e: button.configure(style="TButton"))
+        button.pack(side="left", padx=5, pady=5)
+        return button
+
+    def create_tree(self, parent, columns, widths):
+        """Tạo Treeview có thanh cuộn dọc với các cột cho trước."""
+        tree_frame = tk.Frame(parent, bg="#FFFFFF")
+        tree_frame.pack(expand=True, fill="both", pady=5)
+        tree = ttk.Treeview(tree_frame, columns=columns, show="headings", height=6)
+        for column, width in zip(columns, widths):
+            tree.heading(column, text=column, anchor="center")
+            tree.column(column, width=width, anchor="w" if column == "Câu lệnh" else "center")
+        tree.pack(side="left", fill="both", expand=True)
+        vsb = ttk.Scrollbar(tree_frame, orient="vertical", command=tree.yview)
+        vsb.pack(side="right", fill="y")
+        tree.configure(yscrollcommand=vsb.set)
+        return tree
+
+    def show(self):
+        """Hiển thị màn hình và làm mới số liệu."""
+        self.screens.show("diagnostics")
+
+    def build_diagnostics_screen(self):
+        """Dựng màn hình chẩn đoán: thống kê theo phương thức, theo câu lệnh và các câu lệnh chậm."""
+        main_frame = tk.Frame(self.root, bg="#F5F7FA")
+
+        header_frame = tk.Frame(main_frame, bg="#F5F7FA")
+        header_frame.pack(fill="x")
+        ttk.Label(header_frame, text="Chẩn đoán truy vấn", style="Header.TLabel").pack(pady=10)
+        self.summary_label = ttk.Label(header_frame, text="", style="SubHeader.TLabel")
+        self.summary_label.pack()
+
+        notebook = ttk.Notebook(main_frame)
+        notebook.pack(expand=True, fill="both", pady=10)
+
+        methods_tab = tk.Frame(notebook, bg="#FFFFFF")
+        notebook.add(methods_tab, text="Phương thức")
+        self.methods_tree = self.create_tree(methods_tab, ("Phương thức", "Số lần", "TB (ms)", "Max (ms)", "Dòng", "Phân bố"),
+                                             (170, 70, 80, 80, 70, 220))
+
+        statements_tab = tk.Frame(notebook, bg="#FFFFFF")
+        notebook.add(statements_tab, text="Câu lệnh")
+        self.statements_tree = self.create_tree(statements_tab, ("Câu lệnh", "Số lần", "Tổng (ms)", "Max (ms)", "Dòng"),
+                                                (380, 70, 90, 80, 70))
+
+        slow_tab = tk.Frame(notebook, bg="#FFFFFF")
+        notebook.add(slow_tab, text="Câu lệnh chậm")
+        self.slow_tree = self.create_tree(slow_tab, ("Thời điểm", "ms", "Câu lệnh"), (140, 70, 480))
+        self.plan_text = tk.Text(slow_tab, height=6, font=("Consolas", 10), wrap="word", relief="flat",
+                                 highlightthickness=1, highlightbackground="#E0E0E0")
+        self.plan_text.pack(fill="x", pady=5)
+        self.slow_tree.bind("<<TreeviewSelect>>", self.show_plan)
+
+        button_frame = tk.Frame(main_frame, bg="#F5F7FA")
+        button_frame.pack(pady=10)
+        self.create_button(button_frame, "Làm mới", self.refresh, "#1E88E5")
+        self.create_button(button_frame, "Xuất JSON", self.export_json, "#43A047")
+        self.create_button(button_frame, "Đặt lại", self.reset_stats, "#EF5350")
+        self.create_button(button_frame, "Quay lại", self.callback, "#78909C")
+
+        self.screens.add("diagnostics", main_frame, "TutorPay - Chẩn đoán truy vấn", "800x600", self.refresh)
+
+    def refresh(self):
+        """Cập nhật các bảng từ bộ thu thập thống kê (chỉ các dòng thay đổi)."""
+        if self.stats is None:
+            self.summary_label.config(text='Chưa bật chẩn đoán. Đặt "diagnostics": true trong settings.json rồi mở lại ứng dụng.')
+            return
+        snapshot = self.stats.snapshot()
+        self.summary_label.config(text=f"Thu thập từ {snapshot['started']}, ngưỡng câu lệnh chậm {snapshot['slow_ms']} ms, "
+                                       f"{len(snapshot['slow_queries'])} câu lệnh chậm")
+        sync_tree(self.methods_tree, "", [
+            (name, (name, m["count"], m["avg_ms"], m["max_ms"], m["rows"],
+                    " ".join(f"{label}:{n}" for label, n in m["histogram"].items() if n)))
+            for name, m in snapshot["methods"].items()])
+        sync_tree(self.statements_tree, "", [
+            (f"q{i}", (s["sql"], s["count"], s["total_ms"], s["max_ms"], s["rows"]))
+            for i, s in enumerate(snapshot["statements"])])
+        self.slow_entries = list(reversed(snapshot["slow_queries"]))
+        sync_tree(self.slow_tree, "", [
+            (f"s{i}", (entry["time"], entry["ms"], entry["sql"])) for i, entry in enumerate(self.slow_entries)])
+
+    def show_plan(self, event):
+        """Hiển thị tham số và EXPLAIN QUERY PLAN của câu lệnh chậm được chọn."""
+        selected = self.slow_tree.selection()
+        if not selected:
+            return
+        entry = self.slow_entries[int(selected[0][1:])]
+        self.plan_text.delete("1.0", tk.END)
+        self.plan_text.insert("1.0", f"{entry['sql']}\nTham số: {entry['params']}\n\n" +
+                              ("\n".join(entry["plan"]) or "(không có kế hoạch truy vấn)"))
+
+    def export_json(self):
+        """Ghi thống kê ra file JSON do người dùng chọn."""
+        if self.stats is None:
+            messagebox.showerror("Lỗi", "Chưa bật chẩn đoán.")
+            return
+        filename = filedialog.asksaveasfilename(parent=self.root, defaultextension=".json",
+                                                filetypes=[("JSON files", "*.json")],
+                                                initialfile="diagnostics.json",
+                                                initialdir=os.path.expanduser("~/Desktop"))
+        if not filename:
+            return
+        if self.stats.dump(filename):
+            messagebox.showinfo("Thành công", f"Đã xuất thống kê tại: {filename}")
+        else:
+            messagebox.showerror("Lỗi", "Không thể ghi file. Vui lòng kiểm tra logs/app.log.")
+
+    def reset_stats(self):
+        """Xóa thống kê đã thu thập."""
+        if self.stats is not None and messagebox.askyesno("Xác nhận", "Xóa toàn bộ thống kê đã thu thập?"):
+            self.stats.reset()
+            self.refresh()
@@ -1,36 +1,22 @@
 import tkinter as tk
 from tkinter import messagebox, ttk
-from database import Database
+from database import open_database
+from background import get_executor
+from search import SearchBox, sync_tree
+from screens import Popup
 import os
 
 class LearnerScreen:
-    def __init__(self, root, username, callback):
-        """Khởi tạo giao diện quản lý người học."""
+    def __init__(self, root, username, callback, screens):
+        """Khởi tạo giao diện quản lý người học (dựng một lần, giữ lại trong screens)."""
         self.root = root
         self.username = username
         self.callback = callback
-        self.db = Database()
-        self.root.title("TutorPay - Quản lý người học")
-        self.root.geometry("700x600")
-        self.root.configure(bg="#F5F7FA")
-        self.style = ttk.Style()
-        self.configure_styles()
-        self.set_window_icon(self.root)
-        self.center_window()
-        self.show_learner_screen()
-
-    def configure_styles(self):
-        """Cấu hình kiểu dáng cho các widget."""
-        self.style.configure("TEntry", padding=8, font=("Segoe UI", 11))
-        self.style.configure("TButton", padding=8, font=("Segoe UI", 11, "bold"))
-        self.style.configure("TLabel", background="#FFFFFF", font=("Segoe UI", 11))
-        self.style.configure("Header.TLabel", font=("Segoe UI", 20, "bold"), foreground="#1E88E5")
-        self.style.configure("SubHeader.TLabel", font=("Segoe UI", 11), foreground="#37474F")
-        self.style.configure("Treeview", font=("Segoe UI", 11), rowheight=30)
-        self.style.configure("Treeview.Heading", font=("Segoe UI", 11, "bold"))
-        self.style.configure("TCombobox", padding=8, font=("Segoe UI", 11))
-        self.style.configure("Hover.TButton", background="#1565C0", foreground="#1565C0")
-        self.style.configure("TCheckbutton", background="#FFFFFF", font=("Segoe UI", 11))
+        self.screens = screens
+        self.db = open_database()
+        self.executor = get_executor(self.root)
+        self.edit_popup = None
+        self.build_learner_screen()
 
     def set_window_icon(self, window):
         """Đặt biểu tượng cửa sổ thành annc19324.ico."""
@@ -43,24 +29,6 @@ class LearnerScreen:
         except tk.TclError as e:
             print(f"Error setting icon: {e}. Skipping icon setting.")
 
-    def center_window(self):
-        """Căn giữa cửa sổ trên màn hình."""
-        self.root.update_idletasks()
-        width = self.root.winfo_width()
-        height = self.root.winfo_height()
-        x = (self.root.winfo_screenwidth() // 2) - (width // 2)
-        y = (self.root.winfo_screenheight() // 2) - (height // 2)
-        self.root.geometry(f"{width}x{height}+{x}+{y}")
-
-    def clear_screen(self):
-        """Xóa tất cả widget trên màn hình và đặt lại cấu hình cửa sổ."""
-        for widget in self.root.winfo_children():
-            widget.destroy()
-        self.root.geometry("700x600")
-        self.root.grid_rowconfigure(0, weight=0)
-        self.root.grid_columnconfigure(0, weight=0)
-        self.root.update_idletasks()
-
     def create_button(self, frame, text, command, bg_color):
         """Tạo nút với hiệu ứng hover."""
         button = ttk.Button(frame, text=text, command=command, style="TButton")
@@ -70,12 +38,14 @@ class LearnerScreen:
         button.pack(side="left", padx=5, pady=5)
         return button
 
-    def show_learner_screen(self):
-        """Hiển thị giao diện quản lý người học."""
-        self.clear_screen()
-        self.root.geometry("700x600")
+    def show(self):
+        """Hiển thị màn hình đã dựng và làm mới danh sách (chỉ các dòng thay đổi)."""
+        self.screens.show("learners")
+
+    def build_learner_screen(self):
+        """Dựng giao diện quản lý người học."""
         main_frame = tk.Frame(self.root, bg="#F5F7FA")
-        main_frame.pack(expand=True, fill="both", padx=15, pady=15)
+        self.frame = main_frame
 
         header_frame = tk.Frame(main_frame, bg="#F5F7FA")
         header_frame.pack(fill="x")
@@ -91,6 +61,13 @@ class LearnerScreen:
         self.learner_name_entry.bind("<Return>", lambda event: self.add_learner())
         self.create_button(form_frame, "Thêm", self.add_learner, "#43A047").pack(side="left", padx=10)
 
+        search_frame = tk.Frame(main_frame, bg="#FFFFFF", bd=0, relief="flat")
+        search_frame.pack(fill="x", pady=(0, 10))
+        search_frame.configure(highlightbackground="#E0E0E0", highlightthickness=1)
+        ttk.Label(search_frame, text="Tìm kiếm:").pack(side="left", padx=10, pady=5)
+        search_entry = ttk.Entry(search_frame, style="TEntry")
+        search_entry.pack(side="left", padx=5, pady=5, fill="x", expand=True)
+
         tree_frame = tk.Frame(main_frame, bg="#FFFFFF")
         tree_frame.pack(expand=True, fill="both", pady=10)
         columns = ("ID", "Tên người học")
@@ -104,6 +81,8 @@ class LearnerScreen:
         vsb = ttk.Scrollbar(tree_frame, orient="vertical", command=self.tree.yview)
         vsb.pack(side="right", fill="y")
         self.tree.configure(yscrollcommand=vsb.set)
+        self.search_box = SearchBox(search_entry, self.executor,
+                                    lambda db, query: db.search_learners(self.username, query), self.show_learners)
 
         button_frame = tk.Frame(main_frame, bg="#F5F7FA")
         button_frame.pack(pady=10)
@@ -111,8 +90,7 @@ class LearnerScreen:
         self.create_button(button_frame, "Xóa", self.delete_learner, "#EF5350")
         self.create_button(button_frame, "Quay lại", self.callback, "#78909C")
 
-        self.load_learners()
-        self.center_window()
+        self.screens.add("learners", main_frame, "TutorPay - Quản lý người học", "700x600", self.load_learners)
 
     def add_learner(self):
         """Thêm người học mới."""
@@ -128,55 +106,54 @@ class LearnerScreen:
             messagebox.showerror("Lỗi", "Không thể thêm người học. Vui lòng thử lại.")
 
     def load_learners(self):
-        """Tải danh sách người học vào Treeview."""
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        learners = self.db.get_learners(self.username)
-        for learner in learners:
-            self.tree.insert("", tk.END, values=learner)
+        """Tải lại danh sách người học theo từ khóa tìm kiếm hiện tại (trên luồng cơ sở dữ liệu)."""
+        self.search_box.run(force=True)
+
+    def show_learners(self, query, learners):
+        """Cập nhật Treeview theo kết quả tìm kiếm, chỉ thay đổi các dòng khác trước."""
+        sync_tree(self.tree, "", [(f"l{learner[0]}", learner) for learner in learners])
 
     def show_edit_learner_popup(self):
-        """Hiển thị cửa sổ chỉnh sửa tên người học."""
+        """Hiển thị cửa sổ chỉnh sửa tên người học (dựng một lần, mỗi lần mở chỉ điền lại dữ liệu)."""
         selected_item = self.tree.selection()
         if not selected_item:
             messagebox.showerror("Lỗi", "Vui lòng chọn người học để chỉnh sửa.")
             return
         
-        learner_id = self.tree.item(selected_item)["values"][0]
-        current_name = self.tree.item(selected_item)["values"][1]
-
-        top = tk.Toplevel(self.root)
-        top.title("Chỉnh sửa người học")
-        top.geometry("350x200")
-        top.configure(bg="#F5F7FA")
+        self.edit_learner_id = self.tree.item(selected_item)["values"][0]
+        self.edit_current_name = self.tree.item(selected_item)["values"][1]
+        if self.edit_popup is None:
+            self.edit_popup = Popup(self.frame, "Chỉnh sửa người học", "350x200", self.build_edit_learner_popup,
+                                    self.fill_edit_learner_popup)
+        self.edit_popup.open()
+
+    def build_edit_learner_popup(self, top):
+        """Dựng cửa sổ chỉnh sửa tên người học."""
         self.set_window_icon(top)
 
-        top.update_idletasks()
-        width = top.winfo_width()
-        height = top.winfo_height()
-        x = (self.root.winfo_width() - width) // 2 + self.root.winfo_x()
-        y = (self.root.winfo_height() - height) // 2 + self.root.winfo_y()
-        top.geometry(f"{width}x{height}+{x}+{y}")
-
         frame = tk.Frame(top, bg="#FFFFFF", bd=0, relief="flat")
         frame.pack(expand=True, fill="both", padx=15, pady=15)
         frame.configure(highlightbackground="#E0E0E0", highlightthickness=1)
 
         ttk.Label(frame, text="Tên người học:", background="#FFFFFF").pack(anchor="w", pady=5)
-        name_entry = ttk.Entry(frame, style="TEntry")
-        name_entry.pack(fill="x", pady=5)
-        name_entry.insert(0, current_name)
+        self.edit_name_entry = ttk.Entry(frame, style="TEntry")
+        self.edit_name_entry.pack(fill="x", pady=5)
 
         button_frame = tk.Frame(frame, bg="#FFFFFF")
         button_frame.pack(pady=10)
         self.create_button(button_frame, "Lưu",
-                          lambda: self.save_new_name(learner_id, name_entry.get(), top),
+                          lambda: self.save_new_name(self.edit_learner_id, self.edit_name_entry.get()),
                           "#1E88E5")
 
-        name_entry.focus_set()
-        name_entry.bind("<Return>", lambda event: self.save_new_name(learner_id, name_entry.get(), top))
+        self.edit_name_entry.bind("<Return>", lambda event: self.save_new_name(self.edit_learner_id, self.edit_name_entry.get()))
+
+    def fill_edit_learner_popup(self):
+        """Điền tên hiện tại của người học được chọn."""
+        self.edit_name_entry.delete(0, tk.END)
+        self.edit_name_entry.insert(0, self.edit_current_name)
+        self.edit_name_entry.focus_set()
 
-    def save_new_name(self, learner_id, new_name, top):
+    def save_new_name(self, learner_id, new_name):
         """Lưu tên người học đã chỉnh sửa."""
         if not new_name:
             messagebox.showerror("Lỗi", "Vui lòng nhập tên người học.")
@@ -184,7 +161,7 @@ class LearnerScreen:
         self.db.update_learner(learner_id, new_name)
         messagebox.showinfo("Thành công", "Đã cập nhật người học!")
         self.load_learners()
-        top.destroy()
+        self.edit_popup.close()
 
     def delete_learner(self):
         """Xóa người học được chọn."""
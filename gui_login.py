@@ -1,41 +1,46 @@
 import tkinter as tk
 from tkinter import messagebox, ttk
-import webbrowser
-from database import Database
-from gui_learner import LearnerScreen
-from gui_payroll import PayrollScreen
-from gui_account import AccountScreen
-from PIL import Image, ImageTk
+from database import open_database
+from settings import load_settings
+from screens import ScreenManager, Popup
+from background import get_executor
 import os
 
+# Khoảng thời gian (ms) giữa hai lần kiểm tra sao lưu tự động; lần đầu chạy sau khi cửa sổ đăng nhập hiện
+BACKUP_CHECK_MS = 60 * 60 * 1000
+BACKUP_START_MS = 5000
+
 class LoginScreen:
     def __init__(self, root):
         """Khởi tạo giao diện đăng nhập."""
         self.root = root
-        self.root.title("TutorPay - Đăng nhập")
-        self.root.geometry("500x400")
         self.root.configure(bg="#F5F7FA")
-        self.db = Database()
+        self.db = open_database()
         self.current_user = None
         self.current_fullname = None
-        self.style = ttk.Style()
-        self.configure_styles()
+        # Các màn hình được dựng một lần và giữ lại; điều hướng chỉ ẩn/hiện khung
+        self.screens = ScreenManager(self.root)
         self.set_window_icon(self.root)
-        self.center_window()
+        self.forgot_popup = None
+        self.donate_popup = None
+        self.change_password_popup = None
+        self.backup_popup = None
         self.show_login()
-
-    def configure_styles(self):
-        """Cấu hình kiểu dáng cho các widget."""
-        self.style.configure("TEntry", padding=8, font=("Segoe UI", 11))
-        self.style.configure("TButton", padding=8, font=("Segoe UI", 11, "bold"))
-        self.style.configure("TLabel", background="#FFFFFF", font=("Segoe UI", 11))
-        self.style.configure("Header.TLabel", font=("Segoe UI", 20, "bold"), foreground="#1E88E5")
-        self.style.configure("SubHeader.TLabel", font=("Segoe UI", 11), foreground="#37474F")
-        self.style.configure("Treeview", font=("Segoe UI", 11), rowheight=30)
-        self.style.configure("Treeview.Heading", font=("Segoe UI", 11, "bold"))
-        self.style.configure("TCombobox", padding=8, font=("Segoe UI", 11))
-        self.style.configure("Hover.TButton", background="#1565C0", foreground="#1565C0")
-        self.style.configure("TCheckbutton", background="#FFFFFF", font=("Segoe UI", 11))
+        if load_settings().get("pdf_warm_up", True):
+            # Làm nóng phần xuất PDF khi vòng lặp Tk đã rảnh, sau khi cửa sổ đăng nhập hiển thị
+            self.root.after_idle(self.warm_up_pdf)
+        self.root.after(BACKUP_START_MS, self.scheduled_backup)
+
+    def warm_up_pdf(self):
+        """Nạp trước reportlab và font trong luồng nền."""
+        from pdf_utils import warm_up
+        warm_up()
+
+    def scheduled_backup(self):
+        """Sao lưu tự động trong luồng nền nếu đã đến hạn, rồi hẹn lần kiểm tra tiếp theo."""
+        from backup import run_scheduled_backup
+        get_executor(self.root).submit(run_scheduled_backup)
+        self.root.after(BACKUP_CHECK_MS, self.scheduled_backup)
 
     def set_window_icon(self, window):
         """Đặt biểu tượng cửa sổ thành annc19324.ico."""
@@ -48,24 +53,6 @@ class LoginScreen:
         except tk.TclError as e:
             print(f"Error setting icon: {e}. Skipping icon setting.")
 
-    def center_window(self):
-        """Căn giữa cửa sổ trên màn hình."""
-        self.root.update_idletasks()
-        width = self.root.winfo_width()
-        height = self.root.winfo_height()
-        x = (self.root.winfo_screenwidth() // 2) - (width // 2)
-        y = (self.root.winfo_screenheight() // 2) - (height // 2)
-        self.root.geometry(f"{width}x{height}+{x}+{y}")
-
-    def clear_screen(self):
-        """Xóa tất cả widget trên màn hình và đặt lại cấu hình cửa sổ."""
-        for widget in self.root.winfo_children():
-            widget.destroy()
-        self.root.geometry("500x400")
-        self.root.grid_rowconfigure(0, weight=0)
-        self.root.grid_columnconfigure(0, weight=0)
-        self.root.update_idletasks()
-
     def create_button(self, frame, text, command, bg_color):
         """Tạo nút với hiệu ứng hover."""
         button = ttk.Button(frame, text=text, command=command, style="TButton")
@@ -79,11 +66,19 @@ class LoginScreen:
         entry.config(show='' if var.get() else '*')
 
     def show_login(self):
-        """Hiển thị giao diện đăng nhập."""
-        self.clear_screen()
-        self.root.geometry("500x400")
+        """Hiển thị giao diện đăng nhập (dựng ở lần đầu)."""
+        if not self.screens.has("login"):
+            self.build_login()
+        self.screens.show("login")
+
+    def reset_login(self):
+        """Xóa mật khẩu đã nhập và đưa con trỏ về ô tên người dùng mỗi lần quay lại màn hình đăng nhập."""
+        self.password_entry.delete(0, tk.END)
+        self.username_entry.focus_set()
+
+    def build_login(self):
+        """Dựng giao diện đăng nhập."""
         main_frame = tk.Frame(self.root, bg="#F5F7FA")
-        main_frame.pack(expand=True, fill="both", padx=15, pady=15)
 
         header_frame = tk.Frame(main_frame, bg="#F5F7FA")
         header_frame.pack(fill="x")
@@ -110,6 +105,7 @@ class LoginScreen:
 
         self.username_entry = username_entry
         self.password_entry = password_entry
+        self.screens.add("login", main_frame, "TutorPay - Đăng nhập", "500x400", self.reset_login)
 
         button_frame = tk.Frame(main_frame, bg="#F5F7FA")
         button_frame.pack(pady=10, fill="x")
@@ -126,21 +122,27 @@ class LoginScreen:
                                           "#78909C")
         forgot_button.pack(side="left", padx=5, fill="x", expand=True)
 
-        username_entry.focus_set()
         username_entry.bind("<Return>", lambda event: password_entry.focus_set())
         password_entry.bind("<Return>", lambda event: self.login(username_entry.get(), password_entry.get()))
         login_button.bind("<Return>", lambda event: self.login(username_entry.get(), password_entry.get()))
         register_button.bind("<Return>", lambda event: self.show_register())
         forgot_button.bind("<Return>", lambda event: self.forgot_password())
 
-        self.center_window()
-
     def show_register(self):
-        """Hiển thị giao diện đăng ký."""
-        self.clear_screen()
-        self.root.geometry("500x480")
+        """Hiển thị giao diện đăng ký (dựng ở lần đầu)."""
+        if not self.screens.has("register"):
+            self.build_register()
+        self.screens.show("register")
+
+    def reset_register(self):
+        """Xóa dữ liệu đã nhập mỗi lần mở màn hình đăng ký."""
+        for entry in self.register_entries:
+            entry.delete(0, tk.END)
+        self.register_entries[0].focus_set()
+
+    def build_register(self):
+        """Dựng giao diện đăng ký."""
         main_frame = tk.Frame(self.root, bg="#F5F7FA")
-        main_frame.pack(expand=True, fill="both", padx=15, pady=15)
 
         header_frame = tk.Frame(main_frame, bg="#F5F7FA")
         header_frame.pack(fill="x")
@@ -169,9 +171,8 @@ class LoginScreen:
                                              style="TCheckbutton")
         show_password_check.pack(anchor="w", padx=10, pady=5)
 
-        self.username_entry = username_entry
-        self.fullname_entry = fullname_entry
-        self.password_entry = password_entry
+        self.register_entries = (username_entry, fullname_entry, password_entry)
+        self.screens.add("register", main_frame, "TutorPay - Đăng ký", "500x480", self.reset_register)
 
         button_frame = tk.Frame(main_frame, bg="#F5F7FA")
         button_frame.pack(pady=10, fill="x")
@@ -184,15 +185,12 @@ class LoginScreen:
                                         "#78909C")
         back_button.pack(side="left", padx=5, fill="x", expand=True)
 
-        username_entry.focus_set()
         username_entry.bind("<Return>", lambda event: fullname_entry.focus_set())
         fullname_entry.bind("<Return>", lambda event: password_entry.focus_set())
         password_entry.bind("<Return>", lambda event: self.register(username_entry.get(), fullname_entry.get(), password_entry.get()))
         register_button.bind("<Return>", lambda event: self.register(username_entry.get(), fullname_entry.get(), password_entry.get()))
         back_button.bind("<Return>", lambda event: self.show_login())
 
-        self.center_window()
-
     def login(self, username, password):
         """Xử lý đăng nhập người dùng."""
         if not username or not password:
@@ -200,6 +198,9 @@ class LoginScreen:
             return
         user = self.db.login_user(username, password)
         if user:
+            # Màn hình chức năng của lần đăng nhập trước gắn với người dùng cũ nên được dựng lại
+            self.screens.reset(keep=("login", "register"))
+            self.change_password_popup = None
             self.current_user, self.current_fullname = user
             self.show_main()
         else:
@@ -218,18 +219,13 @@ class LoginScreen:
 
     def forgot_password(self):
         """Hiển thị thông tin khôi phục mật khẩu."""
-        top = tk.Toplevel(self.root)
-        top.title("Quên Mật Khẩu")
-        top.geometry("400x220")
-        top.configure(bg="#F5F7FA")
-        self.set_window_icon(top)
+        if self.forgot_popup is None:
+            self.forgot_popup = Popup(self.root, "Quên Mật Khẩu", "400x220", self.build_forgot_password)
+        self.forgot_popup.open()
 
-        top.update_idletasks()
-        width = top.winfo_width()
-        height = top.winfo_height()
-        x = (self.root.winfo_width() - width) // 2 + self.root.winfo_x()
-        y = (self.root.winfo_height() - height) // 2 + self.root.winfo_y()
-        top.geometry(f"{width}x{height}+{x}+{y}")
+    def build_forgot_password(self, top):
+        """Dựng cửa sổ thông tin khôi phục mật khẩu."""
+        self.set_window_icon(top)
 
         frame = tk.Frame(top, bg="#FFFFFF", bd=0, relief="flat")
         frame.pack(expand=True, fill="both", padx=15, pady=15)
@@ -240,21 +236,26 @@ class LoginScreen:
         
         link_label = tk.Label(frame, text="https://www.facebook.com/annc19324", fg="blue", cursor="hand2", background="#FFFFFF", font=("Segoe UI", 11, "underline"))
         link_label.pack(pady=5)
-        link_label.bind("<Button-1>", lambda e: webbrowser.open("https://www.facebook.com/annc19324"))
+        link_label.bind("<Button-1>", lambda e: self.open_link("https://www.facebook.com/annc19324"))
 
         button_frame = tk.Frame(frame, bg="#FFFFFF")
         button_frame.pack(pady=10)
-        close_button = self.create_button(button_frame, "Đóng", top.destroy, "#78909C")
+        close_button = self.create_button(button_frame, "Đóng", self.forgot_popup.close, "#78909C")
         close_button.pack(side="left", padx=5)
 
-        close_button.bind("<Return>", lambda event: top.destroy())
+        close_button.bind("<Return>", lambda event: self.forgot_popup.close())
 
     def show_main(self):
-        """Hiển thị giao diện chính sau khi đăng nhập với nhiều chức năng."""
-        self.clear_screen()
-        self.root.geometry("600x400")
+        """Hiển thị giao diện chính sau khi đăng nhập (dựng một lần cho mỗi lần đăng nhập)."""
+        if not self.screens.has("main"):
+            self.build_main()
+        self.screens.show("main")
+
+    def build_main(self):
+        """Dựng giao diện chính với các nút chức năng theo quyền của người dùng hiện tại."""
         main_frame = tk.Frame(self.root, bg="#F5F7FA")
-        main_frame.pack(expand=True, fill="both", padx=15, pady=15)
+        self.main_frame = main_frame
+        self.screens.add("main", main_frame, "TutorPay", "600x460")
 
         header_frame = tk.Frame(main_frame, bg="#F5F7FA")
         header_frame.pack(fill="x")
@@ -265,8 +266,9 @@ class LoginScreen:
         button_frame.pack(pady=20, fill="both", expand=True)
 
         buttons = [
-            ("Quản lý người học", lambda: LearnerScreen(self.root, self.current_user, self.show_main), "#1E88E5"),
-            ("Quản lý bảng lương", lambda: PayrollScreen(self.root, self.current_user, self.show_main), "#1E88E5"),
+            ("Quản lý người học", self.show_learners, "#1E88E5"),
+            ("Quản lý bảng lương", self.show_payrolls, "#1E88E5"),
+            ("Báo cáo thu nhập", self.show_report, "#1E88E5"),
             ("Hỗ trợ", self.support, "#1E88E5"),
             ("Ủng hộ", self.show_donate, "#43A047"),
             ("Xóa dữ liệu", self.delete_account, "#EF5350"),
@@ -274,9 +276,11 @@ class LoginScreen:
         ]
 
         if self.current_user == 'admin':
-            buttons.append(("Quản lý tài khoản", lambda: AccountScreen(self.root, self.current_user, self.show_main), "#1E88E5"))
+            buttons.append(("Quản lý tài khoản", self.show_accounts, "#1E88E5"))
+            buttons.append(("Chẩn đoán", self.show_diagnostics, "#1E88E5"))
+            buttons.append(("Sao lưu", self.show_backups, "#1E88E5"))
         
-        buttons.append(("Đăng xuất", self.show_login, "#EF5350"))
+        buttons.append(("Đăng xuất", self.logout, "#EF5350"))
 
         for i, (text, command, color) in enumerate(buttons):
             row = i // 2
@@ -290,32 +294,67 @@ class LoginScreen:
         for i in range((len(buttons) + 1) // 2):
             button_frame.grid_rowconfigure(i, weight=1)
 
-        self.center_window()
+    def logout(self):
+        """Đăng xuất: hủy các màn hình của người dùng hiện tại và quay lại màn hình đăng nhập."""
+        self.current_user = None
+        self.current_fullname = None
+        self.change_password_popup = None
+        self.backup_popup = None
+        self.screens.reset(keep=("login", "register"))
+        self.show_login()
+
+    def open_link(self, url):
+        """Mở liên kết trong trình duyệt (webbrowser chỉ được nạp khi cần)."""
+        import webbrowser
+        webbrowser.open(url)
+
+    # Các màn hình chức năng chỉ được nạp khi mở lần đầu để cửa sổ đăng nhập hiện nhanh hơn,
+    # sau đó được giữ lại và chỉ làm mới dữ liệu khi mở lại
+    def show_learners(self):
+        """Mở màn hình quản lý người học."""
+        from gui_learner import LearnerScreen
+        self.screens.screen("learners", lambda: LearnerScreen(self.root, self.current_user, self.show_main, self.screens)).show()
+
+    def show_payrolls(self):
+        """Mở màn hình quản lý bảng lương."""
+        from gui_payroll import PayrollScreen
+        self.screens.screen("payrolls", lambda: PayrollScreen(self.root, self.current_user, self.show_main, self.screens)).show()
+
+    def show_report(self):
+        """Mở màn hình báo cáo thu nhập."""
+        from gui_report import ReportScreen
+        self.screens.screen("report", lambda: ReportScreen(self.root, self.current_user, self.show_main, self.screens)).show()
+
+    def show_accounts(self):
+        """Mở màn hình quản lý tài khoản."""
+        from gui_account import AccountScreen
+        self.screens.screen("accounts", lambda: AccountScreen(self.root, self.current_user, self.show_main, self.screens)).show()
+
+    def show_diagnostics(self):
+        """Mở màn hình chẩn đoán truy vấn."""
+        from gui_diagnostics import DiagnosticsScreen
+        self.screens.screen("diagnostics", lambda: DiagnosticsScreen(self.root, self.current_user, self.show_main, self.screens)).show()
 
     def support(self):
         """Hiển thị thông tin hỗ trợ."""
         messagebox.showinfo("Hỗ trợ", "Liên hệ hỗ trợ qua email: annc19324@gmail.com")
 
     def show_donate(self):
-        """Hiển thị mã QR ủng hộ."""
-        top = tk.Toplevel(self.root)
-        top.title("Ủng hộ TutorPay")
-        top.geometry("400x450")
-        top.configure(bg="#F5F7FA")
-        self.set_window_icon(top)
+        """Hiển thị mã QR ủng hộ (ảnh chỉ được đọc và thu nhỏ ở lần mở đầu tiên)."""
+        if self.donate_popup is None:
+            self.donate_popup = Popup(self.root, "Ủng hộ TutorPay", "400x450", self.build_donate)
+        self.donate_popup.open()
 
-        top.update_idletasks()
-        width = top.winfo_width()
-        height = top.winfo_height()
-        x = (self.root.winfo_width() - width) // 2 + self.root.winfo_x()
-        y = (self.root.winfo_height() - height) // 2 + self.root.winfo_y()
-        top.geometry(f"{width}x{height}+{x}+{y}")
+    def build_donate(self, top):
+        """Dựng cửa sổ mã QR ủng hộ."""
+        self.set_window_icon(top)
 
         frame = tk.Frame(top, bg="#FFFFFF", bd=0, relief="flat")
         frame.pack(expand=True, fill="both", padx=15, pady=15)
         frame.configure(highlightbackground="#E0E0E0", highlightthickness=1)
 
         try:
+            from PIL import Image, ImageTk
             qr_path = os.path.join(os.path.dirname(__file__), "annc19324.jpg")
             qr_image = Image.open(qr_path)
             qr_image = qr_image.resize((300, 300), Image.Resampling.LANCZOS)
@@ -326,16 +365,17 @@ class LoginScreen:
         except Exception as e:
             messagebox.showerror("Lỗi", f"Không thể tải mã QR: {e}")
             top.destroy()
+            self.donate_popup = None
             return
 
         ttk.Label(frame, text="Quét mã QR để ủng hộ TutorPay", background="#FFFFFF", font=("Segoe UI", 11)).pack(pady=5)
 
         button_frame = tk.Frame(frame, bg="#FFFFFF")
         button_frame.pack(pady=10)
-        close_button = self.create_button(button_frame, "Đóng", top.destroy, "#78909C")
+        close_button = self.create_button(button_frame, "Đóng", self.donate_popup.close, "#78909C")
         close_button.pack(side="left", padx=5)
 
-        close_button.bind("<Return>", lambda event: top.destroy())
+        close_button.bind("<Return>", lambda event: self.donate_popup.close())
 
     def delete_account(self):
         """Xóa toàn bộ dữ liệu của tài khoản hiện tại."""
@@ -345,27 +385,28 @@ class LoginScreen:
         if messagebox.askyesno("Xác nhận", "Bạn có chắc chắn muốn xóa toàn bộ dữ liệu của tài khoản này? Hành động này không thể hoàn tác."):
             if self.db.delete_user(self.current_user):
                 messagebox.showinfo("Thành công", "Đã xóa toàn bộ dữ liệu của tài khoản!")
-                self.current_user = None
-                self.current_fullname = None
-                self.show_login()
+                self.logout()
             else:
                 messagebox.showerror("Lỗi", "Không thể xóa dữ liệu. Vui lòng thử lại.")
 
     def show_change_password(self):
         """Hiển thị cửa sổ đổi mật khẩu."""
-        top = tk.Toplevel(self.root)
-        top.title("Đổi mật khẩu")
-        top.geometry("350x320")
-        top.configure(bg="#F5F7FA")
+        if self.change_password_popup is None:
+            # Cửa sổ thuộc màn hình chính nên bị hủy cùng nó khi đăng xuất
+            self.change_password_popup = Popup(self.main_frame, "Đổi mật khẩu", "350x320", self.build_change_password,
+                                               self.reset_change_password)
+        self.change_password_popup.open()
+
+    def reset_change_password(self):
+        """Xóa các mật khẩu đã nhập mỗi lần mở cửa sổ."""
+        for entry in self.change_password_entries:
+            entry.delete(0, tk.END)
+        self.change_password_entries[0].focus_set()
+
+    def build_change_password(self, top):
+        """Dựng cửa sổ đổi mật khẩu."""
         self.set_window_icon(top)
 
-        top.update_idletasks()
-        width = top.winfo_width()
-        height = top.winfo_height()
-        x = (self.root.winfo_width() - width) // 2 + self.root.winfo_x()
-        y = (self.root.winfo_height() - height) // 2 + self.root.winfo_y()
-        top.geometry(f"{width}x{height}+{x}+{y}")
-
         frame = tk.Frame(top, bg="#FFFFFF", bd=0, relief="flat")
         frame.pack(expand=True, fill="both", padx=15, pady=15)
         frame.configure(highlightbackground="#E0E0E0", highlightthickness=1)
@@ -395,22 +436,21 @@ class LoginScreen:
         save_button = self.create_button(button_frame, "Lưu",
                                         lambda: self.change_password(
                                             current_password_entry.get(),
-                                            new_password_entry.get(),
-                                            top
+                                            new_password_entry.get()
                                         ),
                                         "#1E88E5")
         save_button.pack(side="left", padx=5)
 
-        current_password_entry.focus_set()
+        self.change_password_entries = (current_password_entry, new_password_entry)
         current_password_entry.bind("<Return>", lambda event: new_password_entry.focus_set())
         new_password_entry.bind("<Return>", lambda event: self.change_password(
-            current_password_entry.get(), new_password_entry.get(), top
+            current_password_entry.get(), new_password_entry.get()
         ))
         save_button.bind("<Return>", lambda event: self.change_password(
-            current_password_entry.get(), new_password_entry.get(), top
+            current_password_entry.get(), new_password_entry.get()
         ))
 
-    def change_password(self, current_password, new_password, top):
+    def change_password(self, current_password, new_password):
         """Xử lý đổi mật khẩu."""
         if not current_password or not new_password:
             messagebox.showerror("Lỗi", "Vui lòng nhập đầy đủ thông tin!")
@@ -421,6 +461,96 @@ class LoginScreen:
             return
         if self.db.update_password(self.current_user, new_password):
             messagebox.showinfo("Thành công", "Mật khẩu đã được cập nhật!")
-            top.destroy()
+            self.change_password_popup.close()
         else:
-            messagebox.showerror("Lỗi", "Không thể cập nhật mật khẩu. Vui lòng thử lại.")
\ No newline at end of file
+            messagebox.showerror("Lỗi", "Không thể cập nhật mật khẩu. Vui lòng thử lại.")
+
+    def show_backups(self):
+        """Hiển thị cửa sổ sao lưu và khôi phục (dành cho admin)."""
+        if self.backup_popup is None:
+            self.backup_popup = Popup(self.main_frame, "Sao lưu dữ liệu", "520x380", self.build_backups,
+                                      self.refresh_backups)
+        self.backup_popup.open()
+
+    def build_backups(self, top):
+        """Dựng cửa sổ sao lưu: danh sách bản sao lưu, tiến độ và các nút thao tác."""
+        from backup import backup_dir
+        self.set_window_icon(top)
+
+        frame = tk.Frame(top, bg="#FFFFFF", bd=0, relief="flat")
+        frame.pack(expand=True, fill="both", padx=15, pady=15)
+        frame.configure(highlightbackground="#E0E0E0", highlightthickness=1)
+
+        ttk.Label(frame, text=f"Thư mục: {backup_dir()}", background="#FFFFFF", wraplength=460).pack(anchor="w", pady=5)
+        list_frame = tk.Frame(frame, bg="#FFFFFF")
+        list_frame.pack(expand=True, fill="both", pady=5)
+        self.backup_list = tk.Listbox(list_frame, height=8, font=("Consolas", 10), activestyle="none")
+        self.backup_list.pack(side="left", expand=True, fill="both")
+        vsb = ttk.Scrollbar(list_frame, orient="vertical", command=self.backup_list.yview)
+        vsb.pack(side="right", fill="y")
+        self.backup_list.configure(yscrollcommand=vsb.set)
+
+        self.backup_progress = ttk.Progressbar(frame, mode="determinate")
+        self.backup_progress.pack(fill="x", pady=5)
+        self.backup_status = ttk.Label(frame, text="", background="#FFFFFF")
+        self.backup_status.pack(anchor="w")
+
+        button_frame = tk.Frame(frame, bg="#FFFFFF")
+        button_frame.pack(pady=10)
+        self.create_button(button_frame, "Sao lưu ngay", self.backup_now, "#43A047").pack(side="left", padx=5)
+        self.create_button(button_frame, "Khôi phục", self.restore_selected, "#EF5350").pack(side="left", padx=5)
+        self.create_button(button_frame, "Đóng", self.backup_popup.close, "#78909C").pack(side="left", padx=5)
+        self.backup_paths = []
+
+    def refresh_backups(self):
+        """Đọc lại danh sách bản sao lưu, mới nhất trước."""
+        from backup import list_backups
+        self.backup_paths = []
+        self.backup_list.delete(0, tk.END)
+        for path, taken, size in list_backups():
+            self.backup_paths.append(path)
+            self.backup_list.insert(tk.END, f"{taken:%d/%m/%Y %H:%M:%S}  {size / 1024:>9,.0f} KB  "
+                                            f"{os.path.basename(path)}")
+
+    def backup_now(self):
+        """Tạo bản sao lưu trong luồng nền, cập nhật thanh tiến độ theo số trang đã chép."""
+        from backup import run_scheduled_backup
+        executor = get_executor(self.root)
+
+        def on_progress(done, total):
+            if self.backup_progress.winfo_exists():
+                self.backup_progress.configure(maximum=total, value=done)
+
+        def on_done(path):
+            self.backup_status.config(text=f"Đã sao lưu: {os.path.basename(path)}")
+            self.refresh_backups()
+
+        self.backup_status.config(text="Đang sao lưu...")
+        executor.submit(run_scheduled_backup, True, lambda done, total: executor.post(on_progress, done, total),
+                        on_done=on_done, on_error=self.on_backup_error, busy=True)
+
+    def restore_selected(self):
+        """Khôi phục bản sao lưu được chọn rồi đăng xuất để các màn hình đọc lại dữ liệu."""
+        from backup import restore_backup
+        selected = self.backup_list.curselection()
+        if not selected:
+            messagebox.showerror("Lỗi", "Vui lòng chọn bản sao lưu!", parent=self.backup_popup.window)
+            return
+        path = self.backup_paths[selected[0]]
+        if not messagebox.askyesno("Xác nhận", f"Khôi phục dữ liệu từ {os.path.basename(path)}? Dữ liệu hiện tại "
+                                   "được sao lưu trước khi bị thay thế.", parent=self.backup_popup.window):
+            return
+
+        def on_done(previous):
+            messagebox.showinfo("Thành công", f"Đã khôi phục dữ liệu. Dữ liệu trước đó được lưu tại:\n{previous}")
+            self.logout()
+
+        self.backup_status.config(text="Đang khôi phục...")
+        get_executor(self.root).submit_db(lambda db: restore_backup(path, db.conn), on_done=on_done,
+                                          on_error=self.on_backup_error, busy=True)
+
+    def on_backup_error(self, error):
+        """Báo lỗi sao lưu hoặc khôi phục."""
+        if self.backup_popup is not None and self.backup_popup.is_open():
+            self.backup_status.config(text="")
+        messagebox.showerror("Lỗi", f"Không thể sao lưu/khôi phục: {error}")
@@ -1,48 +1,49 @@
 import tkinter as tk
 from tkinter import messagebox, ttk
-import pytz
-from datetime import datetime
 import logging
 import os
-from database import Database
-from utils import get_weeks_in_month, format_currency
-from pdf_utils import export_to_pdf
+from database import open_database
+from utils import format_currency, vn_now
+from tkinter import filedialog
+from pdf_utils import ask_pdf_filename, export_to_pdf, export_batch_pdf
+from attendance_import import import_attendance_file
+from payroll_sheet import PayrollSheet
+from attendance_journal import get_journal
+from background import get_executor
+from search import SearchBox, sync_tree
+from calendar_grid import CalendarGrid
+from screens import Popup
+
+# Số bảng lương mỗi trang khi mở một tháng hoặc khi tìm kiếm
+PAGE_SIZE = 50
 
 class PayrollScreen:
-    def __init__(self, root, username, back_callback):
-        """Khởi tạo giao diện quản lý bảng lương."""
+    def __init__(self, root, username, back_callback, screens):
+        """Khởi tạo giao diện quản lý bảng lương (dựng một lần, giữ lại trong screens)."""
         self.root = root
         self.username = username
         self.back_callback = back_callback
-        self.db = Database()
-        self.root.title("TutorPay - Quản lý bảng lương")
-        self.root.geometry("700x600")
-        self.root.configure(bg="#F5F7FA")
+        self.screens = screens
+        self.db = open_database()
+        self.executor = get_executor(self.root)
+        self.journal = get_journal(self.db, self.root, self.executor)
+        self.load_token = 0
         self.current_month = None
         self.current_year = None
         self.current_learner_id = None
-        self.checkbuttons = []
-        self.payrolls = []
-        self.create_form_visible = False
-        self.create_form_container = None
-        self.style = ttk.Style()
-        self.configure_styles()
-        self.set_window_icon(self.root)
-        self.center_window()
-        self.show_payroll_list()
-
-    def configure_styles(self):
-        """Cấu hình kiểu dáng cho các widget."""
-        self.style.configure("TEntry", padding=8, font=("Segoe UI", 11))
-        self.style.configure("TButton", padding=8, font=("Segoe UI", 11, "bold"))
-        self.style.configure("TLabel", background="#FFFFFF", font=("Segoe UI", 11))
-        self.style.configure("Header.TLabel", font=("Segoe UI", 20, "bold"), foreground="#1E88E5")
-        self.style.configure("SubHeader.TLabel", font=("Segoe UI", 11), foreground="#37474F")
-        self.style.configure("Treeview", font=("Segoe UI", 11), rowheight=30)
-        self.style.configure("Treeview.Heading", font=("Segoe UI", 11, "bold"))
-        self.style.configure("TCombobox", padding=8, font=("Segoe UI", 11))
-        self.style.configure("Hover.TButton", background="#1565C0", foreground="#1565C0")
-        self.style.configure("TCheckbutton", background="#FFFFFF", font=("Segoe UI", 11))
+        self.sheet = None
+        # Trạng thái danh sách bảng lương dạng cây (năm → tháng → người học), tải dần từ cơ sở dữ liệu
+        self.tree_nodes = {}
+        self.tree_token = 0
+        self.search_query = ""
+        self.time_desc = True
+        self.name_desc = False
+        # Các cửa sổ phụ được dựng ở lần mở đầu tiên rồi dùng lại
+        self.create_popup = None
+        self.open_month_popup = None
+        self.batch_popup = None
+        self.salary_popup = None
+        self.build_payroll_list()
 
     def set_window_icon(self, window):
         """Đặt biểu tượng cửa sổ thành annc19324.ico."""
@@ -55,24 +56,6 @@ class PayrollScreen:
         except tk.TclError as e:
             print(f"Error setting icon: {e}. Skipping icon setting.")
 
-    def center_window(self):
-        """Căn giữa cửa sổ trên màn hình."""
-        self.root.update_idletasks()
-        width = self.root.winfo_width()
-        height = self.root.winfo_height()
-        x = (self.root.winfo_screenwidth() // 2) - (width // 2)
-        y = (self.root.winfo_screenheight() // 2) - (height // 2)
-        self.root.geometry(f"{width}x{height}+{x}+{y}")
-
-    def clear_screen(self):
-        """Xóa tất cả widget trên màn hình và đặt lại cấu hình cửa sổ."""
-        for widget in self.root.winfo_children():
-            widget.destroy()
-        self.root.geometry("700x600")
-        self.root.grid_rowconfigure(0, weight=0)
-        self.root.grid_columnconfigure(0, weight=0)
-        self.root.update_idletasks()
-
     def create_button(self, frame, text, command, bg_color):
         """Tạo nút với hiệu ứng hover."""
         button = ttk.Button(frame, text=text, command=command, style="TButton")
@@ -82,12 +65,32 @@ class PayrollScreen:
         button.pack(side="left", padx=5, pady=5)
         return button
 
+    def go_back(self):
+        """Ghi các thay đổi điểm danh đang chờ rồi quay lại màn hình trước."""
+        self.journal.flush()
+        self.back_callback()
+
+    def show(self):
+        """Mở màn hình từ trang chính: hiện danh sách đã dựng và tải lại dữ liệu."""
+        self.show_payroll_list()
+        self.refresh_list()
+
     def show_payroll_list(self):
-        """Hiển thị danh sách bảng lương với khả năng tìm kiếm."""
-        self.clear_screen()
-        self.root.geometry("700x600")
+        """Quay lại danh sách bảng lương, giữ nguyên cây đã mở và từ khóa tìm kiếm."""
+        self.journal.flush()
+        self.screens.show("payrolls")
+
+    def refresh_list(self):
+        """Tải lại danh sách theo từ khóa hiện tại (cây năm → tháng nếu không tìm kiếm)."""
+        if self.search_query:
+            self.search_box.run(force=True)
+        else:
+            self.reload_tree()
+
+    def build_payroll_list(self):
+        """Dựng danh sách bảng lương với khả năng tìm kiếm."""
         main_frame = tk.Frame(self.root, bg="#F5F7FA")
-        main_frame.pack(expand=True, fill="both", padx=15, pady=15)
+        self.frame = main_frame
 
         header_frame = tk.Frame(main_frame, bg="#F5F7FA")
         header_frame.pack(fill="x")
@@ -99,16 +102,16 @@ class PayrollScreen:
         ttk.Label(search_frame, text="Tìm kiếm:").pack(side="left", padx=10, pady=5)
         search_entry = ttk.Entry(search_frame, style="TEntry")
         search_entry.pack(side="left", padx=5, pady=5, fill="x", expand=True)
-        search_entry.bind("<KeyRelease>", lambda e: self.filter_payrolls(search_entry.get()))
-        search_entry.focus_set()
 
         tree_frame = tk.Frame(main_frame, bg="#FFFFFF")
         tree_frame.pack(expand=True, fill="both", pady=10)
-        self.tree = ttk.Treeview(tree_frame, columns=("Learner", "Month", "Year"), show="headings", height=8)
-        self.tree.heading("Learner", text="Người học", anchor="center")
-        self.tree.heading("Month", text="Tháng", anchor="center")
-        self.tree.heading("Year", text="Năm", anchor="center")
-        self.tree.column("Learner", width=300, anchor="center")
+        self.tree = ttk.Treeview(tree_frame, columns=("Learner", "Month", "Year"), show="tree headings", height=8, selectmode="extended")
+        self.tree.heading("#0", text="Bảng lương", anchor="w")
+        self.tree.heading("Learner", text="Người học", anchor="center", command=self.toggle_name_order)
+        self.tree.heading("Month", text="Tháng", anchor="center", command=self.toggle_time_order)
+        self.tree.heading("Year", text="Năm", anchor="center", command=self.toggle_time_order)
+        self.tree.column("#0", width=140, anchor="w")
+        self.tree.column("Learner", width=220, anchor="center")
         self.tree.column("Month", width=100, anchor="center")
         self.tree.column("Year", width=100, anchor="center")
         self.tree.pack(side="left", fill="both", expand=True)
@@ -120,98 +123,224 @@ class PayrollScreen:
         hsb = ttk.Scrollbar(main_frame, orient="horizontal", command=self.tree.xview)
         hsb.pack(fill="x")
         self.tree.configure(xscrollcommand=hsb.set)
-
-        self.payrolls = self.db.get_payrolls(self.username)
-        if not self.payrolls:
-            logging.info(f"Không tìm thấy bảng lương cho người dùng {self.username}")
-        self.update_tree(self.payrolls)
-
-        self.create_form_container = tk.Frame(main_frame, bg="#F5F7FA")
-        self.create_form_container.pack(pady=5, fill="x")
+        self.tree.bind("<<TreeviewOpen>>", self.on_tree_open)
+        self.tree.bind("<<TreeviewSelect>>", self.on_tree_select)
+        self.search_box = SearchBox(search_entry, self.executor, self.search_payrolls, self.on_search_results)
 
         button_frame = tk.Frame(main_frame, bg="#F5F7FA")
         button_frame.pack(pady=10)
-        self.create_button(button_frame, "Thêm", self.toggle_create_form, "#43A047")
+        self.create_button(button_frame, "Thêm", self.show_create_popup, "#43A047")
+        self.create_button(button_frame, "Mở tháng", self.show_open_month_popup, "#43A047")
         self.create_button(button_frame, "Xem", self.view_payroll, "#1E88E5")
+        self.create_button(button_frame, "Xuất PDF", self.show_batch_export_popup, "#43A047")
+        self.create_button(button_frame, "Nhập CSV", self.import_attendance, "#1E88E5")
         self.create_button(button_frame, "Xóa", self.delete_payroll, "#EF5350")
-        self.create_button(button_frame, "Quay lại", self.back_callback, "#78909C")
-
-        self.center_window()
-
-    def update_tree(self, payrolls):
-        """Cập nhật danh sách bảng lương trong Treeview."""
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        for month, year, learner_name, learner_id in payrolls:
-            self.tree.insert("", "end", values=(learner_name, month, year), tags=(learner_id, month, year))
-
-    def filter_payrolls(self, query):
-        """Lọc danh sách bảng lương dựa trên từ khóa tìm kiếm."""
-        query = query.lower()
-        filtered = [(m, y, ln, lid) for m, y, ln, lid in self.payrolls if query in ln.lower() or query in f"{m}/{y}"]
-        self.update_tree(filtered)
-
-    def toggle_create_form(self):
-        """Hiển thị hoặc ẩn form tạo bảng lương mới."""
-        if self.create_form_visible:
-            self.create_form_container.pack_forget()
-            self.create_form_container = tk.Frame(self.root.winfo_children()[0], bg="#F5F7FA")
-            self.create_form_container.pack(pady=5, fill="x")
-            self.create_form_visible = False
+        self.create_button(button_frame, "Quay lại", self.go_back, "#78909C")
+
+        self.screens.add("payrolls", main_frame, "TutorPay - Quản lý bảng lương", "800x600")
+
+    def on_load_error(self, error):
+        """Báo lỗi khi tải dữ liệu trong nền thất bại."""
+        messagebox.showerror("Lỗi", f"Không thể tải dữ liệu: {error}. Vui lòng kiểm tra logs/app.log.")
+
+    def reload_tree(self):
+        """
+        Tải lại danh sách từ đầu: cây năm → tháng → người học (các nút con chỉ được tải khi mở),
+        hoặc danh sách phẳng theo trang khi đang tìm kiếm.
+        """
+        self.tree_token += 1
+        self.tree.delete(*self.tree.get_children())
+        self.tree_nodes = {}
+        self.update_headings()
+        if self.search_query:
+            self.load_page("", None, None, None)
         else:
-            self.create_form_container.pack_forget()
-            self.create_form_container = tk.Frame(self.root.winfo_children()[0], bg="#F5F7FA")
-            self.create_form_container.pack(pady=5, fill="x")
-            top = tk.Toplevel(self.root)
-            top.title("Thêm Bảng Lương Mới")
-            top.geometry("350x400")
-            top.configure(bg="#F5F7FA")
-            self.set_window_icon(top)
-
-            top.update_idletasks()
-            width = top.winfo_width()
-            height = top.winfo_height()
-            x = (self.root.winfo_width() - width) // 2 + self.root.winfo_x()
-            y = (self.root.winfo_height() - height) // 2 + self.root.winfo_y()
-            top.geometry(f"{width}x{height}+{x}+{y}")
-
-            frame = tk.Frame(top, bg="#FFFFFF", bd=0, relief="flat")
-            frame.pack(expand=True, fill="both", padx=15, pady=15)
-            frame.configure(highlightbackground="#E0E0E0", highlightthickness=1)
-
-            ttk.Label(frame, text="Thêm bảng lương mới", style="Header.TLabel").pack(pady=10)
+            token = self.tree_token
+            self.executor.submit_db(lambda db: db.get_payroll_years(self.username, self.time_desc),
+                                    on_done=lambda years: self.on_years_loaded(years, token),
+                                    on_error=self.on_load_error, busy=True)
+
+    def update_headings(self):
+        """Hiển thị chiều sắp xếp hiện tại trên tiêu đề cột."""
+        time_arrow = " ▼" if self.time_desc else " ▲"
+        self.tree.heading("Learner", text="Người học" + (" ▼" if self.name_desc else " ▲"))
+        self.tree.heading("Month", text="Tháng" + time_arrow)
+        self.tree.heading("Year", text="Năm" + time_arrow)
+
+    def toggle_time_order(self):
+        """Đảo chiều sắp xếp theo thời gian (năm, tháng); việc sắp xếp do truy vấn SQL đảm nhận."""
+        self.time_desc = not self.time_desc
+        self.reload_tree()
+
+    def toggle_name_order(self):
+        """Đảo chiều sắp xếp theo tên người học."""
+        self.name_desc = not self.name_desc
+        self.reload_tree()
+
+    def is_current_tree(self, token, parent=""):
+        """Kiểm tra kết quả tải nền còn dùng được (cây chưa bị tải lại hoặc đóng, nút cha còn tồn tại)."""
+        return (token == self.tree_token and self.tree.winfo_exists()
+                and (parent == "" or self.tree.exists(parent)))
+
+    def add_lazy_node(self, parent, iid, text, values, node):
+        """Thêm nút năm/tháng kèm một nút con tạm để hiện mũi tên mở rộng."""
+        self.tree.insert(parent, "end", iid=iid, text=text, values=values, open=False)
+        self.tree.insert(iid, "end", iid=f"{iid}:loading", text="Đang tải...")
+        self.tree_nodes[iid] = node
+
+    def on_years_loaded(self, years, token):
+        """Hiển thị các năm có bảng lương."""
+        if not self.is_current_tree(token):
+            return
+        if not years:
+            logging.info(f"Không tìm thấy bảng lương cho người dùng {self.username}")
+        for year, count in years:
+            self.add_lazy_node("", f"y{year}", f"{year} ({count})", ("", "", year), ("year", year))
+
+    def on_tree_open(self, event):
+        """Khi mở một nút năm/tháng lần đầu, tải các nút con từ cơ sở dữ liệu."""
+        item = self.tree.focus()
+        node = self.tree_nodes.get(item)
+        if not node or not self.tree.exists(f"{item}:loading"):
+            return
+        self.tree.delete(f"{item}:loading")
+        token = self.tree_token
+        if node[0] == "year":
+            year = node[1]
+            self.executor.submit_db(lambda db: db.get_payroll_months(self.username, year, self.time_desc),
+                                    on_done=lambda months: self.on_months_loaded(item, year, months, token),
+                                    on_error=self.on_load_error)
+        elif node[0] == "month":
+            self.load_page(item, node[1], node[2], None)
+
+    def on_months_loaded(self, parent, year, months, token):
+        """Hiển thị các tháng của một năm."""
+        if not self.is_current_tree(token, parent):
+            return
+        for month, count in months:
+            self.add_lazy_node(parent, f"m{year}-{month}", f"Tháng {month} ({count})", ("", month, year),
+                               ("month", year, month))
+
+    def load_page(self, parent, year, month, after):
+        """Tải một trang bảng lương (phân trang theo khóa) vào dưới nút cha."""
+        token = self.tree_token
+        query = self.search_query
+        self.executor.submit_db(lambda db: db.get_payroll_page(self.username, year, month, query, after,
+                                                               PAGE_SIZE, self.name_desc),
+                                on_done=lambda rows: self.on_page_loaded(parent, year, month, rows, token),
+                                on_error=self.on_load_error, busy=not parent)
+
+    def on_page_loaded(self, parent, year, month, rows, token):
+        """Thêm một trang bảng lương; nếu trang đầy thì thêm nút 'Tải thêm' cho trang sau."""
+        if not self.is_current_tree(token, parent):
+            return
+        for m, y, learner_name, learner_id in rows:
+            iid = f"s{learner_id}-{m}-{y}"
+            if self.tree.exists(iid):
+                continue
+            self.tree.insert(parent, "end", iid=iid, text="", values=(learner_name, m, y))
+            self.tree_nodes[iid] = ("sheet", learner_id, m, y)
+        if len(rows) == PAGE_SIZE:
+            m, y, learner_name, learner_id = rows[-1]
+            iid = f"more:{parent}:{learner_id}-{m}-{y}"
+            self.tree.insert(parent, "end", iid=iid, text="Tải thêm...")
+            self.tree_nodes[iid] = ("more", parent, year, month, (learner_name, learner_id, y, m))
+
+    def on_tree_select(self, event):
+        """Chọn nút 'Tải thêm' sẽ tải trang tiếp theo."""
+        for item in self.tree.selection():
+            node = self.tree_nodes.get(item)
+            if node and node[0] == "more":
+                _, parent, year, month, after = node
+                self.tree.delete(item)
+                del self.tree_nodes[item]
+                self.load_page(parent, year, month, after)
+
+    def search_payrolls(self, db, query):
+        """Trang kết quả tìm kiếm đầu tiên (chạy trên luồng cơ sở dữ liệu); từ khóa rỗng không cần truy vấn."""
+        if not query:
+            return []
+        return db.get_payroll_page(self.username, query=query, limit=PAGE_SIZE, descending=self.name_desc)
+
+    def on_search_results(self, query, rows):
+        """
+        Hiển thị kết quả tìm kiếm: chỉ thêm, xóa hoặc sắp lại các dòng thay đổi so với lần tìm trước.
+        Xóa từ khóa sẽ quay lại cây năm → tháng → người học.
+        """
+        was_searching = bool(self.search_query)
+        self.search_query = query
+        if not query:
+            if was_searching:
+                self.reload_tree()
+            return
+        self.tree_token += 1
+        if not was_searching:
+            # Chuyển từ cây sang danh sách phẳng
+            self.tree.delete(*self.tree.get_children())
+        self.tree_nodes = {}
+        items = []
+        for m, y, learner_name, learner_id in rows:
+            iid = f"s{learner_id}-{m}-{y}"
+            items.append((iid, (learner_name, m, y)))
+            self.tree_nodes[iid] = ("sheet", learner_id, m, y)
+        sync_tree(self.tree, "", items)
+        if len(rows) == PAGE_SIZE:
+            m, y, learner_name, learner_id = rows[-1]
+            iid = f"more::{learner_id}-{m}-{y}"
+            self.tree.insert("", "end", iid=iid, text="Tải thêm...")
+            self.tree_nodes[iid] = ("more", "", None, None, (learner_name, learner_id, y, m))
+
+    def show_create_popup(self):
+        """Hiển thị cửa sổ tạo bảng lương mới."""
+        if self.create_popup is None:
+            self.create_popup = Popup(self.frame, "Thêm Bảng Lương Mới", "350x400", self.build_create_popup,
+                                      self.fill_create_popup)
+        self.create_popup.open()
+
+    def build_create_popup(self, top):
+        """Dựng cửa sổ tạo bảng lương mới."""
+        self.set_window_icon(top)
 
-            learners = self.db.get_learners(self.username)
-            ttk.Label(frame, text="Người học:", background="#FFFFFF").pack(anchor="w", pady=5)
-            learner_combo = ttk.Combobox(frame, values=[name for _, name in learners], state="readonly", style="TCombobox")
-            learner_combo.pack(fill="x", pady=5)
-            learner_combo.focus_set()
-
-            ttk.Label(frame, text="Tháng:", background="#FFFFFF").pack(anchor="w", pady=5)
-            vn_time = datetime.now(pytz.timezone('Asia/Ho_Chi_Minh'))
-            current_month = vn_time.month
-            current_year = vn_time.year
-            month_combo = ttk.Combobox(frame, values=list(range(1, 13)), state="readonly", style="TCombobox")
-            month_combo.set(current_month)
-            month_combo.pack(fill="x", pady=5)
-
-            ttk.Label(frame, text="Năm:", background="#FFFFFF").pack(anchor="w", pady=5)
-            year_combo = ttk.Combobox(frame, values=list(range(2020, 2031)), state="readonly", style="TCombobox")
-            year_combo.set(current_year)
-            year_combo.pack(fill="x", pady=5)
-
-            button_frame = tk.Frame(frame, bg="#FFFFFF")
-            button_frame.pack(pady=10)
-            self.create_button(button_frame, "Thêm",
-                              lambda: self.create_payroll(learner_combo.get(), month_combo.get(), year_combo.get(), top),
-                              "#43A047")
-
-            learner_combo.bind("<Return>", lambda event: month_combo.focus_set())
-            month_combo.bind("<Return>", lambda event: year_combo.focus_set())
-            year_combo.bind("<Return>", lambda event: self.create_payroll(learner_combo.get(), month_combo.get(), year_combo.get(), top))
-            self.create_form_visible = True
-
-    def create_payroll(self, learner_name, month, year, top):
+        frame = tk.Frame(top, bg="#FFFFFF", bd=0, relief="flat")
+        frame.pack(expand=True, fill="both", padx=15, pady=15)
+        frame.configure(highlightbackground="#E0E0E0", highlightthickness=1)
+
+        ttk.Label(frame, text="Thêm bảng lương mới", style="Header.TLabel").pack(pady=10)
+
+        ttk.Label(frame, text="Người học:", background="#FFFFFF").pack(anchor="w", pady=5)
+        learner_combo = ttk.Combobox(frame, state="readonly", style="TCombobox")
+        learner_combo.pack(fill="x", pady=5)
+
+        ttk.Label(frame, text="Tháng:", background="#FFFFFF").pack(anchor="w", pady=5)
+        month_combo = ttk.Combobox(frame, values=list(range(1, 13)), state="readonly", style="TCombobox")
+        month_combo.pack(fill="x", pady=5)
+
+        ttk.Label(frame, text="Năm:", background="#FFFFFF").pack(anchor="w", pady=5)
+        year_combo = ttk.Combobox(frame, values=list(range(2020, 2031)), state="readonly", style="TCombobox")
+        year_combo.pack(fill="x", pady=5)
+
+        self.create_combos = (learner_combo, month_combo, year_combo)
+        create = lambda: self.create_payroll(learner_combo.get(), month_combo.get(), year_combo.get())
+
+        button_frame = tk.Frame(frame, bg="#FFFFFF")
+        button_frame.pack(pady=10)
+        self.create_button(button_frame, "Thêm", create, "#43A047")
+
+        learner_combo.bind("<Return>", lambda event: month_combo.focus_set())
+        month_combo.bind("<Return>", lambda event: year_combo.focus_set())
+        year_combo.bind("<Return>", lambda event: create())
+
+    def fill_create_popup(self):
+        """Nạp lại danh sách người học và đặt tháng/năm hiện tại mỗi lần mở cửa sổ."""
+        learner_combo, month_combo, year_combo = self.create_combos
+        learner_combo.configure(values=[name for _, name in self.db.get_learners(self.username)])
+        learner_combo.set("")
+        vn_time = vn_now()
+        month_combo.set(vn_time.month)
+        year_combo.set(vn_time.year)
+        learner_combo.focus_set()
+
+    def create_payroll(self, learner_name, month, year):
         """Tạo bảng lương mới."""
         try:
             month, year = int(month), int(year)
@@ -222,73 +351,285 @@ class PayrollScreen:
                 return
             if self.db.create_payroll(self.username, month, year, learner_id):
                 messagebox.showinfo("Thành công", f"Đã thêm bảng lương {month}/{year}!")
-                top.destroy()
+                self.create_popup.close()
+                # Danh sách đang ẩn sau màn hình chi tiết được tải lại để có bảng lương mới khi quay lại
+                self.refresh_list()
                 self.show_payroll(month, year, learner_id)
             else:
                 messagebox.showerror("Lỗi", f"Bảng lương {month}/{year} đã tồn tại.")
         except ValueError:
             messagebox.showerror("Lỗi", "Tháng hoặc năm không hợp lệ.")
 
+    def show_open_month_popup(self):
+        """Hiển thị popup mở tháng: tạo bảng lương cho nhiều người học cùng lúc."""
+        if self.open_month_popup is None:
+            self.open_month_popup = Popup(self.frame, "Mở Tháng", "350x460", self.build_open_month_popup,
+                                          self.fill_open_month_popup)
+        self.open_month_popup.open()
+
+    def build_open_month_popup(self, top):
+        """Dựng popup mở tháng."""
+        self.set_window_icon(top)
+
+        frame = tk.Frame(top, bg="#FFFFFF", bd=0, relief="flat")
+        frame.pack(expand=True, fill="both", padx=15, pady=15)
+        frame.configure(highlightbackground="#E0E0E0", highlightthickness=1)
+
+        ttk.Label(frame, text="Mở tháng mới", style="Header.TLabel").pack(pady=10)
+
+        date_frame = tk.Frame(frame, bg="#FFFFFF")
+        date_frame.pack(fill="x", pady=5)
+        ttk.Label(date_frame, text="Tháng:", background="#FFFFFF").pack(side="left")
+        month_combo = ttk.Combobox(date_frame, values=list(range(1, 13)), state="readonly", width=5, style="TCombobox")
+        month_combo.pack(side="left", padx=5)
+        ttk.Label(date_frame, text="Năm:", background="#FFFFFF").pack(side="left")
+        year_combo = ttk.Combobox(date_frame, values=list(range(2020, 2031)), state="readonly", width=7, style="TCombobox")
+        year_combo.pack(side="left", padx=5)
+
+        # Không chọn ai nghĩa là mở tháng cho tất cả người học
+        ttk.Label(frame, text="Người học (bỏ trống để chọn tất cả):", background="#FFFFFF").pack(anchor="w", pady=5)
+        list_frame = tk.Frame(frame, bg="#FFFFFF")
+        list_frame.pack(expand=True, fill="both", pady=5)
+        learner_list = tk.Listbox(list_frame, selectmode="extended", font=("Segoe UI", 11), height=8,
+                                  activestyle="none", relief="flat", highlightthickness=1, highlightbackground="#E0E0E0")
+        learner_list.pack(side="left", expand=True, fill="both")
+        list_vsb = ttk.Scrollbar(list_frame, orient="vertical", command=learner_list.yview)
+        list_vsb.pack(side="right", fill="y")
+        learner_list.configure(yscrollcommand=list_vsb.set)
+        self.open_month_widgets = (month_combo, year_combo, learner_list)
+
+        def selected_ids():
+            selection = learner_list.curselection()
+            return [self.open_month_learners[i][0] for i in selection] if selection else None
+
+        button_frame = tk.Frame(frame, bg="#FFFFFF")
+        button_frame.pack(pady=10)
+        self.create_button(button_frame, "Mở tháng",
+                          lambda: self.open_month(month_combo.get(), year_combo.get(), selected_ids()),
+                          "#43A047")
+
+    def fill_open_month_popup(self):
+        """Nạp lại danh sách người học và đặt tháng/năm hiện tại mỗi lần mở popup."""
+        month_combo, year_combo, learner_list = self.open_month_widgets
+        vn_time = vn_now()
+        month_combo.set(vn_time.month)
+        year_combo.set(vn_time.year)
+        self.open_month_learners = self.db.get_learners(self.username)
+        learner_list.delete(0, "end")
+        for _, name in self.open_month_learners:
+            learner_list.insert("end", name)
+
+    def open_month(self, month, year, learner_ids):
+        """Tạo bảng lương của tháng cho các người học đã chọn (hoặc tất cả) trong một giao dịch."""
+        try:
+            month, year = int(month), int(year)
+        except ValueError:
+            messagebox.showerror("Lỗi", "Tháng hoặc năm không hợp lệ.")
+            return
+        result = self.db.open_month(self.username, month, year, learner_ids)
+        if result is None:
+            messagebox.showerror("Lỗi", f"Không thể mở tháng {month}/{year}.")
+            return
+        created, skipped = result
+        messagebox.showinfo("Thành công", f"Tháng {month}/{year}: đã tạo {created} bảng lương, "
+                                          f"bỏ qua {skipped} bảng lương đã tồn tại.")
+        self.open_month_popup.close()
+        self.refresh_list()
+
+    def import_attendance(self):
+        """Nhập điểm danh từ file CSV: chạy thử trong nền, hiện báo cáo thay đổi rồi mới ghi khi người dùng đồng ý."""
+        filename = filedialog.askopenfilename(parent=self.root, title="Chọn file điểm danh (CSV)",
+                                              filetypes=[("CSV files", "*.csv"), ("All files", "*.*")],
+                                              initialdir=os.path.expanduser("~/Desktop"))
+        if not filename:
+            return
+        self.journal.flush()
+
+        def on_checked(report):
+            text = "\n".join(report.lines())
+            if not report.rows:
+                messagebox.showinfo("Nhập điểm danh", text)
+            elif messagebox.askyesno("Xác nhận", f"{text}\n\nGhi các thay đổi này?"):
+                self.executor.submit_db(import_attendance_file, self.username, filename,
+                                        on_done=on_imported, on_error=self.on_import_error, busy=True)
+
+        def on_imported(report):
+            text = "\n".join(report.lines())
+            if report.failed:
+                messagebox.showerror("Lỗi", text)
+            else:
+                messagebox.showinfo("Thành công", text)
+            self.refresh_list()
+
+        self.executor.submit_db(import_attendance_file, self.username, filename, True,
+                                on_done=on_checked, on_error=self.on_import_error, busy=True)
+
+    def on_import_error(self, error):
+        """Báo lỗi khi không đọc được file điểm danh."""
+        messagebox.showerror("Lỗi", f"Không thể nhập file điểm danh: {error}")
+
+    def selected_payroll_keys(self):
+        """Danh sách (learner_id, tháng, năm) của các bảng lương đang được chọn trong Treeview."""
+        keys = []
+        for item in self.tree.selection():
+            node = self.tree_nodes.get(item)
+            if node and node[0] == "sheet":
+                keys.append(node[1:])
+        return keys
+
+    def show_batch_export_popup(self):
+        """Hiển thị popup xuất PDF hàng loạt: các bảng lương đã chọn, cả tháng hoặc cả năm của người học."""
+        keys = self.selected_payroll_keys()
+        if not keys:
+            messagebox.showerror("Lỗi", "Chọn ít nhất một bảng lương để xuất.")
+            return
+        self.batch_keys = keys
+        if self.batch_popup is None:
+            self.batch_popup = Popup(self.frame, "Xuất PDF hàng loạt", "380x330", self.build_batch_export_popup,
+                                     self.fill_batch_export_popup)
+        self.batch_popup.open()
+
+    def build_batch_export_popup(self, top):
+        """Dựng popup xuất PDF hàng loạt."""
+        self.set_window_icon(top)
+
+        frame = tk.Frame(top, bg="#FFFFFF", bd=0, relief="flat")
+        frame.pack(expand=True, fill="both", padx=15, pady=15)
+        frame.configure(highlightbackground="#E0E0E0", highlightthickness=1)
+
+        ttk.Label(frame, text="Xuất PDF hàng loạt", style="Header.TLabel").pack(pady=10)
+
+        scope_var = tk.StringVar(value="selected")
+        self.batch_scope_buttons = {}
+        for value in ("selected", "month", "learner_year"):
+            button = tk.Radiobutton(frame, variable=scope_var, value=value, bg="#FFFFFF",
+                                    font=("Segoe UI", 11), anchor="w")
+            button.pack(fill="x")
+            self.batch_scope_buttons[value] = button
+        merged_var = tk.BooleanVar()
+        ttk.Checkbutton(frame, text="Gộp thành một file PDF", variable=merged_var,
+                        style="TCheckbutton").pack(anchor="w", pady=5)
+
+        self.batch_progress = ttk.Progressbar(frame, mode="determinate")
+        self.batch_progress.pack(fill="x", pady=5)
+        self.batch_scope_var = scope_var
+
+        button_frame = tk.Frame(frame, bg="#FFFFFF")
+        button_frame.pack(pady=10)
+        self.create_button(button_frame, "Xuất",
+                          lambda: self.batch_export_pdf(self.batch_keys, scope_var.get(), merged_var.get(),
+                                                        self.batch_progress, top),
+                          "#43A047")
+
+    def fill_batch_export_popup(self):
+        """Cập nhật các lựa chọn phạm vi theo bảng lương đang chọn và đặt lại tiến độ."""
+        learner_id, month, year = self.batch_keys[0]
+        for value, text in (("selected", f"Các bảng lương đã chọn ({len(self.batch_keys)})"),
+                            ("month", f"Tất cả bảng lương tháng {month}/{year}"),
+                            ("learner_year", f"Cả năm {year} của người học đã chọn")):
+            self.batch_scope_buttons[value].configure(text=text)
+        self.batch_scope_var.set("selected")
+        self.batch_progress.configure(value=0)
+
+    def batch_export_pdf(self, keys, scope, merged, progress, top):
+        """Tải các bảng lương theo phạm vi đã chọn và xuất PDF song song vào một thư mục."""
+        learner_id, month, year = keys[0]
+        directory = filedialog.askdirectory(parent=top, title="Chọn thư mục lưu file PDF",
+                                            initialdir=os.path.expanduser("~/Desktop"))
+        if not directory:
+            logging.info("Xuất PDF hàng loạt bị hủy bởi người dùng.")
+            return
+        self.journal.flush()
+
+        def load_sheets(db):
+            # Phạm vi tháng hoặc cả năm được lấy từ cơ sở dữ liệu, không phụ thuộc các nút đã mở trên cây
+            scope_keys = keys
+            if scope == "month":
+                scope_keys = db.get_payroll_keys(self.username, year, month=month)
+            elif scope == "learner_year":
+                scope_keys = db.get_payroll_keys(self.username, year, learner_id=learner_id)
+            sheets = []
+            for lid, m, y in scope_keys:
+                sheet = PayrollSheet.load(db, self.username, m, y, lid)
+                sheets.append((m, y, sheet.data(), sheet.learner_name, sheet.sessions, sheet.fee))
+            return sheets
+
+        def on_progress(done, total):
+            if progress.winfo_exists():
+                progress.configure(maximum=total, value=done)
+
+        def export(sheets):
+            # Báo tiến độ về luồng Tk qua hàng đợi của bộ thực thi nền
+            progress_callback = lambda done, total: self.executor.post(on_progress, done, total)
+            self.executor.submit(export_batch_pdf, self.username, sheets, directory, merged, progress_callback,
+                                 on_done=lambda result: on_exported(sheets, result),
+                                 on_error=self.on_pdf_error, busy=True)
+
+        def on_exported(sheets, result):
+            success, files = result
+            if success:
+                messagebox.showinfo("Thành công", f"Đã xuất {len(sheets)} bảng lương ra {len(files)} file PDF tại: {directory}")
+                self.batch_popup.close()
+            else:
+                messagebox.showerror("Lỗi", "Không thể xuất PDF. Vui lòng kiểm tra logs/app.log hoặc thử chọn thư mục khác.")
+
+        self.executor.submit_db(load_sheets, on_done=export, on_error=self.on_load_error, busy=True)
+
     def view_payroll(self):
         """Xem chi tiết bảng lương được chọn."""
         selected = self.tree.selection()
         if not selected:
             messagebox.showerror("Lỗi", "Chọn một bảng lương để xem.")
             return
-        item = self.tree.selection()[0]
-        learner_id, month, year = self.tree.item(item, "tags")
-        learner_id, month, year = int(learner_id), int(month), int(year)
+        keys = self.selected_payroll_keys()
+        if not keys:
+            messagebox.showerror("Lỗi", "Chọn một bảng lương (dòng người học) để xem.")
+            return
+        learner_id, month, year = keys[0]
         logging.info(f"Đang xem bảng lương: learner_id={learner_id}, month={month}, year={year}")
         self.show_payroll(month, year, learner_id)
 
     def show_payroll(self, month, year, learner_id):
-        """Hiển thị chi tiết bảng lương với lưới tuần."""
-        self.current_month, self.current_year, self.current_learner_id = month, year, learner_id
-        self.clear_screen()
-        self.root.geometry("700x600")
+        """Tải bảng lương trên luồng cơ sở dữ liệu rồi hiển thị chi tiết với lưới tuần."""
+        self.journal.flush()
+        # Chỉ hiển thị kết quả của lần mở gần nhất nếu người dùng bấm liên tiếp
+        self.load_token += 1
+        token = self.load_token
+        self.executor.submit_db(PayrollSheet.load, self.username, month, year, learner_id,
+                                on_done=lambda sheet: self.build_payroll(sheet, token),
+                                on_error=self.on_load_error, busy=True)
+
+    def build_payroll(self, sheet, token):
+        """Hiển thị bảng lương đã tải trên màn hình chi tiết (dựng lần đầu, các lần sau chỉ gán lại dữ liệu)."""
+        if token != self.load_token:
+            return
+        month, year = sheet.month, sheet.year
+        self.current_month, self.current_year, self.current_learner_id = month, year, sheet.learner_id
+        self.sheet = sheet
+        if not self.screens.has("payroll_detail"):
+            self.create_detail_view()
+        self.screens.show("payroll_detail")
+        self.detail_title.config(text=f"Bảng Lương {month}/{year} - {self.sheet.learner_name}")
+        self.calendar.show(year, month, self.sheet.is_checked, self.sheet.enabled)
+        self.refresh_summary()
+
+    def create_detail_view(self):
+        """Dựng màn hình chi tiết bảng lương: tiêu đề, lưới điểm danh, tóm tắt và các nút."""
         main_frame = tk.Frame(self.root, bg="#F5F7FA")
-        main_frame.pack(expand=True, fill="both", padx=15, pady=15)
-
-        learner_name = next((name for lid, name in self.db.get_learners(self.username) if lid == learner_id), "Không xác định")
-        ttk.Label(main_frame, text=f"Bảng Lương {month}/{year} - {learner_name}", style="Header.TLabel").pack(pady=10)
-
-        grid_frame = tk.Frame(main_frame, bg="#FFFFFF", bd=0, relief="flat")
-        grid_frame.pack(pady=10, fill="both", expand=True)
-        grid_frame.configure(highlightbackground="#E0E0E0", highlightthickness=1)
-
-        days_of_week = ["T2", "T3", "T4", "T5", "T6", "T7", "CN"]
-        for col, day in enumerate(days_of_week, 1):
-            tk.Label(grid_frame, text=day, font=("Segoe UI", 11, "bold"), bg="#FFFFFF", width=8, borderwidth=1, relief="solid").grid(row=0, column=col, padx=1, pady=1, sticky="nsew")
-
-        weeks = get_weeks_in_month(year, month)
-        self.checkbuttons = []
-        row = 1
-        for week in weeks:
-            tk.Label(grid_frame, text=f"Tuần {row}", font=("Segoe UI", 11), bg="#FFFFFF", width=8, borderwidth=1, relief="solid").grid(row=row, column=0, padx=1, pady=1, sticky="nsew")
-            for col, day in enumerate(week, 1):
-                if day:
-                    checked = next((d[1] for d in self.db.get_payroll_data(self.username, month, year, learner_id) if d[0] == day), 0)
-                    var = tk.BooleanVar(value=bool(checked))
-                    cb = tk.Checkbutton(grid_frame, text=day, font=("Segoe UI", 11), variable=var,
-                                        command=lambda d=day, v=var: self.update_day(d, v.get()),
-                                        state="normal" if max(d[2] for d in self.db.get_payroll_data(self.username, month, year, learner_id)) > 0 else "disabled", bg="#FFFFFF")
-                    cb.grid(row=row, column=col, padx=1, pady=1, sticky="nsew")
-                    self.checkbuttons.append((day, var, cb))
-                else:
-                    tk.Label(grid_frame, text="", font=("Segoe UI", 11), bg="#FFFFFF", width=8, borderwidth=0, relief="flat").grid(row=row, column=col, padx=1, pady=1, sticky="nsew")
-            row += 1
-
-        for i in range(len(days_of_week) + 1):
-            grid_frame.grid_columnconfigure(i, weight=1, uniform="column")
-        for i in range(len(weeks) + 1):
-            grid_frame.grid_rowconfigure(i, weight=1)
+        self.detail_frame = main_frame
+
+        self.detail_title = ttk.Label(main_frame, text="", style="Header.TLabel")
+        self.detail_title.pack(pady=10)
+
+        self.calendar = CalendarGrid(main_frame, self.update_day, bd=0, relief="flat")
+        self.calendar.pack(pady=10, fill="both", expand=True)
+        self.calendar.configure(highlightbackground="#E0E0E0", highlightthickness=1)
 
         summary_frame = tk.Frame(main_frame, bg="#FFFFFF")
         summary_frame.pack(pady=10, fill="x")
-        sessions, fee = self.db.get_payroll_summary(self.username, month, year, learner_id)
-        self.sessions_label = ttk.Label(summary_frame, text=f"Tổng buổi: {sessions}", font=("Segoe UI", 11))
+        self.sessions_label = ttk.Label(summary_frame, text="", font=("Segoe UI", 11))
         self.sessions_label.pack(pady=5)
-        self.fee_label = ttk.Label(summary_frame, text=f"Phí: {format_currency(fee)}", font=("Segoe UI", 11))
+        self.fee_label = ttk.Label(summary_frame, text="", font=("Segoe UI", 11))
         self.fee_label.pack(pady=5)
 
         button_frame = tk.Frame(main_frame, bg="#F5F7FA")
@@ -297,95 +638,119 @@ class PayrollScreen:
         self.create_button(button_frame, "Xuất PDF", self.export_pdf, "#43A047")
         self.create_button(button_frame, "Quay lại", self.show_payroll_list, "#78909C")
 
-        self.center_window()
+        self.screens.add("payroll_detail", main_frame, "TutorPay - Quản lý bảng lương", "700x600")
 
     def update_day(self, day, checked):
-        """Cập nhật trạng thái điểm danh và tính lại tóm tắt."""
-        default_salary = max(d[2] for d in self.db.get_payroll_data(self.username, self.current_month, self.current_year, self.current_learner_id))
-        salary = default_salary if checked else 0
-        if self.db.update_day(self.username, self.current_month, self.current_year, self.current_learner_id, day, checked, salary):
-            data = self.db.get_payroll_data(self.username, self.current_month, self.current_year, self.current_learner_id)
-            sessions = sum(1 for d in data if d[1])
-            fee = sessions * default_salary
-            self.db.update_payroll_summary(self.username, self.current_month, self.current_year, self.current_learner_id, sessions, fee)
-            self.sessions_label.config(text=f"Tổng buổi: {sessions}")
-            self.fee_label.config(text=f"Phí: {format_currency(fee)}")
+        """Cập nhật trạng thái điểm danh, tính lại tóm tắt ngay trên giao diện và ghi sau vào cơ sở dữ liệu."""
+        salary = self.sheet.default_salary if checked else 0
+        self.sheet.set_day(day, checked, salary)
+        self.journal.record(self.username, self.current_month, self.current_year, self.current_learner_id, day, checked, salary)
+        self.refresh_summary()
+
+    def refresh_summary(self):
+        """Cập nhật nhãn tổng buổi, tổng phí và trạng thái các ô điểm danh theo mô hình bảng lương."""
+        self.sessions_label.config(text=f"Tổng buổi: {self.sheet.sessions}")
+        self.fee_label.config(text=f"Phí: {format_currency(self.sheet.fee)}")
+        self.calendar.set_enabled(self.sheet.enabled)
 
     def show_update_salary_popup(self):
         """Hiển thị cửa sổ cập nhật lương mặc định."""
-        top = tk.Toplevel(self.root)
-        top.title("Cập nhật lương")
-        top.geometry("350x200")
-        top.configure(bg="#F5F7FA")
-        self.set_window_icon(top)
+        if self.salary_popup is None:
+            self.salary_popup = Popup(self.detail_frame, "Cập nhật lương", "350x240", self.build_salary_popup,
+                                      self.fill_salary_popup)
+        self.salary_popup.open()
 
-        top.update_idletasks()
-        width = top.winfo_width()
-        height = top.winfo_height()
-        x = (self.root.winfo_width() - width) // 2 + self.root.winfo_x()
-        y = (self.root.winfo_height() - height) // 2 + self.root.winfo_y()
-        top.geometry(f"{width}x{height}+{x}+{y}")
+    def build_salary_popup(self, top):
+        """Dựng cửa sổ cập nhật lương mặc định."""
+        self.set_window_icon(top)
 
         frame = tk.Frame(top, bg="#FFFFFF", bd=0, relief="flat")
         frame.pack(expand=True, fill="both", padx=15, pady=15)
         frame.configure(highlightbackground="#E0E0E0", highlightthickness=1)
 
         ttk.Label(frame, text="Lương mặc định (VNĐ):", background="#FFFFFF").pack(anchor="w", pady=5)
-        salary_entry = ttk.Entry(frame, style="TEntry")
-        salary_entry.pack(fill="x", pady=5)
-        salary_entry.focus_set()
+        self.salary_entry = ttk.Entry(frame, style="TEntry")
+        self.salary_entry.pack(fill="x", pady=5)
+
+        self.only_checked_var = tk.BooleanVar()
+        ttk.Checkbutton(frame, text="Chỉ áp dụng cho các ngày đã điểm danh", variable=self.only_checked_var,
+                        style="TCheckbutton").pack(anchor="w", pady=5)
 
         button_frame = tk.Frame(frame, bg="#FFFFFF")
         button_frame.pack(pady=10)
         self.create_button(button_frame, "Lưu",
-                          lambda: self.save_salary(salary_entry.get(), top),
+                          lambda: self.save_salary(self.salary_entry.get(), self.only_checked_var.get()),
                           "#1E88E5")
 
-        salary_entry.bind("<Return>", lambda event: self.save_salary(salary_entry.get(), top))
+        self.salary_entry.bind("<Return>", lambda event: self.save_salary(self.salary_entry.get(), self.only_checked_var.get()))
+
+    def fill_salary_popup(self):
+        """Xóa mức lương đã nhập lần trước mỗi lần mở cửa sổ."""
+        self.salary_entry.delete(0, tk.END)
+        self.only_checked_var.set(False)
+        self.salary_entry.focus_set()
 
-    def save_salary(self, salary, top):
-        """Lưu lương mặc định và cập nhật dữ liệu."""
+    def save_salary(self, salary, only_checked=False):
+        """Lưu mức lương mới trong một giao dịch và cập nhật tóm tắt, trạng thái ô điểm danh tại chỗ."""
         try:
             salary = int(salary.replace(".", "").replace(",", ""))
             if salary < 0:
                 messagebox.showerror("Lỗi", "Lương phải không âm.")
                 return
-            if self.db.update_default_salary(self.username, self.current_month, self.current_year, self.current_learner_id, salary):
-                messagebox.showinfo("Thành công", "Lương đã được cập nhật!")
-                top.destroy()
-                for _, var, cb in self.checkbuttons:
-                    cb.config(state="normal" if salary > 0 else "disabled")
-                data = self.db.get_payroll_data(self.username, self.current_month, self.current_year, self.current_learner_id)
-                for day, checked, _ in data:
-                    if checked:
-                        self.db.update_day(self.username, self.current_month, self.current_year, self.current_learner_id, day, checked, salary)
-                sessions = sum(1 for d in data if d[1])
-                fee = sessions * salary
-                self.db.update_payroll_summary(self.username, self.current_month, self.current_year, self.current_learner_id, sessions, fee)
-                self.show_payroll(self.current_month, self.current_year, self.current_learner_id)
+            self.journal.flush()
+            sheet = self.sheet
+            self.executor.submit_db(lambda db: db.apply_salary(*sheet.key, salary, only_checked=only_checked),
+                                    on_done=lambda summary: self.on_salary_saved(sheet, salary, only_checked, summary),
+                                    busy=True)
         except ValueError:
             messagebox.showerror("Lỗi", "Lương phải là số.")
 
+    def on_salary_saved(self, sheet, salary, only_checked, summary):
+        """Cập nhật mô hình và giao diện sau khi lưu lương trên luồng cơ sở dữ liệu."""
+        if summary is None:
+            messagebox.showerror("Lỗi", "Không thể cập nhật lương. Vui lòng kiểm tra logs/app.log.")
+            return
+        messagebox.showinfo("Thành công", "Lương đã được cập nhật!")
+        self.salary_popup.close()
+        sheet.apply_salary(salary, only_checked)
+        sheet.sessions, sheet.fee = summary
+        # Người dùng có thể đã rời màn hình chi tiết trong lúc chờ
+        if sheet is self.sheet and self.fee_label.winfo_exists():
+            self.refresh_summary()
+
     def export_pdf(self):
-        """Xuất bảng lương ra file PDF."""
+        """Xuất bảng lương ra file PDF: chọn nơi lưu trên luồng Tk, tạo PDF trên luồng nền."""
         try:
-            # Làm mới dữ liệu trước khi xuất
-            data = self.db.get_payroll_data(self.username, self.current_month, self.current_year, self.current_learner_id)
-            sessions, fee = self.db.get_payroll_summary(self.username, self.current_month, self.current_year, self.current_learner_id)
+            # Dữ liệu lấy từ mô hình bảng lương đang hiển thị, luôn đồng bộ với cơ sở dữ liệu
+            data = self.sheet.data()
+            sessions, fee = self.sheet.sessions, self.sheet.fee
             logging.info(f"Dữ liệu bảng lương: {data}, Tổng buổi: {sessions}, Tổng phí: {fee}")
             if not data:
                 messagebox.showerror("Lỗi", "Không có dữ liệu bảng lương để xuất. Vui lòng kiểm tra bảng lương.")
                 return
-            learner_name = next((name for lid, name in self.db.get_learners(self.username) if lid == self.current_learner_id), "Không xác định")
+            filename = ask_pdf_filename(self.username, self.current_month, self.current_year, parent=self.root)
+            if not filename:
+                logging.info("Xuất PDF bị hủy bởi người dùng.")
+                return
             # Truyền thêm sessions và fee để đảm bảo đồng bộ
-            success, filename = export_to_pdf(self.username, self.current_month, self.current_year, data, learner_name, self.current_learner_id, sessions, fee)
-            if success:
-                messagebox.showinfo("Thành công", f"Đã xuất PDF tại: {filename}")
-            else:
-                messagebox.showerror("Lỗi", "Không thể xuất PDF. Vui lòng kiểm tra logs/app.log hoặc thử chọn thư mục khác.")
+            self.executor.submit(export_to_pdf, self.username, self.current_month, self.current_year, data,
+                                 self.sheet.learner_name, self.current_learner_id, sessions, fee, filename,
+                                 on_done=self.on_pdf_exported, on_error=self.on_pdf_error, busy=True)
         except Exception as e:
-            logging.error(f"Lỗi khi xuất PDF: {str(e)}")
-            messagebox.showerror("Lỗi", f"Đã xảy ra lỗi khi xuất PDF: {str(e)}. Vui lòng kiểm tra logs/app.log.")
+            self.on_pdf_error(e)
+
+    def on_pdf_exported(self, result):
+        """Thông báo kết quả xuất PDF từ luồng nền."""
+        success, filename = result
+        if success:
+            messagebox.showinfo("Thành công", f"Đã xuất PDF tại: {filename}")
+        else:
+            messagebox.showerror("Lỗi", "Không thể xuất PDF. Vui lòng kiểm tra logs/app.log hoặc thử chọn thư mục khác.")
+
+    def on_pdf_error(self, error):
+        """Báo lỗi khi xuất PDF."""
+        logging.error(f"Lỗi khi xuất PDF: {str(error)}")
+        messagebox.showerror("Lỗi", f"Đã xảy ra lỗi khi xuất PDF: {str(error)}. Vui lòng kiểm tra logs/app.log.")
 
     def delete_payroll(self):
         """Xóa bảng lương được chọn."""
@@ -393,15 +758,17 @@ class PayrollScreen:
         if not selected:
             messagebox.showerror("Lỗi", "Chọn một bảng lương để xóa.")
             return
-        item = self.tree.selection()[0]
-        learner_id, month, year = self.tree.item(item, "tags")
-        learner_id, month, year = int(learner_id), int(month), int(year)
+        keys = self.selected_payroll_keys()
+        if not keys:
+            messagebox.showerror("Lỗi", "Chọn một bảng lương (dòng người học) để xóa.")
+            return
+        learner_id, month, year = keys[0]
         logging.info(f"Đang xóa bảng lương: learner_id={learner_id}, month={month}, year={year}")
 
         if messagebox.askyesno("Xác nhận", f"Xóa bảng lương {month}/{year}?"):
             if self.db.delete_payroll(self.username, month, year, learner_id):
                 messagebox.showinfo("Thành công", f"Bảng lương {month}/{year} đã được xóa!")
-                self.show_payroll_list()
+                self.refresh_list()
             else:
                 logging.error(f"Không thể xóa bảng lương: learner_id={learner_id}, month={month}, year={year}")
                 messagebox.showerror("Lỗi", "Không thể xóa bảng lương. Vui lòng kiểm tra logs/app.log.")
\ No newline at end of file
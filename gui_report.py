@@ -0,0 +1,188 @@
+import tkinter as tk
+from tkinter import messagebox, ttk
+import logging
+from background import get_executor
+from pdf_utils import ask_pdf_filename, export_report_pdf, report_filename
+from reports import EarningsReport
+from search import sync_tree
+from utils import format_change, format_currency, format_percent, vn_now
+
+class ReportScreen:
+    def __init__(self, root, username, callback, screens):
+        """Khởi tạo màn hình báo cáo thu nhập (dựng một lần, giữ lại trong screens)."""
+        self.root = root
+        self.username = username
+        self.callback = callback
+        self.screens = screens
+        self.executor = get_executor(self.root)
+        self.report = None
+        self.load_token = 0
+        self.build_report_screen()
+
+    def create_button(self, frame, text, command, bg_color):
+        """Tạo nút với hiệu ứng hover."""
+        button = ttk.Button(frame, text=text, command=command, style="TButton")
+        button.configure(cursor="hand2")
+        button.bind("<Enter>", lambda e: button.configure(style="Hover.TButton"))
+        button.bind("<Leave>", lambda e: button.configure(style="TButton"))
+        button.pack(side="left", padx=5, pady=5)
+        return button
+
+    def create_tree(self, parent, columns, widths):
+        """Tạo Treeview có thanh cuộn dọc với các cột cho trước."""
+        tree_frame = tk.Frame(parent, bg="#FFFFFF")
+        tree_frame.pack(expand=True, fill="both", pady=5)
+        tree = ttk.Treeview(tree_frame, columns=columns, show="headings", height=10)
+        for column, width in zip(columns, widths):
+            tree.heading(column, text=column, anchor="center")
+            tree.column(column, width=width, anchor="w" if column == "Người học" else "e")
+        tree.pack(side="left", fill="both", expand=True)
+        vsb = ttk.Scrollbar(tree_frame, orient="vertical", command=tree.yview)
+        vsb.pack(side="right", fill="y")
+        tree.configure(yscrollcommand=vsb.set)
+        return tree
+
+    def show(self):
+        """Hiển thị màn hình và tải lại báo cáo."""
+        self.screens.show("report")
+
+    def build_report_screen(self):
+        """Dựng màn hình báo cáo: chọn khoảng năm, tóm tắt và các bảng theo năm, quý, tháng, người học."""
+        main_frame = tk.Frame(self.root, bg="#F5F7FA")
+
+        header_frame = tk.Frame(main_frame, bg="#F5F7FA")
+        header_frame.pack(fill="x")
+        ttk.Label(header_frame, text="Báo cáo thu nhập", style="Header.TLabel").pack(pady=10)
+
+        range_frame = tk.Frame(header_frame, bg="#F5F7FA")
+        range_frame.pack()
+        ttk.Label(range_frame, text="Từ năm:", style="SubHeader.TLabel").pack(side="left")
+        self.first_combo = ttk.Combobox(range_frame, state="readonly", width=7, style="TCombobox")
+        self.first_combo.pack(side="left", padx=5)
+        ttk.Label(range_frame, text="Đến năm:", style="SubHeader.TLabel").pack(side="left")
+        self.last_combo = ttk.Combobox(range_frame, state="readonly", width=7, style="TCombobox")
+        self.last_combo.pack(side="left", padx=5)
+        self.create_button(range_frame, "Xem", self.load_report, "#1E88E5")
+
+        self.summary_label = ttk.Label(header_frame, text="", style="SubHeader.TLabel")
+        self.summary_label.pack()
+        self.to_date_label = ttk.Label(header_frame, text="", style="SubHeader.TLabel")
+        self.to_date_label.pack()
+
+        notebook = ttk.Notebook(main_frame)
+        notebook.pack(expand=True, fill="both", pady=10)
+
+        years_tab = tk.Frame(notebook, bg="#FFFFFF")
+        notebook.add(years_tab, text="Theo năm")
+        self.years_tree = self.create_tree(years_tab, ("Năm", "Người học có buổi", "Buổi", "Thu nhập", "So với năm trước"),
+                                           (80, 130, 90, 180, 140))
+
+        quarters_tab = tk.Frame(notebook, bg="#FFFFFF")
+        notebook.add(quarters_tab, text="Theo quý")
+        self.quarters_tree = self.create_tree(quarters_tab, ("Quý", "Buổi", "Thu nhập", "So với quý trước", "So với cùng kỳ"),
+                                              (90, 90, 180, 140, 140))
+
+        months_tab = tk.Frame(notebook, bg="#FFFFFF")
+        notebook.add(months_tab, text="Theo tháng")
+        self.months_tree = self.create_tree(months_tab, ("Tháng", "Người học có buổi", "Buổi", "Thu nhập", "Lũy kế năm", "Cùng kỳ"),
+                                            (80, 120, 70, 160, 170, 90))
+
+        learners_tab = tk.Frame(notebook, bg="#FFFFFF")
+        notebook.add(learners_tab, text="Theo người học")
+        self.learners_tree = self.create_tree(learners_tab, ("Hạng", "Người học", "Tháng", "Buổi", "Thu nhập", "Tỷ lệ"),
+                                              (50, 220, 70, 80, 170, 70))
+
+        button_frame = tk.Frame(main_frame, bg="#F5F7FA")
+        button_frame.pack(pady=10)
+        self.create_button(button_frame, "Xuất PDF", self.export_pdf, "#43A047")
+        self.create_button(button_frame, "Quay lại", self.callback, "#78909C")
+
+        self.screens.add("report", main_frame, "TutorPay - Báo cáo thu nhập", "800x600", self.refresh)
+
+    def on_load_error(self, error):
+        """Báo lỗi khi tải dữ liệu trong nền thất bại."""
+        messagebox.showerror("Lỗi", f"Không thể tải báo cáo: {error}. Vui lòng kiểm tra logs/app.log.")
+
+    def refresh(self):
+        """Đọc lại các năm có bảng lương (mặc định cả khoảng năm) rồi tải báo cáo."""
+        self.load_token += 1
+        token = self.load_token
+        self.executor.submit_db(lambda db: db.get_payroll_years(self.username, descending=False),
+                                on_done=lambda years: self.on_years_loaded(years, token),
+                                on_error=self.on_load_error, busy=True)
+
+    def on_years_loaded(self, years, token):
+        """Cập nhật danh sách năm; giữ khoảng năm đang chọn nếu vẫn hợp lệ."""
+        if token != self.load_token or not self.first_combo.winfo_exists():
+            return
+        values = [year for year, _ in years] or [vn_now().year]
+        first, last = self.first_combo.get(), self.last_combo.get()
+        self.first_combo.configure(values=values)
+        self.last_combo.configure(values=values)
+        if not first or int(first) not in values:
+            self.first_combo.set(values[0])
+        if not last or int(last) not in values:
+            self.last_combo.set(values[-1])
+        self.load_report()
+
+    def load_report(self):
+        """Tải báo cáo của khoảng năm đang chọn trong nền."""
+        if not self.first_combo.get() or not self.last_combo.get():
+            return
+        first, last = int(self.first_combo.get()), int(self.last_combo.get())
+        if first > last:
+            first, last = last, first
+            self.first_combo.set(first)
+            self.last_combo.set(last)
+        self.load_token += 1
+        token = self.load_token
+        self.executor.submit_db(EarningsReport.load, self.username, first, last,
+                                on_done=lambda report: self.show_report(report, token),
+                                on_error=self.on_load_error, busy=True)
+
+    def show_report(self, report, token):
+        """Hiển thị báo cáo vừa tải (bỏ qua nếu đã có lần tải mới hơn)."""
+        if token != self.load_token or not self.years_tree.winfo_exists():
+            return
+        self.report = report
+        self.summary_label.config(text=f"{report.period}: {report.sessions} buổi, {format_currency(report.fee)}")
+        self.to_date_label.config(text=report.to_date_text())
+        sync_tree(self.years_tree, "", [
+            (f"y{year}", (year, learners, sessions, format_currency(fee), format_change(fee, previous)))
+            for year, learners, sessions, fee, previous in report.years])
+        sync_tree(self.quarters_tree, "", [
+            (f"q{year}-{quarter}", (f"Q{quarter}/{year}", sessions, format_currency(fee), format_change(fee, previous),
+                                    format_change(fee, last_year)))
+            for year, quarter, sessions, fee, previous, last_year in report.quarters])
+        sync_tree(self.months_tree, "", [
+            (f"m{year}-{month}", (f"{month}/{year}", learners, sessions, format_currency(fee), format_currency(ytd_fee),
+                                  format_change(fee, last_year)))
+            for year, month, learners, sessions, fee, _, ytd_fee, last_year in report.months])
+        sync_tree(self.learners_tree, "", [
+            (f"l{learner_id}", (rank, name, months, sessions, format_currency(fee), format_percent(share)))
+            for rank, learner_id, name, months, sessions, fee, share in report.learners])
+
+    def export_pdf(self):
+        """Xuất báo cáo đang hiển thị ra PDF nhiều trang: chọn nơi lưu trên luồng Tk, tạo PDF trên luồng nền."""
+        if self.report is None or not self.report.years:
+            messagebox.showerror("Lỗi", "Không có dữ liệu báo cáo để xuất.")
+            return
+        filename = ask_pdf_filename(self.username, None, None, parent=self.root,
+                                    initial_file=report_filename(self.report))
+        if not filename:
+            logging.info("Xuất báo cáo PDF bị hủy bởi người dùng.")
+            return
+        self.executor.submit(export_report_pdf, self.report, filename,
+                             on_done=self.on_pdf_exported, on_error=self.on_pdf_error, busy=True)
+
+    def on_pdf_exported(self, result):
+        """Thông báo kết quả xuất PDF từ luồng nền."""
+        success, filename = result
+        if success:
+            messagebox.showinfo("Thành công", f"Đã xuất báo cáo tại: {filename}")
+        else:
+            messagebox.showerror("Lỗi", "Không thể xuất PDF. Vui lòng kiểm tra logs/app.log hoặc thử chọn thư mục khác.")
+
+    def on_pdf_error(self, error):
+        """Báo lỗi khi xuất PDF."""
+        messagebox.showerror("Lỗi", f"Đã xảy ra lỗi khi xuất PDF: {error}. Vui lòng kiểm tra logs/app.log.")
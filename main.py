@@ -1,8 +1,28 @@
-import tkinter as tk
-from gui_login import LoginScreen
+import multiprocessing
+import sys
 
 if __name__ == "__main__":
     """Khởi động ứng dụng TutorPay."""
+    # Cần cho tiến trình con của xuất PDF hàng loạt khi chạy từ file EXE (PyInstaller)
+    multiprocessing.freeze_support()
+    if "--cli" in sys.argv:
+        # Chế độ dòng lệnh: không nạp tkinter (xem cli.py)
+        from cli import main as cli_main
+        sys.exit(cli_main([arg for arg in sys.argv[1:] if arg != "--cli"]))
+    profiler = None
+    if "--profile-startup" in sys.argv:
+        # Bắt đầu đo trước khi nạp giao diện để thấy toàn bộ thời gian import
+        from startup_profile import StartupProfiler
+        profiler = StartupProfiler()
+        profiler.start()
+    import tkinter as tk
+    from gui_login import LoginScreen
     root = tk.Tk()
     app = LoginScreen(root)
-    root.mainloop()
\ No newline at end of file
+    if profiler:
+        root.after(0, profiler.first_frame, root)
+    root.mainloop()
+    # Cửa sổ đã đóng: chờ các công việc nền (ghi điểm danh, truy vấn) xong trước khi thoát;
+    # thay đổi điểm danh còn lại được ghi bởi AttendanceJournal.flush_now (atexit)
+    from background import shutdown_executor
+    shutdown_executor()
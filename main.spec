@@ -16,19 +16,19 @@ a = Analysis(
 )
 pyz = PYZ(a.pure)
 
+# Bản onedir: không phải giải nén toàn bộ thư viện vào thư mục tạm mỗi lần mở như bản onefile,
+# nên cửa sổ đăng nhập hiện nhanh hơn. Đo bằng: dist\main\main.exe --profile-startup
 exe = EXE(
     pyz,
     a.scripts,
-    a.binaries,
-    a.datas,
     [],
+    exclude_binaries=True,
     name='main',
     debug=False,
     bootloader_ignore_signals=False,
     strip=False,
     upx=True,
     upx_exclude=[],
-    runtime_tmpdir=None,
     console=False,
     disable_windowed_traceback=False,
     argv_emulation=False,
@@ -37,3 +37,12 @@ exe = EXE(
     entitlements_file=None,
     icon=['annc19324.ico'],
 )
+coll = COLLECT(
+    exe,
+    a.binaries,
+    a.datas,
+    strip=False,
+    upx=True,
+    upx_exclude=[],
+    name='main',
+)
@@ -0,0 +1,409 @@
+import logging
+import sqlite3
+from search import fold_map, fold_sql
+
+# Các bước cập nhật lược đồ cơ sở dữ liệu, đánh số theo PRAGMA user_version.
+# Mỗi bước chạy trong một giao dịch riêng; chỉ thêm bước mới vào cuối danh sách,
+# không sửa các bước đã phát hành.
+
+def _create_base_tables(cursor):
+    """Bảng users, learners, payroll, payroll_sum và tài khoản admin mặc định."""
+    # Bảng users: lưu thông tin người dùng
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT NOT NULL UNIQUE,
+            fullname TEXT NOT NULL,
+            password TEXT NOT NULL
+        )
+    ''')
+
+    # Tạo tài khoản admin mặc định
+    cursor.execute('''
+        INSERT OR IGNORE INTO users (username, fullname, password)
+        VALUES (?, ?, ?)
+    ''', ('admin', 'Administrator', '123'))
+
+    # Bảng learners: lưu thông tin người học
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS learners (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            username TEXT,
+            FOREIGN KEY (username) REFERENCES users(username) ON DELETE CASCADE
+        )
+    ''')
+
+    # Bảng payroll: lưu chi tiết bảng lương (ngày, trạng thái điểm danh, lương mỗi ngày)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS payroll (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT,
+            month INTEGER,
+            year INTEGER,
+            learner_id INTEGER,
+            day TEXT,
+            checked INTEGER,
+            salary INTEGER DEFAULT 0,
+            UNIQUE(username, month, year, learner_id, day),
+            FOREIGN KEY (username) REFERENCES users(username) ON DELETE CASCADE,
+            FOREIGN KEY (learner_id) REFERENCES learners(id) ON DELETE CASCADE
+        )
+    ''')
+
+    # Bảng payroll_sum: lưu tóm tắt bảng lương (tổng buổi, tổng phí)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS payroll_sum (
+            username TEXT,
+            month INTEGER,
+            year INTEGER,
+            learner_id INTEGER,
+            sessions INTEGER,
+            fee INTEGER DEFAULT 0,
+            UNIQUE(username, month, year, learner_id),
+            FOREIGN KEY (username) REFERENCES users(username) ON DELETE CASCADE,
+            FOREIGN KEY (learner_id) REFERENCES learners(id) ON DELETE CASCADE
+        )
+    ''')
+
+def _create_payroll_compact(cursor):
+    """Bảng lương dạng nén cho kiểu lưu trữ 'compact' (xem payroll_compact.py)."""
+    # Mỗi bảng lương (người dùng, người học, tháng, năm) chỉ một dòng.
+    # - mask: bit (ngày - 1) bằng 1 khi ngày đó được điểm danh
+    # - salary: lương mặc định áp dụng cho mọi ngày
+    # - salaries: chỉ lưu khi có ngày có lương khác lương mặc định: 4 byte đánh dấu các ngày lương 0,
+    #   hoặc mảng lương theo ngày nếu có mức lương khác (payroll_compact.encode_sheet)
+    # - sessions, fee: tổng buổi (popcount của mask) và tổng phí, được tính lại mỗi lần ghi
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS payroll_compact (
+            username TEXT NOT NULL,
+            month INTEGER NOT NULL,
+            year INTEGER NOT NULL,
+            learner_id INTEGER NOT NULL,
+            mask INTEGER NOT NULL DEFAULT 0,
+            salary INTEGER NOT NULL DEFAULT 0,
+            salaries BLOB,
+            sessions INTEGER NOT NULL DEFAULT 0,
+            fee INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (username, learner_id, year, month),
+            FOREIGN KEY (username) REFERENCES users(username) ON DELETE CASCADE,
+            FOREIGN KEY (learner_id) REFERENCES learners(id) ON DELETE CASCADE
+        ) WITHOUT ROWID
+    ''')
+
+def _create_payroll_sheets(cursor):
+    """Bảng tiêu đề payroll_sheets, chỉ mục bao phủ và dữ liệu từ các bảng lương có sẵn."""
+    # Bảng payroll_sheets: mỗi bảng lương (người dùng, người học, tháng, năm) một dòng, dùng cho danh sách
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS payroll_sheets (
+            username TEXT NOT NULL,
+            learner_id INTEGER NOT NULL,
+            month INTEGER NOT NULL,
+            year INTEGER NOT NULL,
+            PRIMARY KEY (username, learner_id, year, month),
+            FOREIGN KEY (username) REFERENCES users(username) ON DELETE CASCADE,
+            FOREIGN KEY (learner_id) REFERENCES learners(id) ON DELETE CASCADE
+        ) WITHOUT ROWID
+    ''')
+    # Chỉ mục bao phủ cho danh sách bảng lương (năm, tháng giảm dần) và tra cứu theo người học
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_payroll_sheets_list
+        ON payroll_sheets (username, year DESC, month DESC, learner_id)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_payroll_sheets_learner
+        ON payroll_sheets (learner_id, year DESC, month DESC)
+    ''')
+    cursor.execute('''
+        INSERT OR IGNORE INTO payroll_sheets (username, learner_id, month, year)
+        SELECT DISTINCT username, learner_id, month, year FROM payroll
+        UNION
+        SELECT username, learner_id, month, year FROM payroll_compact
+    ''')
+
+def _create_payroll_sum_triggers(cursor):
+    """Trigger cập nhật payroll_sum (tổng buổi, tổng phí) theo từng thay đổi của bảng payroll."""
+    # Tổng phí là tổng lương thực tế của các ngày đã điểm danh
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_payroll_sum_insert AFTER INSERT ON payroll
+        BEGIN
+            INSERT INTO payroll_sum (username, month, year, learner_id, sessions, fee)
+            VALUES (NEW.username, NEW.month, NEW.year, NEW.learner_id,
+                    COALESCE(NEW.checked, 0) <> 0,
+                    CASE WHEN COALESCE(NEW.checked, 0) <> 0 THEN COALESCE(NEW.salary, 0) ELSE 0 END)
+            ON CONFLICT (username, month, year, learner_id) DO UPDATE SET
+                sessions = COALESCE(sessions, 0) + excluded.sessions,
+                fee = COALESCE(fee, 0) + excluded.fee;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_payroll_sum_update AFTER UPDATE OF checked, salary ON payroll
+        BEGIN
+            UPDATE payroll_sum SET
+                sessions = COALESCE(sessions, 0)
+                    + (COALESCE(NEW.checked, 0) <> 0) - (COALESCE(OLD.checked, 0) <> 0),
+                fee = COALESCE(fee, 0)
+                    + CASE WHEN COALESCE(NEW.checked, 0) <> 0 THEN COALESCE(NEW.salary, 0) ELSE 0 END
+                    - CASE WHEN COALESCE(OLD.checked, 0) <> 0 THEN COALESCE(OLD.salary, 0) ELSE 0 END
+            WHERE username = NEW.username AND month = NEW.month AND year = NEW.year AND learner_id = NEW.learner_id;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_payroll_sum_delete AFTER DELETE ON payroll
+        BEGIN
+            UPDATE payroll_sum SET
+                sessions = COALESCE(sessions, 0) - (COALESCE(OLD.checked, 0) <> 0),
+                fee = COALESCE(fee, 0)
+                    - CASE WHEN COALESCE(OLD.checked, 0) <> 0 THEN COALESCE(OLD.salary, 0) ELSE 0 END
+            WHERE username = OLD.username AND month = OLD.month AND year = OLD.year AND learner_id = OLD.learner_id;
+        END
+    ''')
+    # Tính lại toàn bộ tóm tắt từ dữ liệu chi tiết để trigger bắt đầu từ trạng thái đúng
+    cursor.execute("DELETE FROM payroll_sum")
+    cursor.execute('''
+        INSERT INTO payroll_sum (username, month, year, learner_id, sessions, fee)
+        SELECT username, month, year, learner_id,
+               SUM(COALESCE(checked, 0) <> 0),
+               SUM(CASE WHEN COALESCE(checked, 0) <> 0 THEN COALESCE(salary, 0) ELSE 0 END)
+        FROM payroll
+        GROUP BY username, month, year, learner_id
+    ''')
+
+def _create_search_index(cursor):
+    """Bảng tìm kiếm không dấu learner_search, user_search (FTS5 trigram) và trigger đồng bộ."""
+    # Cần hàm vn_fold đã được đăng ký trên kết nối (search.register_functions).
+    # SQLite không có FTS5 thì dùng bảng thường cùng cột: truy vấn LIKE vẫn đúng, chỉ chậm hơn.
+    try:
+        cursor.execute("CREATE VIRTUAL TABLE IF NOT EXISTS learner_search USING fts5(name, tokenize='trigram')")
+        cursor.execute("CREATE VIRTUAL TABLE IF NOT EXISTS user_search USING fts5(username, fullname, tokenize='trigram')")
+    except sqlite3.OperationalError as e:
+        logging.warning(f"SQLite không hỗ trợ FTS5 trigram ({e}), dùng bảng tìm kiếm thường.")
+        cursor.execute("CREATE TABLE IF NOT EXISTS learner_search (name TEXT)")
+        cursor.execute("CREATE TABLE IF NOT EXISTS user_search (username TEXT, fullname TEXT)")
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_learner_search_insert AFTER INSERT ON learners
+        BEGIN
+            INSERT INTO learner_search (rowid, name) VALUES (NEW.id, vn_fold(NEW.name));
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_learner_search_update AFTER UPDATE OF name ON learners
+        BEGIN
+            UPDATE learner_search SET name = vn_fold(NEW.name) WHERE rowid = NEW.id;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_learner_search_delete AFTER DELETE ON learners
+        BEGIN
+            DELETE FROM learner_search WHERE rowid = OLD.id;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_user_search_insert AFTER INSERT ON users
+        BEGIN
+            INSERT INTO user_search (rowid, username, fullname) VALUES (NEW.id, vn_fold(NEW.username), vn_fold(NEW.fullname));
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_user_search_update AFTER UPDATE OF username, fullname ON users
+        BEGIN
+            UPDATE user_search SET username = vn_fold(NEW.username), fullname = vn_fold(NEW.fullname)
+            WHERE rowid = NEW.id;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_user_search_delete AFTER DELETE ON users
+        BEGIN
+            DELETE FROM user_search WHERE rowid = OLD.id;
+        END
+    ''')
+    cursor.execute("DELETE FROM learner_search")
+    cursor.execute("INSERT INTO learner_search (rowid, name) SELECT id, vn_fold(name) FROM learners")
+    cursor.execute("DELETE FROM user_search")
+    cursor.execute("INSERT INTO user_search (rowid, username, fullname) SELECT id, vn_fold(username), vn_fold(fullname) FROM users")
+
+def _pausable_payroll_sum_triggers(cursor):
+    """Cho phép tạm dừng trigger của payroll_sum khi nhập điểm danh hàng loạt (tóm tắt được tính lại sau)."""
+    # Cần hàm payroll_sum_paused đã được đăng ký trên kết nối (database.ConnectionManager.get).
+    # Thân trigger giữ nguyên bước 4, chỉ thêm điều kiện WHEN.
+    cursor.execute("DROP TRIGGER IF EXISTS trg_payroll_sum_insert")
+    cursor.execute("DROP TRIGGER IF EXISTS trg_payroll_sum_update")
+    cursor.execute("DROP TRIGGER IF EXISTS trg_payroll_sum_delete")
+    cursor.execute('''
+        CREATE TRIGGER trg_payroll_sum_insert AFTER INSERT ON payroll
+        WHEN NOT payroll_sum_paused()
+        BEGIN
+            INSERT INTO payroll_sum (username, month, year, learner_id, sessions, fee)
+            VALUES (NEW.username, NEW.month, NEW.year, NEW.learner_id,
+                    COALESCE(NEW.checked, 0) <> 0,
+                    CASE WHEN COALESCE(NEW.checked, 0) <> 0 THEN COALESCE(NEW.salary, 0) ELSE 0 END)
+            ON CONFLICT (username, month, year, learner_id) DO UPDATE SET
+                sessions = COALESCE(sessions, 0) + excluded.sessions,
+                fee = COALESCE(fee, 0) + excluded.fee;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER trg_payroll_sum_update AFTER UPDATE OF checked, salary ON payroll
+        WHEN NOT payroll_sum_paused()
+        BEGIN
+            UPDATE payroll_sum SET
+                sessions = COALESCE(sessions, 0)
+                    + (COALESCE(NEW.checked, 0) <> 0) - (COALESCE(OLD.checked, 0) <> 0),
+                fee = COALESCE(fee, 0)
+                    + CASE WHEN COALESCE(NEW.checked, 0) <> 0 THEN COALESCE(NEW.salary, 0) ELSE 0 END
+                    - CASE WHEN COALESCE(OLD.checked, 0) <> 0 THEN COALESCE(OLD.salary, 0) ELSE 0 END
+            WHERE username = NEW.username AND month = NEW.month AND year = NEW.year AND learner_id = NEW.learner_id;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER trg_payroll_sum_delete AFTER DELETE ON payroll
+        WHEN NOT payroll_sum_paused()
+        BEGIN
+            UPDATE payroll_sum SET
+                sessions = COALESCE(sessions, 0) - (COALESCE(OLD.checked, 0) <> 0),
+                fee = COALESCE(fee, 0)
+                    - CASE WHEN COALESCE(OLD.checked, 0) <> 0 THEN COALESCE(OLD.salary, 0) ELSE 0 END
+            WHERE username = OLD.username AND month = OLD.month AND year = OLD.year AND learner_id = OLD.learner_id;
+        END
+    ''')
+
+def _portable_triggers(cursor):
+    """
+    Viết lại trigger của bước 5 và 6 không dùng hàm Python (vn_fold, payroll_sum_paused) để kết nối bất kỳ
+    (sqlite3, DB Browser, script) vẫn ghi được: bỏ dấu qua bảng vn_fold_map, tạm dừng tóm tắt qua bảng payroll_sum_pause.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS vn_fold_map (
+            ch TEXT PRIMARY KEY,
+            base TEXT NOT NULL
+        ) WITHOUT ROWID
+    ''')
+    cursor.executemany("INSERT OR REPLACE INTO vn_fold_map (ch, base) VALUES (?, ?)", fold_map())
+    # Có dòng khi đang nhập hàng loạt: dòng được thêm và xóa trong cùng một giao dịch
+    # (database.pause_summary_triggers) nên kết nối khác không bao giờ thấy
+    cursor.execute("CREATE TABLE IF NOT EXISTS payroll_sum_pause (paused INTEGER)")
+    for name in ("learner_search_insert", "learner_search_update", "user_search_insert", "user_search_update",
+                 "payroll_sum_insert", "payroll_sum_update", "payroll_sum_delete"):
+        cursor.execute(f"DROP TRIGGER IF EXISTS trg_{name}")
+    cursor.execute(f'''
+        CREATE TRIGGER trg_learner_search_insert AFTER INSERT ON learners
+        BEGIN
+            INSERT INTO learner_search (rowid, name) VALUES (NEW.id, {fold_sql("NEW.name")});
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER trg_learner_search_update AFTER UPDATE OF name ON learners
+        BEGIN
+            UPDATE learner_search SET name = {fold_sql("NEW.name")} WHERE rowid = NEW.id;
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER trg_user_search_insert AFTER INSERT ON users
+        BEGIN
+            INSERT INTO user_search (rowid, username, fullname)
+            VALUES (NEW.id, {fold_sql("NEW.username")}, {fold_sql("NEW.fullname")});
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER trg_user_search_update AFTER UPDATE OF username, fullname ON users
+        BEGIN
+            UPDATE user_search SET username = {fold_sql("NEW.username")}, fullname = {fold_sql("NEW.fullname")}
+            WHERE rowid = NEW.id;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER trg_payroll_sum_insert AFTER INSERT ON payroll
+        WHEN NOT EXISTS (SELECT 1 FROM payroll_sum_pause)
+        BEGIN
+            INSERT INTO payroll_sum (username, month, year, learner_id, sessions, fee)
+            VALUES (NEW.username, NEW.month, NEW.year, NEW.learner_id,
+                    COALESCE(NEW.checked, 0) <> 0,
+                    CASE WHEN COALESCE(NEW.checked, 0) <> 0 THEN COALESCE(NEW.salary, 0) ELSE 0 END)
+            ON CONFLICT (username, month, year, learner_id) DO UPDATE SET
+                sessions = COALESCE(sessions, 0) + excluded.sessions,
+                fee = COALESCE(fee, 0) + excluded.fee;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER trg_payroll_sum_update AFTER UPDATE OF checked, salary ON payroll
+        WHEN NOT EXISTS (SELECT 1 FROM payroll_sum_pause)
+        BEGIN
+            UPDATE payroll_sum SET
+                sessions = COALESCE(sessions, 0)
+                    + (COALESCE(NEW.checked, 0) <> 0) - (COALESCE(OLD.checked, 0) <> 0),
+                fee = COALESCE(fee, 0)
+                    + CASE WHEN COALESCE(NEW.checked, 0) <> 0 THEN COALESCE(NEW.salary, 0) ELSE 0 END
+                    - CASE WHEN COALESCE(OLD.checked, 0) <> 0 THEN COALESCE(OLD.salary, 0) ELSE 0 END
+            WHERE username = NEW.username AND month = NEW.month AND year = NEW.year AND learner_id = NEW.learner_id;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER trg_payroll_sum_delete AFTER DELETE ON payroll
+        WHEN NOT EXISTS (SELECT 1 FROM payroll_sum_pause)
+        BEGIN
+            UPDATE payroll_sum SET
+                sessions = COALESCE(sessions, 0) - (COALESCE(OLD.checked, 0) <> 0),
+                fee = COALESCE(fee, 0)
+                    - CASE WHEN COALESCE(OLD.checked, 0) <> 0 THEN COALESCE(OLD.salary, 0) ELSE 0 END
+            WHERE username = OLD.username AND month = OLD.month AND year = OLD.year AND learner_id = OLD.learner_id;
+        END
+    ''')
+
+def _create_payroll_sum_dirty(cursor):
+    """Bảng đánh dấu các bảng lương có payroll_sum chưa được tính lại sau khi nhập điểm danh hàng loạt."""
+    # Được ghi cùng giao dịch với từng lô nhập (Database.import_days) và xóa khi tính lại tóm tắt
+    # (Database.refresh_summaries); còn dòng khi khởi động nghĩa là lần nhập trước bị ngắt giữa chừng.
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS payroll_sum_dirty (
+            username TEXT NOT NULL,
+            month INTEGER NOT NULL,
+            year INTEGER NOT NULL,
+            learner_id INTEGER NOT NULL,
+            PRIMARY KEY (username, month, year, learner_id)
+        ) WITHOUT ROWID
+    ''')
+
+MIGRATIONS = [
+    (1, _create_base_tables),
+    (2, _create_payroll_compact),
+    (3, _create_payroll_sheets),
+    (4, _create_payroll_sum_triggers),
+    (5, _create_search_index),
+    (6, _pausable_payroll_sum_triggers),
+    (7, _portable_triggers),
+    (8, _create_payroll_sum_dirty),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+def migrate(conn):
+    """
+    Đưa lược đồ cơ sở dữ liệu lên phiên bản mới nhất. Khi lược đồ đã mới nhất,
+    chỉ đọc PRAGMA user_version một lần. Trả về phiên bản lược đồ.
+    """
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version >= SCHEMA_VERSION:
+        return version
+    if conn.in_transaction:
+        conn.commit()
+    for number, step in MIGRATIONS:
+        if number <= version:
+            continue
+        cursor = conn.cursor()
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            # Đọc lại phiên bản trong giao dịch phòng khi tiến trình khác vừa cập nhật
+            version = cursor.execute("PRAGMA user_version").fetchone()[0]
+            if number <= version:
+                conn.commit()
+                continue
+            step(cursor)
+            cursor.execute(f"PRAGMA user_version = {number}")
+            conn.commit()
+            version = number
+            logging.info(f"Đã cập nhật lược đồ cơ sở dữ liệu lên phiên bản {number}: {step.__doc__}")
+        except Exception:
+            conn.rollback()
+            logging.exception(f"Lỗi khi cập nhật lược đồ cơ sở dữ liệu lên phiên bản {number}.")
+            raise
+    return version
@@ -0,0 +1,337 @@
+import sqlite3
+import logging
+import struct
+from calendar import monthrange
+from database import Database
+
+# Kiểu lưu trữ nén: mỗi bảng lương một dòng trong payroll_compact (lược đồ: migrations._create_payroll_compact)
+
+# Dạng ngắn của cột salaries: bit (ngày - 1) bằng 1 khi ngày đó có lương 0, các ngày khác có lương mặc định.
+# Mảng lương theo ngày dài ít nhất 28 * 4 byte nên không trùng độ dài với dạng này.
+ZERO_DAYS = struct.Struct("<I")
+
+def day_number(day):
+    """Chuyển khóa ngày 'ngày/tháng' thành số ngày."""
+    return int(str(day).split("/")[0])
+
+def pack_salaries(salaries):
+    """Đóng gói mảng lương theo ngày (4 byte mỗi ngày, 8 byte nếu có giá trị lớn)."""
+    fmt = "I" if all(0 <= s < 2 ** 32 for s in salaries) else "q"
+    return struct.pack(f"<{len(salaries)}{fmt}", *salaries)
+
+def unpack_salaries(blob, days):
+    """Giải nén mảng lương theo ngày."""
+    fmt = "I" if len(blob) == days * 4 else "q"
+    return list(struct.unpack(f"<{days}{fmt}", blob))
+
+def encode_sheet(month, year, checked_days, day_salaries):
+    """
+    Mã hóa bảng lương thành (mask, salary, salaries, sessions, fee).
+    checked_days: tập số ngày được điểm danh; day_salaries: danh sách lương của từng ngày.
+    Lương của mọi ngày (kể cả ngày chưa điểm danh) được giữ nguyên để đọc lại giống hệt kiểu lưu trữ 'rows'.
+    Khi mọi ngày có lương bằng lương mặc định hoặc 0 (giao diện ghi lương 0 khi bỏ điểm danh), salaries chỉ là
+    4 byte đánh dấu các ngày lương 0 (ZERO_DAYS); mảng lương theo ngày chỉ dùng khi có mức lương khác.
+    """
+    _, days = monthrange(year, month)
+    mask = 0
+    for day in checked_days:
+        mask |= 1 << (day - 1)
+    salary = max(day_salaries, default=0)
+    salaries = [day_salaries[d - 1] if d <= len(day_salaries) else salary for d in range(1, days + 1)]
+    if all(s in (salary, 0) for s in salaries):
+        zeros = sum(1 << (d - 1) for d in range(1, days + 1) if salaries[d - 1] != salary)
+        blob = ZERO_DAYS.pack(zeros) if zeros else None
+    else:
+        blob = pack_salaries(salaries)
+    sessions = mask.bit_count()
+    fee = sum(salaries[d - 1] for d in range(1, days + 1) if mask >> (d - 1) & 1)
+    return mask, salary, blob, sessions, fee
+
+def decode_sheet(month, year, mask, salary, blob):
+    """Giải mã một dòng nén thành danh sách (ngày, điểm danh, lương) như bảng payroll."""
+    _, days = monthrange(year, month)
+    if not blob:
+        salaries = [salary] * days
+    elif len(blob) == ZERO_DAYS.size:
+        zeros = ZERO_DAYS.unpack(blob)[0]
+        salaries = [0 if zeros >> (d - 1) & 1 else salary for d in range(1, days + 1)]
+    else:
+        salaries = unpack_salaries(blob, days)
+    return [(f"{d}/{month}", mask >> (d - 1) & 1, salaries[d - 1]) for d in range(1, days + 1)]
+
+def migrate_to_compact(conn):
+    """Chuyển toàn bộ dữ liệu từ bảng payroll (mỗi ngày một dòng) sang payroll_compact trong một giao dịch."""
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT username, month, year, learner_id, day, checked, salary
+        FROM payroll
+        ORDER BY username, learner_id, year, month, id
+    ''')
+    sheets = {}
+    for username, month, year, learner_id, day, checked, salary in cursor.fetchall():
+        checked_days, day_salaries = sheets.setdefault((username, month, year, learner_id), (set(), {}))
+        number = day_number(day)
+        if checked:
+            checked_days.add(number)
+        day_salaries[number] = salary or 0
+    rows = []
+    for (username, month, year, learner_id), (checked_days, day_salaries) in sheets.items():
+        _, days = monthrange(year, month)
+        salaries = [day_salaries.get(d, 0) for d in range(1, days + 1)]
+        rows.append((username, month, year, learner_id) + encode_sheet(month, year, checked_days, salaries))
+    try:
+        cursor.executemany('''
+            INSERT OR REPLACE INTO payroll_compact (username, month, year, learner_id, mask, salary, salaries, sessions, fee)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', rows)
+        cursor.execute("DELETE FROM payroll_sum")
+        cursor.execute("DELETE FROM payroll")
+        conn.commit()
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+    logging.info(f"Đã chuyển {len(rows)} bảng lương sang kiểu lưu trữ nén.")
+    return len(rows)
+
+def migrate_to_rows(conn):
+    """Chuyển dữ liệu từ payroll_compact về bảng payroll (mỗi ngày một dòng); payroll_sum do trigger tạo."""
+    cursor = conn.cursor()
+    cursor.execute("SELECT username, month, year, learner_id, mask, salary, salaries FROM payroll_compact")
+    sheets = cursor.fetchall()
+    try:
+        for username, month, year, learner_id, mask, salary, blob in sheets:
+            cursor.executemany('''
+                INSERT OR REPLACE INTO payroll (username, month, year, learner_id, day, checked, salary)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', [(username, month, year, learner_id, day, checked, day_salary)
+                  for day, checked, day_salary in decode_sheet(month, year, mask, salary, blob)])
+        cursor.execute("DELETE FROM payroll_compact")
+        conn.commit()
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+    logging.info(f"Đã chuyển {len(sheets)} bảng lương về kiểu lưu trữ theo ngày.")
+    return len(sheets)
+
+class CompactDatabase(Database):
+    """Cơ sở dữ liệu lưu mỗi bảng lương thành một dòng nén, giữ nguyên API của Database."""
+
+    # Dòng nén đã chứa tổng buổi và tổng phí của bảng lương, dùng trực tiếp cho báo cáo thu nhập
+    SUMMARY_TABLE = "payroll_compact"
+
+    def create_tables(self):
+        """Cập nhật lược đồ và tự động chuyển dữ liệu cũ từ bảng payroll (kiểu 'rows') nếu có."""
+        super().create_tables()
+        self.cursor.execute("SELECT EXISTS (SELECT 1 FROM payroll)")
+        if self.cursor.fetchone()[0]:
+            migrate_to_compact(self.conn)
+
+    def _load(self, username, month, year, learner_id):
+        """Đọc dòng nén (mask, salary, salaries) của một bảng lương."""
+        self.cursor.execute('''
+            SELECT mask, salary, salaries FROM payroll_compact
+            WHERE username = ? AND learner_id = ? AND year = ? AND month = ?
+        ''', (username, learner_id, year, month))
+        return self.cursor.fetchone()
+
+    def _store(self, username, month, year, learner_id, checked_days, day_salaries):
+        """Ghi lại dòng nén sau khi mã hóa (không commit)."""
+        mask, salary, blob, sessions, fee = encode_sheet(month, year, checked_days, day_salaries)
+        self.cursor.execute('''
+            UPDATE payroll_compact SET mask = ?, salary = ?, salaries = ?, sessions = ?, fee = ?
+            WHERE username = ? AND learner_id = ? AND year = ? AND month = ?
+        ''', (mask, salary, blob, sessions, fee, username, learner_id, year, month))
+        return sessions, fee
+
+    def _create_sheet_rows(self, username, month, year, learner_ids):
+        """Tạo bảng lương mới: một dòng nén cho mỗi người học (không commit)."""
+        self.cursor.executemany('''
+            INSERT OR IGNORE INTO payroll_compact (username, month, year, learner_id)
+            VALUES (?, ?, ?, ?)
+        ''', [(username, month, year, learner_id) for learner_id in learner_ids])
+
+    def get_payroll_data(self, username, month, year, learner_id):
+        """Lấy chi tiết bảng lương (ngày, trạng thái điểm danh, lương) từ dòng nén."""
+        row = self._load(username, month, year, learner_id)
+        return decode_sheet(month, year, *row) if row else []
+
+    def get_payroll_sheet(self, username, month, year, learner_id):
+        """Lấy toàn bộ bảng lương (ngày, điểm danh, lương, tên người học, tổng buổi, tổng phí) trong một truy vấn."""
+        self.cursor.execute('''
+            SELECT p.mask, p.salary, p.salaries, l.name, p.sessions, p.fee
+            FROM payroll_compact p
+            JOIN learners l ON p.learner_id = l.id
+            WHERE p.username = ? AND p.learner_id = ? AND p.year = ? AND p.month = ?
+        ''', (username, learner_id, year, month))
+        row = self.cursor.fetchone()
+        if not row:
+            return []
+        mask, salary, blob, name, sessions, fee = row
+        return [(day, checked, day_salary, name, sessions, fee)
+                for day, checked, day_salary in decode_sheet(month, year, mask, salary, blob)]
+
+    def get_payroll_summary(self, username, month, year, learner_id):
+        """Lấy tóm tắt bảng lương (tổng buổi, tổng phí)."""
+        self.cursor.execute('''
+            SELECT sessions, fee FROM payroll_compact
+            WHERE username = ? AND learner_id = ? AND year = ? AND month = ?
+        ''', (username, learner_id, year, month))
+        result = self.cursor.fetchone()
+        return result if result else (0, 0)
+
+    def get_month_totals(self, username, month, year):
+        """Tổng buổi và tổng phí của mọi bảng lương trong tháng, đọc từ các dòng nén."""
+        self.cursor.execute('''
+            SELECT p.learner_id, l.name, p.sessions, p.fee
+            FROM payroll_compact p
+            JOIN learners l ON p.learner_id = l.id
+            WHERE p.username = ? AND p.year = ? AND p.month = ?
+            ORDER BY l.name, p.learner_id
+        ''', (username, year, month))
+        return self.cursor.fetchall()
+
+    def _apply_days(self, username, month, year, learner_id, days, default_salary=None):
+        """
+        Áp dụng các thay đổi {ngày: (điểm danh, lương)} vào dòng nén bằng một lần đọc và một lần ghi (không commit).
+        Lương None giữ lương hiện có của ngày; default_salary dùng cho ngày đã điểm danh mà chưa có lương.
+        """
+        row = self._load(username, month, year, learner_id)
+        if not row:
+            return
+        data = decode_sheet(month, year, *row)
+        checked_days = {day_number(d) for d, c, _ in data if c}
+        day_salaries = [s for _, _, s in data]
+        for day, (checked, salary) in days.items():
+            number = day_number(day)
+            if salary is not None:
+                day_salaries[number - 1] = salary
+            elif checked and default_salary and not day_salaries[number - 1]:
+                day_salaries[number - 1] = default_salary
+            if checked:
+                checked_days.add(number)
+            else:
+                checked_days.discard(number)
+        self._store(username, month, year, learner_id, checked_days, day_salaries)
+
+    def update_day(self, username, month, year, learner_id, day, checked, salary):
+        """Cập nhật trạng thái điểm danh và lương cho một ngày cụ thể."""
+        try:
+            self._apply_days(username, month, year, learner_id, {day: (checked, salary)})
+            self.conn.commit()
+            logging.info(f"Ngày {day} được cập nhật cho {username} - {month}/{year} - Người học ID: {learner_id}")
+            return True
+        except sqlite3.Error as e:
+            logging.error(f"Lỗi khi cập nhật ngày: {e}")
+            return False
+
+    def apply_day_changes(self, changes):
+        """Ghi một lô thay đổi điểm danh trong một giao dịch, mỗi bảng lương một lần ghi dòng nén."""
+        try:
+            for (username, month, year, learner_id), days in changes.items():
+                self._apply_days(username, month, year, learner_id, days)
+            self.conn.commit()
+            logging.info(f"Đã ghi {sum(len(days) for days in changes.values())} thay đổi điểm danh cho {len(changes)} bảng lương.")
+            return True
+        except sqlite3.Error as e:
+            self.conn.rollback()
+            logging.error(f"Lỗi khi ghi lô thay đổi điểm danh: {e}")
+            return False
+
+    def import_days(self, username, rows, defaults=None):
+        """
+        Ghi một lô điểm danh nhập từ file trong một giao dịch, mỗi bảng lương một lần đọc và ghi dòng nén
+        (xem Database.import_days). Tổng buổi và tổng phí được tính ngay khi ghi dòng nén.
+        """
+        defaults = defaults or {}
+        sheets = {}
+        for month, year, learner_id, day, checked, salary in rows:
+            sheets.setdefault((month, year, learner_id), {})[day] = (checked, salary)
+        try:
+            created = self._create_missing_sheets(username, sheets)
+            for (month, year, learner_id), days in sheets.items():
+                self._apply_days(username, month, year, learner_id, days, defaults.get((month, year, learner_id)))
+            self.conn.commit()
+            logging.info(f"Đã nhập {len(rows)} ngày điểm danh cho {username} vào {len(sheets)} bảng lương (tạo mới {created}).")
+            return created
+        except sqlite3.Error as e:
+            self.conn.rollback()
+            logging.error(f"Lỗi khi nhập điểm danh cho {username}: {e}")
+            return None
+
+    def refresh_summaries(self, username, sheets):
+        """
+        Không cần tính lại: tổng buổi và tổng phí nằm trong dòng nén. Chỉ xóa đánh dấu payroll_sum_dirty còn lại
+        từ kiểu lưu trữ 'rows' (dữ liệu đó được chuyển sang dòng nén với tổng tính lại, xem migrate_to_compact).
+        """
+        try:
+            self.cursor.executemany(
+                "DELETE FROM payroll_sum_dirty WHERE username = ? AND month = ? AND year = ? AND learner_id = ?",
+                [(username, month, year, learner_id) for month, year, learner_id in sheets])
+            self.conn.commit()
+            return True
+        except sqlite3.Error as e:
+            self.conn.rollback()
+            logging.error(f"Lỗi khi xóa đánh dấu tóm tắt cho {username}: {e}")
+            return False
+
+    def get_default_salaries(self, username):
+        """Lương mặc định của mọi bảng lương của username (xem Database.get_default_salaries)."""
+        self.cursor.execute('''
+            SELECT month, year, learner_id, salary FROM payroll_compact
+            WHERE username = ?
+        ''', (username,))
+        return {(month, year, learner_id): salary or 0 for month, year, learner_id, salary in self.cursor.fetchall()}
+
+    def apply_salary(self, username, month, year, learner_id, salary, only_checked=False, first_day=None, last_day=None):
+        """Áp dụng mức lương mới trong một giao dịch (xem Database.apply_salary). Trả về (tổng buổi, tổng phí) hoặc None."""
+        try:
+            if not only_checked and first_day is None and last_day is None:
+                # Cùng một mức lương cho mọi ngày: không cần mảng lương theo ngày
+                self.cursor.execute('''
+                    UPDATE payroll_compact
+                    SET salary = ?, salaries = NULL, fee = sessions * ?
+                    WHERE username = ? AND learner_id = ? AND year = ? AND month = ?
+                ''', (salary, salary, username, learner_id, year, month))
+            else:
+                row = self._load(username, month, year, learner_id)
+                if row:
+                    first, last = first_day or 1, last_day or 31
+                    changes = {day: (checked, salary) for day, checked, _ in decode_sheet(month, year, *row)
+                               if (checked or not only_checked) and first <= day_number(day) <= last}
+                    self._apply_days(username, month, year, learner_id, changes)
+            self.cursor.execute('''
+                SELECT sessions, fee FROM payroll_compact
+                WHERE username = ? AND learner_id = ? AND year = ? AND month = ?
+            ''', (username, learner_id, year, month))
+            summary = self.cursor.fetchone() or (0, 0)
+            self.conn.commit()
+            logging.info(f"Lương cập nhật: {salary} cho {username} - {month}/{year} - Người học ID: {learner_id}")
+            return summary
+        except sqlite3.Error as e:
+            self.conn.rollback()
+            logging.error(f"Lỗi khi cập nhật lương: {e}")
+            return None
+
+    def delete_payroll(self, username, month, year, learner_id):
+        """Xóa bảng lương (dòng nén)."""
+        try:
+            self.cursor.execute('''
+                DELETE FROM payroll_compact
+                WHERE username = ? AND learner_id = ? AND year = ? AND month = ?
+            ''', (username, learner_id, year, month))
+            self.remove_payroll_sheet(username, month, year, learner_id)
+            self.conn.commit()
+            logging.info(f"Bảng lương {month}/{year} đã xóa cho {username} - Người học ID: {learner_id}")
+            return True
+        except sqlite3.Error as e:
+            logging.error(f"Lỗi khi xóa bảng lương: {e}")
+            return False
+
+if __name__ == "__main__":
+    # Chuyển dữ liệu hiện có giữa hai kiểu lưu trữ: python payroll_compact.py [compact|rows]
+    import sys
+    db = Database()
+    target = sys.argv[1] if len(sys.argv) > 1 else "compact"
+    count = migrate_to_rows(db.conn) if target == "rows" else migrate_to_compact(db.conn)
+    db.conn.execute("VACUUM")
+    print(f"Đã chuyển {count} bảng lương sang kiểu '{target}'.")
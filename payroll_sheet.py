@@ -0,0 +1,68 @@
+class PayrollSheet:
+    """Mô hình bảng lương trong bộ nhớ của một người học trong một tháng, truy cập theo ngày."""
+
+    def __init__(self, username, month, year, learner_id, learner_name, rows, sessions=0, fee=0):
+        """Khởi tạo bảng lương từ danh sách (ngày, điểm danh, lương) đã tải từ cơ sở dữ liệu."""
+        self.username = username
+        self.month = month
+        self.year = year
+        self.learner_id = learner_id
+        self.learner_name = learner_name
+        # Giữ thứ tự ngày như trong cơ sở dữ liệu, truy cập theo khóa 'ngày/tháng'
+        self.days = {day: [checked, salary] for day, checked, salary in rows}
+        self.sessions = sessions
+        self.fee = fee
+        self.default_salary = max((salary for _, salary in self.days.values()), default=0)
+
+    @classmethod
+    def load(cls, db, username, month, year, learner_id):
+        """Tải bảng lương bằng một truy vấn duy nhất."""
+        rows = db.get_payroll_sheet(username, month, year, learner_id)
+        if not rows:
+            return cls(username, month, year, learner_id, "Không xác định", [])
+        _, _, _, learner_name, sessions, fee = rows[0]
+        return cls(username, month, year, learner_id, learner_name,
+                   [(day, checked, salary) for day, checked, salary, _, _, _ in rows],
+                   sessions or 0, fee or 0)
+
+    @property
+    def key(self):
+        """Khóa định danh bảng lương (username, tháng, năm, người học)."""
+        return self.username, self.month, self.year, self.learner_id
+
+    @property
+    def enabled(self):
+        """Chỉ cho phép điểm danh khi đã có lương mặc định."""
+        return self.default_salary > 0
+
+    def is_checked(self, day):
+        """Kiểm tra ngày đã được điểm danh hay chưa."""
+        entry = self.days.get(day)
+        return bool(entry and entry[0])
+
+    def set_day(self, day, checked, salary):
+        """Cập nhật trạng thái điểm danh và lương của một ngày, tính lại tóm tắt."""
+        self.days[day] = [checked, salary]
+        self.recompute_summary()
+
+    def apply_salary(self, salary, only_checked=False):
+        """Áp dụng mức lương mới cho tất cả các ngày (hoặc chỉ các ngày đã điểm danh), tính lại tóm tắt."""
+        for entry in self.days.values():
+            if entry[0] or not only_checked:
+                entry[1] = salary
+        self.default_salary = max((s for _, s in self.days.values()), default=0)
+        self.recompute_summary()
+
+    def checked_days(self):
+        """Danh sách các ngày đã điểm danh."""
+        return [day for day, (checked, _) in self.days.items() if checked]
+
+    def recompute_summary(self):
+        """Tính lại tổng buổi và tổng phí (tổng lương các ngày đã điểm danh), giống trigger của payroll_sum."""
+        self.sessions = sum(1 for checked, _ in self.days.values() if checked)
+        self.fee = sum(salary for checked, salary in self.days.values() if checked)
+        return self.sessions, self.fee
+
+    def data(self):
+        """Trả về dữ liệu dạng (ngày, điểm danh, lương) như get_payroll_data."""
+        return [(day, checked, salary) for day, (checked, salary) in self.days.items()]
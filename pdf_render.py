@@ -0,0 +1,192 @@
+import logging
+import os
+from reportlab.lib.pagesizes import A4
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
+from reportlab.lib import colors
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.platypus import Flowable
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from utils import format_change, format_currency, format_percent, get_weeks_in_month
+
+# Phần dựng PDF bằng reportlab. Module này chỉ được nạp ở lần xuất PDF đầu tiên
+# (hoặc khi làm nóng nền sau khi mở cửa sổ đăng nhập, xem pdf_utils.warm_up),
+# để khởi động ứng dụng không phải nạp reportlab và font.
+
+_font_name = None
+
+def pdf_font():
+    """Đăng ký font hỗ trợ tiếng Việt ở lần gọi đầu tiên, trả về tên font dùng cho các lần sau."""
+    global _font_name
+    if _font_name is not None:
+        return _font_name
+    font_name = 'DejaVuSans'  # Font mặc định hỗ trợ tiếng Việt
+    try:
+        # Tìm font DejaVuSans
+        font_path = os.path.join(os.path.dirname(__file__), 'DejaVuSans.ttf')
+        if not os.path.exists(font_path):
+            # Thử tìm trong môi trường PyInstaller
+            font_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'DejaVuSans.ttf')
+        if os.path.exists(font_path):
+            pdfmetrics.registerFont(TTFont('DejaVuSans', font_path))
+            logging.info("Đã đăng ký font DejaVuSans thành công.")
+        else:
+            logging.warning("Không tìm thấy DejaVuSans.ttf, sử dụng Helvetica làm dự phòng.")
+            font_name = 'Helvetica'
+    except Exception as e:
+        logging.warning(f"Lỗi khi đăng ký DejaVuSans: {e}. Sử dụng Helvetica làm dự phòng.")
+        font_name = 'Helvetica'
+    _font_name = font_name
+    return _font_name
+
+class CheckMark(Flowable):
+    """Lớp tạo dấu tích tùy chỉnh để hiển thị trong PDF."""
+    def __init__(self, width=8, height=8):
+        Flowable.__init__(self)
+        self.width = max(width, 6)
+        self.height = max(height, 6)
+    
+    def draw(self):
+        """Vẽ dấu tích trên canvas PDF."""
+        self.canv.setStrokeColor(colors.black)
+        self.canv.setLineWidth(1.5)
+        self.canv.line(0, self.height/2, self.width/3, self.height/4)
+        self.canv.line(self.width/3, self.height/4, self.width-2, self.height-2)
+
+def _sheet_styles():
+    """Tạo bộ style dùng chung cho các trang bảng lương."""
+    font_name = pdf_font()
+    styles = getSampleStyleSheet()
+    # Thiết lập style cho tiêu đề và văn bản
+    styles['Heading1'].fontName = font_name
+    styles['Heading1'].fontSize = 16
+    styles['Normal'].fontName = font_name
+    styles['Normal'].fontSize = 9  # Giảm cỡ chữ để tránh xuống dòng
+    styles.add(ParagraphStyle(name='Summary', fontName=font_name, fontSize=12, leading=14, spaceAfter=10))
+    return styles
+
+def _sheet_elements(styles, month, year, data, learner_name, sessions, fee):
+    """Tạo các thành phần (tiêu đề, lưới tuần, tóm tắt) cho trang PDF của một bảng lương."""
+    if not learner_name:
+        learner_name = "Bảng Lương"
+        logging.warning("Tên người học rỗng, sử dụng tiêu đề mặc định.")
+    elements = []
+
+    # Thêm tiêu đề
+    elements.append(Paragraph(f"{learner_name} Tháng {month}/{year}", styles['Heading1']))
+    elements.append(Spacer(1, 12))
+
+    # Tạo bảng điểm danh
+    table_data = [[""] + ["T2", "T3", "T4", "T5", "T6", "T7", "CN"]]
+    weeks = get_weeks_in_month(year, month)
+    checked_by_day = {d[0].strip(): d[1] for d in data}
+    for i, week in enumerate(weeks, 1):
+        row = [f"Tuần {i}"]
+        for day in week:
+            if day:
+                day_clean = day.strip()
+                checked = checked_by_day.get(day_clean, 0)
+                logging.debug(f"Ngày {day_clean} được điểm danh: {checked}")
+                if checked:
+                    sub_table = Table([[Paragraph(day_clean, styles['Normal']), CheckMark()]], colWidths=[34, 8], rowHeights=[20])
+                    sub_table.setStyle(TableStyle([
+                        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),  # Căn giữa cả ngày và dấu tick
+                        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+                    ]))
+                    row.append(sub_table)
+                else:
+                    row.append(Paragraph(day_clean, styles['Normal']))
+            else:
+                row.append("")
+        table_data.append(row)
+
+    # Tạo bảng
+    table = Table(table_data, colWidths=[60] + [50] * 7, rowHeights=[30] * len(table_data))
+    table.setStyle(TableStyle([
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('FONTNAME', (0, 0), (-1, -1), pdf_font()),
+        ('FONTSIZE', (0, 0), (-1, -1), 9),
+    ]))
+    elements.append(table)
+
+    # Thêm thông tin tóm tắt
+    elements.append(Spacer(1, 12))
+    elements.append(Paragraph(f"Tổng buổi: {sessions}", styles['Summary']))
+    elements.append(Paragraph(f"Tổng phí: {format_currency(fee)}", styles['Summary']))
+    return elements
+
+def render_sheets(filename, sheets):
+    """
+    Ghi một hoặc nhiều bảng lương vào một file PDF, mỗi bảng lương một trang.
+    sheets là danh sách (tháng, năm, dữ liệu, tên người học, tổng buổi, tổng phí).
+    Hàm ở cấp module để tiến trình con của export_batch_pdf gọi được. Trả về tên file.
+    """
+    doc = SimpleDocTemplate(filename, pagesize=A4)
+    styles = _sheet_styles()
+    elements = []
+    for i, (month, year, data, learner_name, sessions, fee) in enumerate(sheets):
+        if i:
+            elements.append(PageBreak())
+        elements.extend(_sheet_elements(styles, month, year, data, learner_name, sessions, fee))
+    doc.build(elements)
+    return filename
+
+def _report_table(styles, header, rows, col_widths):
+    """Bảng số liệu của báo cáo: dòng tiêu đề lặp lại ở mỗi trang, cột số căn phải."""
+    table = Table([header] + rows, colWidths=col_widths, repeatRows=1)
+    table.setStyle(TableStyle([
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#E3F2FD")),
+        ('FONTNAME', (0, 0), (-1, -1), pdf_font()),
+        ('FONTSIZE', (0, 0), (-1, -1), 9),
+        ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
+        ('ALIGN', (1, 1), (-1, -1), 'RIGHT'),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ]))
+    return table
+
+def _report_elements(styles, report):
+    """Các phần của báo cáo thu nhập: tóm tắt và theo năm, theo quý, theo tháng, theo người học (mỗi phần từ trang mới)."""
+    return [
+        Paragraph(f"Báo cáo thu nhập {report.period}", styles['Heading1']),
+        Paragraph(f"Người dùng: {report.username}", styles['Summary']),
+        Paragraph(f"Tổng: {report.sessions} buổi, {format_currency(report.fee)}", styles['Summary']),
+        Paragraph(report.to_date_text(), styles['Summary']),
+        Spacer(1, 12),
+        Paragraph("Theo năm", styles['Heading2']),
+        _report_table(styles, ["Năm", "Người học", "Buổi", "Thu nhập", "So với năm trước"],
+                      [[year, learners, sessions, format_currency(fee), format_change(fee, previous)]
+                       for year, learners, sessions, fee, previous in report.years],
+                      [60, 70, 70, 140, 110]),
+        PageBreak(),
+        Paragraph("Theo quý", styles['Heading2']),
+        _report_table(styles, ["Quý", "Buổi", "Thu nhập", "So với quý trước", "So với cùng kỳ"],
+                      [[f"Q{quarter}/{year}", sessions, format_currency(fee), format_change(fee, previous),
+                        format_change(fee, last_year)]
+                       for year, quarter, sessions, fee, previous, last_year in report.quarters],
+                      [70, 60, 130, 100, 100]),
+        PageBreak(),
+        Paragraph("Theo tháng", styles['Heading2']),
+        _report_table(styles, ["Tháng", "Người học", "Buổi", "Thu nhập", "Lũy kế năm", "Cùng kỳ"],
+                      [[f"{month}/{year}", learners, sessions, format_currency(fee), format_currency(ytd_fee),
+                        format_change(fee, last_year)]
+                       for year, month, learners, sessions, fee, _, ytd_fee, last_year in report.months],
+                      [60, 60, 50, 120, 130, 60]),
+        PageBreak(),
+        Paragraph("Theo người học", styles['Heading2']),
+        _report_table(styles, ["Hạng", "Người học", "Tháng", "Buổi", "Thu nhập", "Tỷ lệ"],
+                      [[rank, Paragraph(name, styles['Normal']), months, sessions, format_currency(fee),
+                        format_percent(share)]
+                       for rank, _, name, months, sessions, fee, share in report.learners],
+                      [40, 170, 45, 50, 120, 50]),
+    ]
+
+def render_report(filename, report):
+    """Ghi báo cáo thu nhập (reports.EarningsReport) ra file PDF nhiều trang. Trả về tên file."""
+    doc = SimpleDocTemplate(filename, pagesize=A4, title=f"Báo cáo thu nhập {report.username} {report.period}")
+    styles = _sheet_styles()
+    styles['Heading2'].fontName = pdf_font()
+    doc.build(_report_elements(styles, report))
+    return filename
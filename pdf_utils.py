@@ -1,54 +1,44 @@
 import logging
 import os
-import tkinter as tk
-from tkinter import filedialog
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
-from reportlab.lib.pagesizes import A4
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.graphics.shapes import Drawing, Line
-from reportlab.platypus import Flowable
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-from utils import format_currency, get_weeks_in_month
 
-# Đăng ký font để hỗ trợ tiếng Việt
-font_name = 'DejaVuSans'  # Font mặc định hỗ trợ tiếng Việt
-try:
-    # Tìm font DejaVuSans
-    font_path = os.path.join(os.path.dirname(__file__), 'DejaVuSans.ttf')
-    if not os.path.exists(font_path):
-        # Thử tìm trong môi trường PyInstaller
-        font_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'DejaVuSans.ttf')
-    if os.path.exists(font_path):
-        pdfmetrics.registerFont(TTFont('DejaVuSans', font_path))
-        logging.info("Đã đăng ký font DejaVuSans thành công.")
-    else:
-        logging.warning("Không tìm thấy DejaVuSans.ttf, sử dụng Helvetica làm dự phòng.")
-        font_name = 'Helvetica'
-except Exception as e:
-    logging.warning(f"Lỗi khi đăng ký DejaVuSans: {e}. Sử dụng Helvetica làm dự phòng.")
-    font_name = 'Helvetica'
+# reportlab và font chỉ được nạp khi xuất PDF lần đầu (xem pdf_render.py);
+# tkinter chỉ được nạp khi mở hộp thoại, để chế độ dòng lệnh (cli.py) không cần giao diện
 
-class CheckMark(Flowable):
-    """Lớp tạo dấu tích tùy chỉnh để hiển thị trong PDF."""
-    def __init__(self, width=8, height=8):
-        Flowable.__init__(self)
-        self.width = max(width, 6)
-        self.height = max(height, 6)
-    
-    def draw(self):
-        """Vẽ dấu tích trên canvas PDF."""
-        self.canv.setStrokeColor(colors.black)
-        self.canv.setLineWidth(1.5)
-        self.canv.line(0, self.height/2, self.width/3, self.height/4)
-        self.canv.line(self.width/3, self.height/4, self.width-2, self.height-2)
+def ask_pdf_filename(username, month, year, parent=None, initial_file=None):
+    """
+    Mở hộp thoại chọn nơi lưu file PDF (phải gọi trên luồng Tk). Khi không có cửa sổ cha,
+    tạo một cửa sổ Tk ẩn tạm thời. initial_file thay cho tên file bảng lương mặc định.
+    Trả về tên file, hoặc chuỗi rỗng nếu người dùng hủy.
+    """
+    import tkinter as tk
+    from tkinter import filedialog
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    initial_file = initial_file or f"Payroll_{username}_{month}_{year}_{timestamp}.pdf"
+    root = None
+    if parent is None:
+        root = tk.Tk()
+        root.withdraw()
+    filename = filedialog.asksaveasfilename(
+        parent=parent or root,
+        initialfile=initial_file,
+        defaultextension=".pdf",
+        filetypes=[("PDF files", "*.pdf")],
+        title="Chọn nơi lưu file PDF",
+        initialdir=os.path.expanduser("~/Desktop")
+    )
+    if root is not None:
+        root.destroy()
+    return filename
 
-def export_to_pdf(username, month, year, data, learner_name, learner_id, sessions, fee):
+def export_to_pdf(username, month, year, data, learner_name, learner_id, sessions, fee, filename=None):
     """
     Xuất bảng lương ra file PDF với định dạng lưới tuần, dấu tích cho ngày điểm danh, 
-    tổng buổi và tổng phí.
+    tổng buổi và tổng phí. Khi đã có filename (chọn trước trên luồng Tk), không mở hộp thoại,
+    nên có thể chạy trên luồng nền.
     """
     try:
         # Kiểm tra dữ liệu đầu vào
@@ -62,18 +52,8 @@ def export_to_pdf(username, month, year, data, learner_name, learner_id, session
         logging.info(f"Dữ liệu bảng lương hợp lệ: {data}, Tổng buổi: {sessions}, Tổng phí: {fee}")
 
         # Mở hộp thoại chọn nơi lưu file
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        initial_file = f"Payroll_{username}_{month}_{year}_{timestamp}.pdf"
-        root = tk.Tk()
-        root.withdraw()
-        filename = filedialog.asksaveasfilename(
-            initialfile=initial_file,
-            defaultextension=".pdf",
-            filetypes=[("PDF files", "*.pdf")],
-            title="Chọn nơi lưu file PDF",
-            initialdir=os.path.expanduser("~/Desktop")
-        )
-        root.destroy()
+        if filename is None:
+            filename = ask_pdf_filename(username, month, year)
 
         # Kiểm tra nếu người dùng hủy hộp thoại
         if not filename:
@@ -86,69 +66,101 @@ def export_to_pdf(username, month, year, data, learner_name, learner_id, session
             logging.error(f"Không có quyền ghi vào thư mục: {directory}")
             return False, None
 
-        if not learner_name:
-            learner_name = "Bảng Lương"
-            logging.warning("Tên người học rỗng, sử dụng tiêu đề mặc định.")
+        # Tạo PDF
+        from pdf_render import render_sheets
+        render_sheets(filename, [(month, year, data, learner_name, sessions, fee)])
+        logging.info(f"Đã xuất PDF thành công: {filename}")
+        return True, filename
+    except Exception as e:
+        logging.error(f"Lỗi khi xuất PDF: {e}")
+        return False, None
 
-        # Tạo tài liệu PDF
-        doc = SimpleDocTemplate(filename, pagesize=A4)
-        elements = []
-        styles = getSampleStyleSheet()
-        
-        # Thiết lập style cho tiêu đề và văn bản
-        styles['Heading1'].fontName = font_name
-        styles['Heading1'].fontSize = 16
-        styles['Normal'].fontName = font_name
-        styles['Normal'].fontSize = 9  # Giảm cỡ chữ để tránh xuống dòng
-        styles.add(ParagraphStyle(name='Summary', fontName=font_name, fontSize=12, leading=14, spaceAfter=10))
+def _safe_filename(text):
+    """Loại bỏ các ký tự không hợp lệ trong tên file Windows."""
+    return re.sub(r'[\\/:*?"<>|\s]+', "_", str(text)).strip("_") or "BangLuong"
 
-        # Thêm tiêu đề
-        elements.append(Paragraph(f"{learner_name} Tháng {month}/{year}", styles['Heading1']))
-        elements.append(Spacer(1, 12))
+def export_batch_pdf(username, sheets, directory, merged=False, progress=None, max_workers=None, pool=None):
+    """
+    Xuất nhiều bảng lương cùng lúc vào thư mục directory.
+    - merged=False: mỗi bảng lương một file, các file được tạo song song trên nhiều tiến trình
+      (mặc định bằng số nhân CPU).
+    - merged=True: gộp tất cả vào một file PDF nhiều trang (một tài liệu nên tạo trong một tiến trình con).
+    sheets là danh sách (tháng, năm, dữ liệu, tên người học, tổng buổi, tổng phí).
+    progress(đã xong, tổng số) được gọi mỗi khi một file hoàn tất.
+    pool: ProcessPoolExecutor dùng chung khi xuất cho nhiều người dùng liên tiếp (không bị đóng ở đây);
+    mặc định tạo một pool riêng cho lần xuất này.
+    Trả về (thành công, danh sách file đã tạo).
+    """
+    sheets = [sheet for sheet in sheets if sheet[2]]
+    if not sheets:
+        logging.error(f"Không có bảng lương nào có dữ liệu để xuất cho {username}.")
+        return False, []
+    if not os.access(directory, os.W_OK):
+        logging.error(f"Không có quyền ghi vào thư mục: {directory}")
+        return False, []
 
-        # Tạo bảng điểm danh
-        table_data = [[""] + ["T2", "T3", "T4", "T5", "T6", "T7", "CN"]]
-        weeks = get_weeks_in_month(year, month)
-        for i, week in enumerate(weeks, 1):
-            row = [f"Tuần {i}"]
-            for day in week:
-                if day:
-                    day_clean = day.strip()
-                    checked = next((d[1] for d in data if d[0].strip() == day_clean), 0)
-                    logging.debug(f"Ngày {day_clean} được điểm danh: {checked}")
-                    if checked:
-                        sub_table = Table([[Paragraph(day_clean, styles['Normal']), CheckMark()]], colWidths=[34, 8], rowHeights=[20])
-                        sub_table.setStyle(TableStyle([
-                            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),  # Căn giữa cả ngày và dấu tick
-                            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                        ]))
-                        row.append(sub_table)
-                    else:
-                        row.append(Paragraph(day_clean, styles['Normal']))
-                else:
-                    row.append("")
-            table_data.append(row)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    if merged:
+        jobs = [(os.path.join(directory, f"Payroll_{_safe_filename(username)}_{timestamp}.pdf"), sheets)]
+    else:
+        jobs = []
+        for sheet in sheets:
+            month, year, _, learner_name, _, _ = sheet
+            name = f"Payroll_{_safe_filename(username)}_{_safe_filename(learner_name)}_{month}_{year}_{timestamp}.pdf"
+            jobs.append((os.path.join(directory, name), [sheet]))
 
-        # Tạo bảng
-        table = Table(table_data, colWidths=[60] + [50] * 7, rowHeights=[30] * len(table_data))
-        table.setStyle(TableStyle([
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('FONTNAME', (0, 0), (-1, -1), font_name),
-            ('FONTSIZE', (0, 0), (-1, -1), 9),
-        ]))
-        elements.append(table)
+    from pdf_render import render_sheets
+    own_pool = pool is None
+    workers = min(max_workers or os.cpu_count() or 1, len(jobs))
+    files = []
+    try:
+        if own_pool:
+            pool = ProcessPoolExecutor(max_workers=workers)
+        futures = [pool.submit(render_sheets, filename, job_sheets) for filename, job_sheets in jobs]
+        for done, future in enumerate(as_completed(futures), 1):
+            files.append(future.result())
+            if progress:
+                progress(done, len(jobs))
+    except Exception as e:
+        logging.error(f"Lỗi khi xuất PDF hàng loạt: {e}")
+        return False, files
+    finally:
+        if own_pool and pool is not None:
+            pool.shutdown()
+    logging.info(f"Đã xuất {len(sheets)} bảng lương ra {len(files)} file PDF trong {directory} ({f'{workers} tiến trình' if own_pool else 'pool dùng chung'}).")
+    return True, sorted(files)
 
-        # Thêm thông tin tóm tắt
-        elements.append(Spacer(1, 12))
-        elements.append(Paragraph(f"Tổng buổi: {sessions}", styles['Summary']))
-        elements.append(Paragraph(f"Tổng phí: {format_currency(fee)}", styles['Summary']))
+def report_filename(report):
+    """Tên file mặc định của báo cáo thu nhập."""
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return f"Report_{_safe_filename(report.username)}_{report.period}_{timestamp}.pdf"
 
-        # Tạo PDF
-        doc.build(elements)
-        logging.info(f"Đã xuất PDF thành công: {filename}")
+def export_report_pdf(report, filename):
+    """
+    Xuất báo cáo thu nhập (reports.EarningsReport) ra file PDF nhiều trang; filename đã được chọn trước
+    nên chạy được trên luồng nền. Trả về (thành công, tên file).
+    """
+    try:
+        directory = os.path.dirname(filename) or "."
+        if not os.access(directory, os.W_OK):
+            logging.error(f"Không có quyền ghi vào thư mục: {directory}")
+            return False, None
+        from pdf_render import render_report
+        render_report(filename, report)
+        logging.info(f"Đã xuất báo cáo thu nhập của {report.username} ({report.period}): {filename}")
         return True, filename
     except Exception as e:
-        logging.error(f"Lỗi khi xuất PDF: {e}")
-        return False, None
\ No newline at end of file
+        logging.error(f"Lỗi khi xuất báo cáo PDF: {e}")
+        return False, None
+
+def _warm_up():
+    """Nạp reportlab và đăng ký font (chạy trong luồng nền)."""
+    try:
+        from pdf_render import pdf_font
+        pdf_font()
+    except Exception as e:
+        logging.warning(f"Không thể làm nóng phần xuất PDF: {e}")
+
+def warm_up():
+    """Nạp trước reportlab và font trong luồng nền để lần xuất PDF đầu tiên không phải chờ."""
+    threading.Thread(target=_warm_up, name="pdf-warm-up", daemon=True).start()
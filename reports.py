@@ -0,0 +1,110 @@
+from utils import format_change, format_currency, format_percent, vn_now
+
+# Báo cáo thu nhập của một người dùng trong một khoảng năm: theo năm, quý, tháng, người học và từ đầu năm.
+# Mọi số liệu được tổng hợp trong SQL trên bảng tóm tắt theo tháng (Database.SUMMARY_TABLE) bằng các hàm
+# tổng hợp và hàm cửa sổ (lũy kế trong năm, so với kỳ trước, so với cùng kỳ năm trước, xếp hạng người học),
+# không đọc từng ngày điểm danh.
+
+class EarningsReport:
+    """Kết quả báo cáo thu nhập đã tải từ cơ sở dữ liệu; dùng cho màn hình báo cáo, dòng lệnh và PDF."""
+
+    def __init__(self, username, first_year, last_year, years, quarters, months, learners, to_date):
+        self.username = username
+        self.first_year = first_year
+        self.last_year = last_year
+        # (năm, số người học, tổng buổi, tổng phí, phí năm trước hoặc None)
+        self.years = years
+        # (năm, quý, tổng buổi, tổng phí, phí quý trước hoặc None, phí cùng quý năm trước hoặc None)
+        self.quarters = quarters
+        # (năm, tháng, số người học, tổng buổi, tổng phí, lũy kế buổi, lũy kế phí, phí cùng tháng năm trước)
+        self.months = months
+        # (hạng, learner_id, tên, số tháng, tổng buổi, tổng phí, tỷ lệ %)
+        self.learners = learners
+        # (năm, tháng cuối, tổng buổi, tổng phí, tổng buổi cùng kỳ năm trước, tổng phí cùng kỳ năm trước)
+        self.to_date = to_date
+
+    @classmethod
+    def load(cls, db, username, first_year, last_year):
+        """
+        Tải báo cáo của username từ first_year đến last_year. Số liệu từ đầu năm tính đến tháng hiện tại
+        khi last_year là năm nay, ngược lại cả năm last_year.
+        """
+        now = vn_now()
+        month = now.month if last_year == now.year else 12
+        totals = db.get_year_to_date(username, last_year, month)
+        sessions, fee = totals.get(last_year, (0, 0))
+        previous_sessions, previous_fee = totals.get(last_year - 1, (0, 0))
+        return cls(username, first_year, last_year,
+                   db.get_earnings_by_year(username, first_year, last_year),
+                   db.get_earnings_by_quarter(username, first_year, last_year),
+                   db.get_earnings_by_month(username, first_year, last_year),
+                   db.get_earnings_by_learner(username, first_year, last_year),
+                   (last_year, month, sessions, fee, previous_sessions, previous_fee))
+
+    @property
+    def period(self):
+        """Khoảng năm của báo cáo dạng chữ."""
+        if self.first_year == self.last_year:
+            return str(self.first_year)
+        return f"{self.first_year}-{self.last_year}"
+
+    @property
+    def sessions(self):
+        """Tổng buổi của cả khoảng năm."""
+        return sum(row[2] for row in self.years)
+
+    @property
+    def fee(self):
+        """Tổng thu nhập của cả khoảng năm."""
+        return sum(row[3] for row in self.years)
+
+    def to_date_text(self):
+        """Câu tóm tắt thu nhập từ đầu năm so với cùng kỳ năm trước."""
+        year, month, sessions, fee, previous_sessions, previous_fee = self.to_date
+        text = f"Từ đầu năm {year} đến hết tháng {month}: {sessions} buổi, {format_currency(fee)}"
+        change = format_change(fee, previous_fee)
+        if change:
+            text += f" ({change} so với cùng kỳ năm trước: {format_currency(previous_fee)})"
+        return text
+
+    def lines(self):
+        """Báo cáo dạng văn bản, mỗi phần tử một dòng."""
+        lines = [f"Báo cáo thu nhập của {self.username} ({self.period}): {self.sessions} buổi, "
+                 f"{format_currency(self.fee)}", f"  {self.to_date_text()}", "Theo năm:"]
+        for year, learners, sessions, fee, previous in self.years:
+            change = format_change(fee, previous)
+            lines.append(f"  {year}: {learners} người học, {sessions} buổi, {format_currency(fee)}"
+                         f"{f' ({change})' if change else ''}")
+        lines.append("Theo quý:")
+        for year, quarter, sessions, fee, previous, last_year in self.quarters:
+            changes = []
+            if previous:
+                changes.append(f"{format_change(fee, previous)} so với quý trước")
+            if last_year:
+                changes.append(f"{format_change(fee, last_year)} so với cùng kỳ")
+            lines.append(f"  Q{quarter}/{year}: {sessions} buổi, {format_currency(fee)}"
+                         f"{' (' + ', '.join(changes) + ')' if changes else ''}")
+        lines.append("Theo người học:")
+        for rank, _, name, months, sessions, fee, share in self.learners:
+            lines.append(f"  {rank}. {name}: {months} tháng, {sessions} buổi, {format_currency(fee)} ({format_percent(share)})")
+        return lines
+
+    def to_dict(self):
+        """Dạng JSON của báo cáo."""
+        year, month, sessions, fee, previous_sessions, previous_fee = self.to_date
+        return {
+            "username": self.username,
+            "first_year": self.first_year,
+            "last_year": self.last_year,
+            "sessions": self.sessions,
+            "fee": self.fee,
+            "year_to_date": {"year": year, "month": month, "sessions": sessions, "fee": fee,
+                             "previous_sessions": previous_sessions, "previous_fee": previous_fee},
+            "years": [dict(zip(("year", "learners", "sessions", "fee", "previous_fee"), row)) for row in self.years],
+            "quarters": [dict(zip(("year", "quarter", "sessions", "fee", "previous_quarter_fee", "previous_year_fee"), row))
+                         for row in self.quarters],
+            "months": [dict(zip(("year", "month", "learners", "sessions", "fee", "ytd_sessions", "ytd_fee",
+                                 "previous_year_fee"), row)) for row in self.months],
+            "learners": [dict(zip(("rank", "learner_id", "learner", "months", "sessions", "fee", "share"), row))
+                         for row in self.learners],
+        }
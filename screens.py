@@ -0,0 +1,139 @@
+import tkinter as tk
+from tkinter import ttk
+
+# Điều hướng giữa các màn hình bằng cách ẩn/hiện khung đã dựng sẵn thay vì xóa và dựng lại toàn bộ widget.
+# Kiểu dáng ttk được cấu hình một lần cho cả ứng dụng; các cửa sổ phụ (popup) được dựng một lần và dùng lại.
+
+BG_COLOR = "#F5F7FA"
+
+def configure_styles(style):
+    """Cấu hình kiểu dáng cho các widget (gọi một lần khi khởi động)."""
+    style.configure("TEntry", padding=8, font=("Segoe UI", 11))
+    style.configure("TButton", padding=8, font=("Segoe UI", 11, "bold"))
+    style.configure("TLabel", background="#FFFFFF", font=("Segoe UI", 11))
+    style.configure("Header.TLabel", font=("Segoe UI", 20, "bold"), foreground="#1E88E5")
+    style.configure("SubHeader.TLabel", font=("Segoe UI", 11), foreground="#37474F")
+    style.configure("Treeview", font=("Segoe UI", 11), rowheight=30)
+    style.configure("Treeview.Heading", font=("Segoe UI", 11, "bold"))
+    style.configure("TCombobox", padding=8, font=("Segoe UI", 11))
+    style.configure("Hover.TButton", background="#1565C0", foreground="#1565C0")
+    style.configure("TCheckbutton", background="#FFFFFF", font=("Segoe UI", 11))
+
+class ScreenManager:
+    """
+    Quản lý các màn hình của cửa sổ chính. Mỗi màn hình là một khung được dựng một lần rồi giữ lại:
+    show() ẩn khung đang hiện, hiện khung được chọn và gọi on_show để làm mới dữ liệu.
+    Các đối tượng màn hình (LearnerScreen, PayrollScreen, ...) cũng được giữ lại qua screen().
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.style = ttk.Style(root)
+        configure_styles(self.style)
+        self.frames = {}
+        self.objects = {}
+        self.current = None
+
+    def add(self, name, frame, title, size, on_show=None):
+        """Đăng ký khung đã dựng cho màn hình name (tiêu đề và kích thước cửa sổ dùng khi hiện)."""
+        self.frames[name] = (frame, title, size, on_show)
+
+    def has(self, name):
+        """Kiểm tra màn hình name đã được dựng và còn tồn tại."""
+        entry = self.frames.get(name)
+        return entry is not None and entry[0].winfo_exists()
+
+    def show(self, name):
+        """Chuyển sang màn hình name: chỉ ẩn/hiện khung, không dựng lại widget."""
+        frame, title, size, on_show = self.frames[name]
+        if self.current != name:
+            current = self.frames.get(self.current)
+            if current is not None and current[0].winfo_exists():
+                current[0].pack_forget()
+            frame.pack(expand=True, fill="both", padx=15, pady=15)
+            self.current = name
+            self.root.title(title)
+            self.root.geometry(size)
+            self.center()
+        if on_show:
+            on_show()
+
+    def screen(self, name, factory):
+        """Lấy đối tượng màn hình đã tạo, hoặc tạo bằng factory() ở lần đầu."""
+        screen = self.objects.get(name)
+        if screen is None:
+            screen = self.objects[name] = factory()
+        return screen
+
+    def reset(self, keep=()):
+        """Hủy các màn hình không nằm trong keep (ví dụ khi đăng xuất, vì chúng gắn với người dùng cũ)."""
+        for name in [n for n in self.frames if n not in keep]:
+            frame = self.frames.pop(name)[0]
+            if frame.winfo_exists():
+                frame.destroy()
+            if self.current == name:
+                self.current = None
+        for name in [n for n in self.objects if n not in keep]:
+            del self.objects[name]
+
+    def center(self):
+        """Căn giữa cửa sổ trên màn hình."""
+        self.root.update_idletasks()
+        width = self.root.winfo_width()
+        height = self.root.winfo_height()
+        x = (self.root.winfo_screenwidth() // 2) - (width // 2)
+        y = (self.root.winfo_screenheight() // 2) - (height // 2)
+        self.root.geometry(f"{width}x{height}+{x}+{y}")
+
+class Popup:
+    """
+    Cửa sổ phụ dựng một lần và dùng lại: build(top) dựng nội dung ở lần mở đầu tiên,
+    on_open() đặt lại dữ liệu mỗi lần mở; đóng cửa sổ chỉ ẩn nó đi.
+    Cửa sổ là con của master nên bị hủy cùng màn hình sở hữu nó.
+    """
+
+    def __init__(self, master, title, size, build, on_open=None):
+        self.master = master
+        self.title = title
+        self.size = size
+        self.build = build
+        self.on_open = on_open
+        self.window = None
+
+    def open(self):
+        """Hiện cửa sổ ở giữa cửa sổ chính (dựng ở lần đầu)."""
+        root = self.master.winfo_toplevel()
+        if self.window is None or not self.window.winfo_exists():
+            top = tk.Toplevel(self.master)
+            top.title(self.title)
+            top.geometry(self.size)
+            top.configure(bg=BG_COLOR)
+            top.protocol("WM_DELETE_WINDOW", self.close)
+            self.window = top
+            self.build(top)
+            if not top.winfo_exists():
+                # build có thể tự hủy cửa sổ khi dựng thất bại
+                self.window = None
+                return
+        else:
+            self.window.deiconify()
+
+        top = self.window
+        top.update_idletasks()
+        width = top.winfo_width()
+        height = top.winfo_height()
+        x = (root.winfo_width() - width) // 2 + root.winfo_x()
+        y = (root.winfo_height() - height) // 2 + root.winfo_y()
+        top.geometry(f"{width}x{height}+{x}+{y}")
+        top.lift()
+        if self.on_open:
+            self.on_open()
+
+    def close(self):
+        """Ẩn cửa sổ để lần mở sau hiện ngay."""
+        if self.is_open():
+            self.window.withdraw()
+
+    def is_open(self):
+        """Cửa sổ đang tồn tại và đang hiện."""
+        return self.window is not None and self.window.winfo_exists() and self.window.state() != "withdrawn"
@@ -0,0 +1,149 @@
+import re
+import unicodedata
+
+# Tìm kiếm không phân biệt dấu cho danh sách bảng lương, người học và tài khoản.
+# Tên đã bỏ dấu được lưu trong các bảng learner_search và user_search (FTS5 với bộ tách trigram
+# nếu SQLite hỗ trợ, nếu không là bảng thường), được trigger cập nhật bằng biểu thức SQL fold_sql dựa trên
+# bảng vn_fold_map (không cần hàm Python nên công cụ khác như sqlite3 hay DB Browser vẫn ghi được cơ sở dữ liệu).
+
+# Các khoảng ký tự có dấu được đưa vào bảng vn_fold_map: Latin-1, Latin mở rộng A/B, dấu tổ hợp, Latin mở rộng thêm
+FOLD_RANGES = ((0x00C0, 0x024F), (0x0300, 0x036F), (0x1E00, 0x1EFF))
+
+def vn_fold(text):
+    """Chuẩn hóa chuỗi để so khớp: chữ thường, bỏ dấu tiếng Việt ('Đặng Thị Ánh' -> 'dang thi anh')."""
+    if text is None:
+        return None
+    text = unicodedata.normalize("NFD", str(text).lower()).replace("đ", "d")
+    return "".join(ch for ch in text if unicodedata.category(ch) != "Mn")
+
+def fold_map():
+    """Các cặp (ký tự, dạng bỏ dấu) của FOLD_RANGES mà vn_fold làm thay đổi (nội dung bảng vn_fold_map)."""
+    pairs = []
+    for first, last in FOLD_RANGES:
+        for code in range(first, last + 1):
+            char = chr(code)
+            if vn_fold(char) != char:
+                pairs.append((char, vn_fold(char)))
+    return pairs
+
+def fold_sql(expression):
+    """
+    Biểu thức SQL thuần tương đương vn_fold(expression): thay từng ký tự theo bảng vn_fold_map
+    (CTE đệ quy) rồi lower(). Ký tự có dấu ngoài FOLD_RANGES được giữ nguyên.
+    """
+    return f'''(
+        WITH RECURSIVE chars (i, folded) AS (
+            SELECT 1, ''
+            UNION ALL
+            SELECT i + 1, folded || COALESCE((SELECT base FROM vn_fold_map WHERE ch = substr({expression}, i, 1)),
+                                             substr({expression}, i, 1))
+            FROM chars WHERE i <= length({expression})
+        )
+        SELECT lower(folded) FROM chars ORDER BY i DESC LIMIT 1
+    )'''
+
+def register_functions(conn):
+    """Đăng ký hàm vn_fold cho kết nối (dùng trong truy vấn tìm kiếm)."""
+    conn.create_function("vn_fold", 1, vn_fold, deterministic=True)
+
+def like_patterns(query):
+    """
+    Tách từ khóa thành các mẫu LIKE '%từ%' đã bỏ dấu. Ký tự đại diện % và _ bị loại bỏ;
+    từ có từ 3 ký tự trở lên được chỉ mục trigram của FTS5 tăng tốc.
+    """
+    terms = vn_fold(query).replace("%", " ").replace("_", " ").split()
+    return [f"%{term}%" for term in terms]
+
+def parse_payroll_query(query):
+    """
+    Phân tích từ khóa tìm bảng lương thành (mẫu tên, tháng, năm):
+    '3/2025' -> tháng 3 năm 2025, '2025' -> năm, '3' hoặc '3/' -> tháng, các từ còn lại so khớp tên người học.
+    """
+    month = year = None
+    words = []
+    for term in query.split():
+        match = re.fullmatch(r"(\d{1,2})/(\d{4})?", term)
+        if match:
+            month = int(match.group(1))
+            year = int(match.group(2)) if match.group(2) else year
+        elif re.fullmatch(r"\d{4}", term):
+            year = int(term)
+        elif re.fullmatch(r"\d{1,2}", term):
+            month = int(term)
+        else:
+            words.append(term)
+    return like_patterns(" ".join(words)), month, year
+
+def sync_tree(tree, parent, rows):
+    """
+    Cập nhật Treeview theo danh sách mới [(iid, values), ...] chỉ bằng các thay đổi cần thiết:
+    xóa dòng không còn, thêm dòng mới, sửa giá trị dòng đã đổi và sắp lại thứ tự.
+    Trả về số dòng đã thay đổi.
+    """
+    wanted = dict(rows)
+    changed = 0
+    stale = [iid for iid in tree.get_children(parent) if iid not in wanted]
+    if stale:
+        tree.delete(*stale)
+        changed += len(stale)
+    for index, (iid, values) in enumerate(rows):
+        values = tuple(str(v) for v in values)
+        if not tree.exists(iid):
+            tree.insert(parent, index, iid=iid, values=values)
+            changed += 1
+            continue
+        # Treeview có thể trả về giá trị đã chuyển thành số, nên so sánh dạng chuỗi
+        if tuple(str(v) for v in tree.item(iid, "values")) != values:
+            tree.item(iid, values=values)
+            changed += 1
+        if tree.index(iid) != index:
+            tree.move(iid, parent, index)
+    return changed
+
+class SearchBox:
+    """
+    Gắn ô tìm kiếm với một truy vấn chạy trên luồng cơ sở dữ liệu: chờ người dùng ngừng gõ
+    (debounce) rồi mới tìm, bỏ qua kết quả của các lần tìm đã cũ.
+    search(db, từ khóa) chạy trên luồng cơ sở dữ liệu; on_results(từ khóa, kết quả) chạy trên luồng Tk.
+    """
+
+    def __init__(self, entry, executor, search, on_results, delay_ms=250):
+        self.entry = entry
+        self.executor = executor
+        self.search = search
+        self.on_results = on_results
+        self.delay_ms = delay_ms
+        self.generation = 0
+        self._after_id = None
+        self._last_query = None
+        self._future = None
+        entry.bind("<KeyRelease>", lambda e: self.schedule())
+
+    def schedule(self):
+        """Đặt lại hẹn giờ tìm kiếm sau mỗi lần gõ phím."""
+        if self._after_id is not None:
+            self.entry.after_cancel(self._after_id)
+        self._after_id = self.entry.after(self.delay_ms, self.run)
+
+    def run(self, force=False):
+        """Chạy tìm kiếm với nội dung hiện tại của ô (bỏ qua nếu từ khóa không đổi)."""
+        self._after_id = None
+        if not self.entry.winfo_exists():
+            return
+        query = self.entry.get().strip()
+        if query == self._last_query and not force:
+            return
+        self._last_query = query
+        self.generation += 1
+        generation = self.generation
+        # Hủy lần tìm trước nếu nó còn chờ trong hàng đợi của luồng cơ sở dữ liệu
+        if self._future is not None:
+            self._future.cancel()
+        self._future = self.executor.submit_db(self.search, query,
+                                               on_done=lambda results: self._deliver(generation, query, results))
+
+    def _deliver(self, generation, query, results):
+        """Chỉ hiển thị kết quả của lần tìm mới nhất."""
+        if generation != self.generation or not self.entry.winfo_exists():
+            return
+        self.on_results(query, results)
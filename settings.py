@@ -0,0 +1,50 @@
+import json
+import logging
+import os
+from pathlib import Path
+
+# Thư mục dữ liệu của ứng dụng (cơ sở dữ liệu, logs, cấu hình)
+APP_DATA_DIR = os.path.join(Path.home(), "AppData", "Local", "TutorPay")
+SETTINGS_FILE = os.path.join(APP_DATA_DIR, "settings.json")
+
+DEFAULT_SETTINGS = {
+    # Kiểu lưu trữ bảng lương: "rows" (mỗi ngày một dòng) hoặc "compact" (mỗi bảng lương một dòng)
+    "storage": "rows",
+    # Cấu hình hiệu năng SQLite: "safe" hoặc "fast" (xem database.PERFORMANCE_PROFILES)
+    "performance_profile": "safe",
+    # Ghi đè từng pragma, ví dụ {"cache_size": -16000}
+    "sqlite_pragmas": {},
+    # Vị trí cơ sở dữ liệu; để trống là APP_DATA_DIR/tutorpay.db. Chấp nhận ":memory:" hoặc ":temp:"
+    # (biến môi trường TUTORPAY_DB được ưu tiên hơn)
+    "database_path": "",
+    # Đo thời gian từng phương thức Database và câu lệnh SQL (xem diagnostics.py);
+    # câu lệnh chậm hơn slow_query_ms được ghi vào logs/slow_queries.log kèm EXPLAIN QUERY PLAN
+    "diagnostics": False,
+    "slow_query_ms": 50,
+    # Nạp trước reportlab và font trong nền sau khi mở cửa sổ đăng nhập
+    "pdf_warm_up": True,
+    # Sao lưu tự động khi mở ứng dụng nếu bản sao lưu mới nhất cũ hơn backup_interval_hours giờ (0 để tắt);
+    # giữ backup_keep_last bản mới nhất và bản mới nhất của mỗi tháng trong backup_keep_monthly tháng (xem backup.py).
+    # backup_dir để trống là APP_DATA_DIR/backups
+    "backup_interval_hours": 24,
+    "backup_keep_last": 7,
+    "backup_keep_monthly": 12,
+    "backup_dir": "",
+}
+
+_settings = None
+
+def load_settings():
+    """Đọc cấu hình từ settings.json (chỉ đọc một lần cho mỗi tiến trình), bổ sung giá trị mặc định."""
+    global _settings
+    if _settings is None:
+        settings = dict(DEFAULT_SETTINGS)
+        try:
+            with open(SETTINGS_FILE, encoding="utf-8") as f:
+                settings.update(json.load(f))
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logging.warning(f"Không đọc được {SETTINGS_FILE}: {e}. Sử dụng cấu hình mặc định.")
+        _settings = settings
+    return _settings
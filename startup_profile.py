@@ -0,0 +1,80 @@
+import builtins
+import json
+import logging
+import os
+import sys
+import time
+from settings import APP_DATA_DIR
+
+# Chế độ đo thời gian khởi động (python main.py --profile-startup hoặc main.exe --profile-startup):
+# ghi lại thời gian nạp từng module và thời gian đến khi cửa sổ đăng nhập được vẽ lần đầu.
+# Chạy được cả trong bản đóng gói PyInstaller, nơi không dùng được "python -X importtime".
+PROFILE_FILE = os.path.join(APP_DATA_DIR, "logs", "startup_profile.json")
+
+class StartupProfiler:
+    """Đo thời gian của các câu lệnh import (tích lũy và riêng từng module) từ lúc start() được gọi."""
+
+    def __init__(self, path=PROFILE_FILE):
+        self.path = path
+        self.started = None
+        self.imports = []
+        self._stack = []
+        self._original_import = None
+
+    def start(self):
+        """Bắt đầu đo: thay builtins.__import__ bằng phiên bản có đo thời gian."""
+        self.started = time.perf_counter()
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._timed_import
+
+    def stop(self):
+        """Dừng đo các câu lệnh import."""
+        if self._original_import is not None:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        """Chỉ đo các module được nạp lần đầu; module đã có trong sys.modules đi thẳng."""
+        if level or name in sys.modules:
+            return self._original_import(name, globals, locals, fromlist, level)
+        self._stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            return self._original_import(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter() - start
+            children = self._stack.pop()
+            if self._stack:
+                self._stack[-1] += elapsed
+            self.imports.append((name, elapsed, elapsed - children, len(self._stack)))
+
+    def first_frame(self, root):
+        """Gọi khi cửa sổ đầu tiên đã được dựng: chờ Tk vẽ xong rồi ghi báo cáo."""
+        root.update_idletasks()
+        root.update()
+        self.stop()
+        self.write_report(time.perf_counter() - self.started)
+
+    def write_report(self, first_frame):
+        """Ghi báo cáo ra file JSON: thời gian đến khung hình đầu tiên và bảng thời gian import."""
+        top_level = [entry for entry in self.imports if entry[3] == 0]
+        report = {
+            "time_to_first_frame_ms": round(first_frame * 1000, 1),
+            "import_total_ms": round(sum(entry[1] for entry in top_level) * 1000, 1),
+            "frozen": bool(getattr(sys, "frozen", False)),
+            "imports": [
+                {"module": name, "cumulative_ms": round(cumulative * 1000, 2),
+                 "self_ms": round(own * 1000, 2), "depth": depth}
+                for name, cumulative, own, depth in sorted(self.imports, key=lambda entry: -entry[1])
+            ],
+        }
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+        except OSError as e:
+            logging.error(f"Không thể ghi báo cáo khởi động {self.path}: {e}")
+            return None
+        logging.info(f"Khởi động: {report['time_to_first_frame_ms']} ms đến khung hình đầu tiên, "
+                     f"import {report['import_total_ms']} ms. Báo cáo: {self.path}")
+        return report
@@ -0,0 +1,46 @@
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+
+# settings.APP_DATA_DIR được tính từ thư mục home khi import: trỏ home sang thư mục tạm trước khi import
+# để bài kiểm tra không đọc/ghi cài đặt, nhật ký và bản sao lưu của người dùng thật
+_home = tempfile.mkdtemp(prefix="tutorpay-tests-")
+atexit.register(shutil.rmtree, _home, True)
+os.environ["HOME"] = os.environ["USERPROFILE"] = _home
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from database import ConnectionManager, Database, MEMORY_DB
+from payroll_compact import CompactDatabase
+
+USERNAME = "giaovien"
+
+@pytest.fixture
+def make_db():
+    """Tạo Database ('rows') hoặc CompactDatabase ('compact') trên một cơ sở dữ liệu mới; đóng kết nối sau bài kiểm tra."""
+    managers = []
+
+    def make(storage="rows", path=MEMORY_DB):
+        manager = ConnectionManager(path)
+        managers.append(manager)
+        return CompactDatabase(manager) if storage == "compact" else Database(manager)
+
+    yield make
+    for manager in managers:
+        manager.close_all()
+
+@pytest.fixture(params=["rows", "compact"])
+def db(request, make_db):
+    """Cơ sở dữ liệu trong bộ nhớ với một người dùng, chạy với cả hai kiểu lưu trữ."""
+    db = make_db(request.param)
+    db.add_user(USERNAME, "Giáo Viên", "matkhau")
+    return db
+
+def add_learners(db, *names):
+    """Thêm người học cho USERNAME, trả về danh sách id theo thứ tự tên."""
+    for name in names:
+        db.add_learner(USERNAME, name)
+    ids = dict((name, learner_id) for learner_id, name in db.get_learners(USERNAME))
+    return [ids[name] for name in names]
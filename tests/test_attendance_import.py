@@ -0,0 +1,67 @@
+import io
+from conftest import USERNAME, add_learners
+from attendance_import import import_attendance
+from database import TEMP_DB
+
+def attendance_csv(an, binh):
+    """File điểm danh 3 bảng lương, có dòng lỗi; với chunk_rows=3 lương mặc định của Bình chỉ có từ lô thứ hai."""
+    return io.StringIO("\n".join([
+        "learner,date,attended,salary",
+        f"{an},2024-05-01,1,150000",
+        "Nguyen An,02/05/2024,x,",
+        "Trần Bình,2024-05-03,1,",
+        "Trần Bình,2024-05-04,có,120.000",
+        "Trần Bình,2024-05-05,1,",
+        "Không Có,2024-05-06,1,100000",
+        f"{an},2024-06-31,1,100000",
+        f"{an},2024-06-01,maybe,100000",
+        f"{an},2024-06-02,0,",
+    ]) + "\n")
+
+def counts(report):
+    return (report.rows, report.invalid, dict(report.unknown_learners), report.sheets_created)
+
+def test_dry_run_matches_import(db):
+    an, binh = add_learners(db, "Nguyễn An", "Trần Bình")
+    dry = import_attendance(db, USERNAME, attendance_csv(an, binh), dry_run=True, chunk_rows=3)
+    assert counts(dry) == (9, 3, {"Không Có": 1}, 3)
+    assert (dry.checked, dry.unchecked, dry.salary_changed, dry.unchanged, dry.changed) == (4, 0, 4, 1, 4)
+    assert dry.imported == 0 and not dry.ok
+    assert db.get_payrolls(USERNAME) == []
+
+    report = import_attendance(db, USERNAME, attendance_csv(an, binh), chunk_rows=3)
+    assert counts(report) == counts(dry)
+    assert report.imported == 5 and not report.failed
+    assert db.get_payroll_summary(USERNAME, 5, 2024, an) == (2, 300000)
+    assert db.get_payroll_summary(USERNAME, 5, 2024, binh) == (2, 240000)
+    assert db.get_payroll_summary(USERNAME, 6, 2024, an) == (0, 0)
+
+    # Chạy thử lại sau khi nhập: các dòng đã ghi không đổi; dòng 4 giờ hợp lệ vì bảng lương của Bình đã có lương
+    again = import_attendance(db, USERNAME, attendance_csv(an, binh), dry_run=True, chunk_rows=3)
+    assert (again.sheets_created, again.invalid, again.unchanged, again.changed) == (0, 2, 5, 1)
+    assert again.changes == ["Dòng 4: Trần Bình 3/5/2024: điểm danh, lương 0 VNĐ → 120.000 VNĐ"]
+
+def test_blank_salary_uses_sheet_default(db):
+    an, binh = add_learners(db, "Nguyễn An", "Trần Bình")
+    db.create_payroll(USERNAME, 5, 2024, an)
+    db.apply_salary(USERNAME, 5, 2024, an, 170000)
+    report = import_attendance(db, USERNAME, io.StringIO(
+        "learner,date,attended\n"
+        f"{an},2024-05-07,1\n"
+        f"{binh},2024-05-07,1\n"))
+    assert report.imported == 1 and report.invalid == 1
+    assert db.get_payroll_summary(USERNAME, 5, 2024, an) == (1, 170000)
+    assert db.get_payroll_data(USERNAME, 5, 2024, binh) == []
+
+def test_interrupted_import_is_repaired_on_open(make_db):
+    db = make_db("rows", TEMP_DB)
+    db.add_user(USERNAME, "Giáo Viên", "matkhau")
+    an, = add_learners(db, "Nguyễn An")
+    # Lô đã ghi nhưng tiến trình dừng trước refresh_summaries
+    db.import_days(USERNAME, [(5, 2024, an, "1/5", 1, 150000), (5, 2024, an, "2/5", 1, 150000)])
+    assert db.get_payroll_summary(USERNAME, 5, 2024, an) == (0, 0)
+    db.manager.close_all()
+
+    reopened = make_db("rows", db.manager.path)
+    assert reopened.get_payroll_summary(USERNAME, 5, 2024, an) == (2, 300000)
+    assert reopened.conn.execute("SELECT COUNT(*) FROM payroll_sum_dirty").fetchone()[0] == 0
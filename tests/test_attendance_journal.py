@@ -0,0 +1,102 @@
+from conftest import USERNAME, add_learners
+from attendance_journal import AttendanceJournal, MAX_RETRY_MS
+
+class FakeRoot:
+    """Thay vòng lặp Tk: ghi lại các hẹn giờ after, không tự chạy."""
+
+    def __init__(self):
+        self.delays = []
+
+    def after(self, delay_ms, callback):
+        self.delays.append(delay_ms)
+        return len(self.delays)
+
+    def after_cancel(self, after_id):
+        pass
+
+class InlineExecutor:
+    """Thay BackgroundExecutor: chạy công việc của luồng cơ sở dữ liệu ngay trên luồng gọi."""
+
+    def __init__(self, db):
+        self.db = db
+
+    def submit_db(self, fn, *args, on_done=None, on_error=None):
+        try:
+            result = fn(self.db, *args)
+        except Exception as e:
+            on_error(e)
+        else:
+            on_done(result)
+
+class LockedDatabase:
+    """Cơ sở dữ liệu luôn ghi thất bại (ví dụ "database is locked")."""
+
+    def apply_day_changes(self, changes):
+        return False
+
+def sheet(db, learner_id):
+    return {day: (checked, salary) for day, checked, salary in db.get_payroll_data(USERNAME, 6, 2024, learner_id)
+            if checked or salary}
+
+def test_replay_after_crash(db, tmp_path):
+    learner_id, = add_learners(db, "Lê Châu")
+    db.create_payroll(USERNAME, 6, 2024, learner_id)
+    path = tmp_path / "pending_ops.jsonl"
+    journal = AttendanceJournal(db, path=str(path))
+    journal.record(USERNAME, 6, 2024, learner_id, "3/6", True, 140000)
+    journal.record(USERNAME, 6, 2024, learner_id, "4/6", True, 140000)
+    journal.record(USERNAME, 6, 2024, learner_id, "3/6", False, 0)
+    # Ứng dụng bị tắt trước khi ghi, dòng cuối của nhật ký ghi dở
+    journal._log.close()
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"username": "giaovien", "month": 6, "ye')
+    assert sheet(db, learner_id) == {}
+
+    restarted = AttendanceJournal(db, path=str(path))
+    assert restarted.replay() == 3
+    assert sheet(db, learner_id) == {"4/6": (1, 140000)}
+    assert db.get_payroll_summary(USERNAME, 6, 2024, learner_id) == (1, 140000)
+    assert path.read_text(encoding="utf-8") == ""
+    assert AttendanceJournal(db, path=str(path)).replay() == 0
+
+def test_failed_flush_keeps_log_and_backs_off(db, tmp_path):
+    learner_id, = add_learners(db, "Lê Châu")
+    db.create_payroll(USERNAME, 6, 2024, learner_id)
+    path = tmp_path / "pending_ops.jsonl"
+    root = FakeRoot()
+    journal = AttendanceJournal(LockedDatabase(), root, delay_ms=800, path=str(path))
+    journal.record(USERNAME, 6, 2024, learner_id, "5/6", True, 140000)
+    assert not journal.flush()
+    assert not journal.flush()
+    assert root.delays == [800, 1600, 3200]
+    assert len(path.read_text(encoding="utf-8").splitlines()) == 1
+
+    journal._retries = 10
+    journal.flush()
+    assert root.delays[-1] == MAX_RETRY_MS
+
+    journal.db = db
+    assert journal.flush()
+    assert sheet(db, learner_id) == {"5/6": (1, 140000)}
+    assert path.read_text(encoding="utf-8") == ""
+    assert (journal.stats["flushes"], journal.stats["ops"], journal._retries) == (1, 1, 0)
+
+def test_failed_background_batch_is_retried(db, tmp_path):
+    learner_id, = add_learners(db, "Lê Châu")
+    db.create_payroll(USERNAME, 6, 2024, learner_id)
+    path = tmp_path / "pending_ops.jsonl"
+    root = FakeRoot()
+    executor = InlineExecutor(LockedDatabase())
+    journal = AttendanceJournal(db, root, delay_ms=800, path=str(path), executor=executor)
+    journal.record(USERNAME, 6, 2024, learner_id, "5/6", True, 140000)
+    journal.record(USERNAME, 6, 2024, learner_id, "6/6", True, 140000)
+    journal.flush()
+    # Lô thất bại quay lại hàng chờ, hẹn ghi lại với thời gian chờ gấp đôi
+    assert journal.pending == {(USERNAME, 6, 2024, learner_id): {"5/6": (1, 140000), "6/6": (1, 140000)}}
+    assert journal.pending_ops == 2 and root.delays[-1] == 1600
+
+    executor.db = db
+    journal.flush()
+    assert not journal.pending and not journal._inflight
+    assert sheet(db, learner_id) == {"5/6": (1, 140000), "6/6": (1, 140000)}
+    assert path.read_text(encoding="utf-8") == ""
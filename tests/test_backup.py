@@ -0,0 +1,80 @@
+import gzip
+import os
+import sqlite3
+from datetime import datetime
+import pytest
+from conftest import USERNAME, add_learners
+from backup import create_backup, list_backups, restore_backup, snapshot_path
+from database import TEMP_DB
+from settings import load_settings
+
+@pytest.fixture
+def file_db(make_db):
+    """Cơ sở dữ liệu trong file tạm (WAL) với một người học."""
+    db = make_db("rows", TEMP_DB)
+    db.add_user(USERNAME, "Giáo Viên", "matkhau")
+    add_learners(db, "Nguyễn An")
+    return db
+
+def learner_names(db):
+    return [name for _, name in db.get_learners(USERNAME)]
+
+def corrupt_snapshots(directory, good):
+    """Các kiểu bản sao lưu hỏng: không phải gzip, gzip của dữ liệu rác, gzip bị cắt, cơ sở dữ liệu khác."""
+    with open(good, "rb") as f:
+        packed = f.read()
+    other = os.path.join(directory, "khac.db")
+    conn = sqlite3.connect(other)
+    conn.execute("CREATE TABLE notes (text TEXT)")
+    conn.commit()
+    conn.close()
+    with open(other, "rb") as f:
+        other_db = f.read()
+    os.remove(other)
+    return {
+        "not-gzip": b"SQLite format 3\0 nhung khong nen",
+        "garbage": gzip.compress(os.urandom(4096)),
+        "truncated": packed[:len(packed) // 2],
+        "foreign": gzip.compress(other_db),
+    }
+
+def test_restore_round_trip(file_db, tmp_path):
+    snapshot = create_backup(file_db.conn, tmp_path)
+    file_db.add_learner(USERNAME, "Trần Bình")
+    previous = restore_backup(snapshot, file_db.conn, tmp_path)
+    assert learner_names(file_db) == ["Nguyễn An"]
+    assert "truoc-khoi-phuc" in os.path.basename(previous)
+    restore_backup(previous, file_db.conn, tmp_path)
+    assert learner_names(file_db) == ["Nguyễn An", "Trần Bình"]
+
+@pytest.mark.parametrize("kind", ["not-gzip", "garbage", "truncated", "foreign"])
+def test_restore_rejects_corrupt_snapshot(file_db, tmp_path, kind):
+    good = create_backup(file_db.conn, tmp_path / "tot")
+    snapshot = tmp_path / f"tutorpay-20240101-000000-000-{kind}.db.gz"
+    snapshot.write_bytes(corrupt_snapshots(tmp_path, good)[kind])
+    file_db.add_learner(USERNAME, "Trần Bình")
+    with pytest.raises(ValueError):
+        restore_backup(str(snapshot), file_db.conn, tmp_path)
+    assert learner_names(file_db) == ["Nguyễn An", "Trần Bình"]
+    # Không sao lưu "trước khôi phục" và không để lại file tạm
+    assert sorted(os.listdir(tmp_path)) == sorted(["tot", snapshot.name])
+
+def test_snapshot_names_are_unique_within_a_second(file_db, tmp_path):
+    now = datetime(2024, 5, 1, 8, 30, 15, 250000)
+    first = snapshot_path(tmp_path, now=now)
+    open(first, "wb").close()
+    second = snapshot_path(tmp_path, now=now)
+    assert os.path.basename(first) == "tutorpay-20240501-083015-250.db.gz"
+    assert os.path.basename(second) == "tutorpay-20240501-083015-251.db.gz"
+
+    paths = [create_backup(file_db.conn, tmp_path / "nhanh", keep_last=10) for _ in range(3)]
+    assert len(set(paths)) == 3
+    assert [path for path, _, _ in list_backups(tmp_path / "nhanh")] == paths[::-1]
+
+def test_restore_keeps_chosen_snapshot(file_db, tmp_path, monkeypatch):
+    monkeypatch.setitem(load_settings(), "backup_keep_last", 1)
+    monkeypatch.setitem(load_settings(), "backup_keep_monthly", 0)
+    chosen = create_backup(file_db.conn, tmp_path)
+    file_db.add_learner(USERNAME, "Trần Bình")
+    previous = restore_backup(chosen, file_db.conn, tmp_path)
+    assert {path for path, _, _ in list_backups(tmp_path)} == {chosen, previous}
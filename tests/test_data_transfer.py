@@ -0,0 +1,85 @@
+import gzip
+import pytest
+from conftest import USERNAME, add_learners
+from data_transfer import CONFLICT_REPLACE, CONFLICT_SKIP, convert_storage, export_data, import_data
+
+OTHER = "trogiang"
+
+def sheets(db, username):
+    """Người học, chi tiết và tóm tắt bảng lương 4/2024 của username, theo tên người học."""
+    result = []
+    for learner_id, name in sorted(db.get_learners(username), key=lambda learner: learner[1]):
+        data = sorted(db.get_payroll_data(username, 4, 2024, learner_id), key=lambda row: int(row[0].split("/")[0]))
+        result.append((name, data, db.get_payroll_summary(username, 4, 2024, learner_id)))
+    return result
+
+@pytest.fixture
+def export_file(db, tmp_path):
+    """File xuất của hai người dùng, mỗi người có bảng lương tháng 4/2024."""
+    db.add_user(OTHER, "Trợ Giảng", "matkhau")
+    first, second = add_learners(db, "Huỳnh Nam", "Phan Phúc")
+    db.add_learner(OTHER, "Vũ Quân")
+    db.open_month(USERNAME, 4, 2024)
+    db.create_payroll(OTHER, 4, 2024, db.get_learners(OTHER)[0][0])
+    db.apply_salary(USERNAME, 4, 2024, first, 160000)
+    db.apply_day_changes({(USERNAME, 4, 2024, first): {"2/4": (1, 160000), "9/4": (1, 160000), "16/4": (0, 0)},
+                          (USERNAME, 4, 2024, second): {"3/4": (1, 110000)}})
+    path = tmp_path / "xuat.jsonl.gz"
+    export_data(db.conn, path)
+    return path
+
+@pytest.fixture
+def target(make_db):
+    """Cơ sở dữ liệu đích: USERNAME đã có một người học và một bảng lương."""
+    target = make_db()
+    target.add_user(USERNAME, "Giáo Viên", "cu")
+    learner_id, = add_learners(target, "Đỗ Thùy")
+    target.create_payroll(USERNAME, 4, 2024, learner_id)
+    target.update_day(USERNAME, 4, 2024, learner_id, "1/4", 1, 90000)
+    return target
+
+@pytest.mark.parametrize("storage", ["rows", "compact"])
+def test_round_trip_into_empty_database(db, export_file, make_db, storage):
+    fresh = make_db(storage)
+    result = import_data(fresh.conn, export_file)
+    convert_storage(fresh)
+    assert result["skipped"] == [] and result["replaced"] == []
+    assert result["counts"]["learners"] == 3
+    for username in (USERNAME, OTHER):
+        assert sheets(fresh, username) == sheets(db, username)
+
+def test_conflict_error_writes_nothing(db, export_file, target):
+    before, users = sheets(target, USERNAME), target.get_all_users()
+    with pytest.raises(ValueError):
+        import_data(target.conn, export_file)
+    assert sheets(target, USERNAME) == before
+    assert target.get_all_users() == users
+    assert target.conn.execute("SELECT fullname, password FROM users WHERE username = ?", (USERNAME,)).fetchone() == ("Giáo Viên", "cu")
+
+def test_conflict_skip_keeps_existing_user(db, export_file, target):
+    before = sheets(target, USERNAME)
+    result = import_data(target.conn, export_file, on_conflict=CONFLICT_SKIP)
+    convert_storage(target)
+    assert result["skipped"] == [USERNAME] and result["replaced"] == []
+    assert sheets(target, USERNAME) == before
+    assert sheets(target, OTHER) == sheets(db, OTHER)
+
+def test_conflict_replace_swaps_user_data(db, export_file, target):
+    result = import_data(target.conn, export_file, on_conflict=CONFLICT_REPLACE)
+    convert_storage(target)
+    assert result["replaced"] == [USERNAME] and result["skipped"] == []
+    assert sheets(target, USERNAME) == sheets(db, USERNAME)
+    assert sheets(target, OTHER) == sheets(db, OTHER)
+
+def test_truncated_file_writes_nothing(db, export_file, make_db, tmp_path):
+    with gzip.open(export_file, "rt", encoding="utf-8") as f:
+        lines = f.readlines()
+    truncated = tmp_path / "cat.jsonl.gz"
+    with gzip.open(truncated, "wt", encoding="utf-8") as f:
+        f.writelines(lines[:-1])
+    fresh = make_db()
+    users = fresh.get_all_users()
+    with pytest.raises(ValueError):
+        import_data(fresh.conn, truncated)
+    assert fresh.get_all_users() == users
+    assert fresh.get_learners(USERNAME) == []
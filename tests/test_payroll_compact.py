@@ -0,0 +1,80 @@
+import pytest
+from conftest import USERNAME, add_learners
+from payroll_compact import ZERO_DAYS, day_number, decode_sheet, encode_sheet, migrate_to_compact, migrate_to_rows, CompactDatabase
+
+def fill_sheets(db):
+    """Bảng lương giống thao tác trên giao diện: lương mặc định, bỏ điểm danh ghi lương 0, một khoảng lương khác."""
+    gui, ranged, empty = add_learners(db, "Nguyễn An", "Trần Bình", "Lê Châu")
+    for learner_id in (gui, ranged, empty):
+        db.create_payroll(USERNAME, 2, 2024, learner_id)
+    db.apply_salary(USERNAME, 2, 2024, gui, 150000)
+    db.apply_day_changes({(USERNAME, 2, 2024, gui): {"1/2": (1, 150000), "2/2": (0, 0), "3/2": (1, 150000), "9/2": (0, 0)}})
+    db.apply_salary(USERNAME, 2, 2024, ranged, 200000)
+    db.apply_salary(USERNAME, 2, 2024, ranged, 250000, first_day=10, last_day=20)
+    db.update_day(USERNAME, 2, 2024, ranged, "15/2", 1, 250000)
+    return gui, ranged, empty
+
+def sheet_days(db, learner_id):
+    """Các ngày của bảng lương 2/2024 theo thứ tự ngày (get_payroll_data của kiểu 'rows' không sắp xếp)."""
+    return sorted(db.get_payroll_data(USERNAME, 2, 2024, learner_id), key=lambda row: day_number(row[0]))
+
+def snapshot(conn):
+    """Toàn bộ dữ liệu bảng lương theo ngày và tóm tắt của kiểu lưu trữ 'rows'."""
+    payroll = conn.execute("SELECT username, month, year, learner_id, day, checked, salary FROM payroll ORDER BY learner_id, id").fetchall()
+    summary = conn.execute("SELECT username, month, year, learner_id, sessions, fee FROM payroll_sum ORDER BY learner_id").fetchall()
+    return payroll, summary
+
+@pytest.mark.parametrize("checked_days, day_salaries", [
+    (set(), [0] * 29),
+    ({1, 3}, [150000, 0, 150000] + [150000] * 5 + [0] + [150000] * 20),
+    ({15}, [200000] * 9 + [250000] * 11 + [200000] * 9),
+    ({1}, [0] * 29),
+    ({2}, [2 ** 40] * 29),
+])
+def test_encode_decode_round_trip(checked_days, day_salaries):
+    mask, salary, blob, sessions, fee = encode_sheet(2, 2024, checked_days, day_salaries)
+    assert decode_sheet(2, 2024, mask, salary, blob) == [
+        (f"{d}/2", int(d in checked_days), day_salaries[d - 1]) for d in range(1, 30)]
+    assert sessions == len(checked_days)
+    assert fee == sum(day_salaries[d - 1] for d in checked_days)
+
+def test_gui_sheet_uses_short_salary_form():
+    # Ngày bỏ điểm danh có lương 0 không buộc phải lưu mảng lương theo ngày
+    day_salaries = [150000] * 29
+    day_salaries[1] = day_salaries[8] = 0
+    _, salary, blob, _, _ = encode_sheet(2, 2024, {1, 3}, day_salaries)
+    assert salary == 150000
+    assert len(blob) == ZERO_DAYS.size
+    assert ZERO_DAYS.unpack(blob)[0] == 1 << 1 | 1 << 8
+    assert encode_sheet(2, 2024, {1}, [150000] * 29)[2] is None
+
+def test_migrate_round_trip(make_db):
+    db = make_db("rows")
+    db.add_user(USERNAME, "Giáo Viên", "matkhau")
+    learner_ids = fill_sheets(db)
+    before = snapshot(db.conn)
+    data = [sheet_days(db, learner_id) for learner_id in learner_ids]
+
+    assert migrate_to_compact(db.conn) == 3
+    assert snapshot(db.conn) == ([], [])
+    blobs = dict(db.conn.execute("SELECT learner_id, salaries FROM payroll_compact").fetchall())
+    assert len(blobs[learner_ids[0]]) == ZERO_DAYS.size
+    assert len(blobs[learner_ids[1]]) == 29 * 4
+    assert blobs[learner_ids[2]] is None
+    compact = CompactDatabase(db.manager)
+    assert [sheet_days(compact, learner_id) for learner_id in learner_ids] == data
+    for payroll_rows, learner_id in zip(data, learner_ids):
+        checked = [row for row in payroll_rows if row[1]]
+        assert compact.get_payroll_summary(USERNAME, 2, 2024, learner_id) == (len(checked), sum(row[2] for row in checked))
+
+    assert migrate_to_rows(db.conn) == 3
+    assert snapshot(db.conn) == before
+
+def test_compact_database_migrates_rows_on_open(make_db):
+    db = make_db("rows")
+    db.add_user(USERNAME, "Giáo Viên", "matkhau")
+    learner_ids = fill_sheets(db)
+    data = [sheet_days(db, learner_id) for learner_id in learner_ids]
+    compact = CompactDatabase(db.manager)
+    assert compact.conn.execute("SELECT COUNT(*) FROM payroll").fetchone()[0] == 0
+    assert [sheet_days(compact, learner_id) for learner_id in learner_ids] == data
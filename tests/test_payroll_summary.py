@@ -0,0 +1,79 @@
+import sqlite3
+from conftest import USERNAME, add_learners
+from database import TEMP_DB
+
+def recompute(db, learner_id, month=3, year=2024):
+    """Tổng buổi và tổng phí tính lại từ chi tiết bảng lương."""
+    checked = [salary for _, attended, salary in db.get_payroll_data(USERNAME, month, year, learner_id) if attended]
+    return len(checked), sum(checked)
+
+def summary_table(db):
+    return db.conn.execute("SELECT username, month, year, learner_id, sessions, fee FROM payroll_sum ORDER BY learner_id, year, month").fetchall()
+
+def write_sheets(db):
+    """Ghi bảng lương qua mọi đường ghi có cập nhật tóm tắt."""
+    first, second = add_learners(db, "Phạm Dũng", "Hoàng Giang")
+    db.open_month(USERNAME, 3, 2024)
+    db.apply_salary(USERNAME, 3, 2024, first, 180000)
+    db.update_day(USERNAME, 3, 2024, first, "4/3", 1, 180000)
+    db.update_day(USERNAME, 3, 2024, first, "5/3", 1, 200000)
+    db.apply_day_changes({
+        (USERNAME, 3, 2024, first): {"6/3": (1, 180000), "5/3": (0, 0)},
+        (USERNAME, 3, 2024, second): {"1/3": (1, 120000), "2/3": (1, 120000)},
+    })
+    db.apply_salary(USERNAME, 3, 2024, second, 130000, only_checked=True)
+    return first, second
+
+def test_summary_follows_every_write(db):
+    first, second = write_sheets(db)
+    assert db.get_payroll_summary(USERNAME, 3, 2024, first) == recompute(db, first) == (2, 360000)
+    assert db.get_payroll_summary(USERNAME, 3, 2024, second) == recompute(db, second) == (2, 260000)
+    assert db.get_month_totals(USERNAME, 3, 2024) == [(second, "Hoàng Giang", 2, 260000), (first, "Phạm Dũng", 2, 360000)]
+
+    db.delete_payroll(USERNAME, 3, 2024, first)
+    assert db.get_payroll_summary(USERNAME, 3, 2024, first) == (0, 0)
+    assert db.get_month_totals(USERNAME, 3, 2024) == [(second, "Hoàng Giang", 2, 260000)]
+
+def test_triggers_match_refresh_summaries(make_db):
+    db = make_db("rows")
+    db.add_user(USERNAME, "Giáo Viên", "matkhau")
+    first, second = write_sheets(db)
+    maintained = summary_table(db)
+    db.conn.execute("DELETE FROM payroll_sum")
+    db.conn.commit()
+    assert db.refresh_summaries(USERNAME, [(3, 2024, first), (3, 2024, second)])
+    assert summary_table(db) == maintained
+
+def test_import_days_pauses_triggers_until_refresh(make_db):
+    db = make_db("rows")
+    db.add_user(USERNAME, "Giáo Viên", "matkhau")
+    learner_id, = add_learners(db, "Võ Khánh")
+    rows = [(3, 2024, learner_id, f"{day}/3", 1, 150000) for day in (1, 8, 15)]
+    assert db.import_days(USERNAME, rows) == 1
+    # Trigger tạm dừng trong giao dịch của lô: tóm tắt chưa có, bảng lương được đánh dấu cần tính lại
+    assert db.conn.execute("SELECT COUNT(*) FROM payroll_sum_pause").fetchone()[0] == 0
+    assert db.get_payroll_summary(USERNAME, 3, 2024, learner_id) == (0, 0)
+    assert db.conn.execute("SELECT * FROM payroll_sum_dirty").fetchall() == [(USERNAME, 3, 2024, learner_id)]
+    assert db.refresh_summaries(USERNAME, [(3, 2024, learner_id)])
+    assert db.get_payroll_summary(USERNAME, 3, 2024, learner_id) == recompute(db, learner_id) == (3, 450000)
+    assert db.conn.execute("SELECT COUNT(*) FROM payroll_sum_dirty").fetchone()[0] == 0
+
+    # Sau lô, trigger hoạt động lại
+    db.update_day(USERNAME, 3, 2024, learner_id, "8/3", 0, 0)
+    assert db.get_payroll_summary(USERNAME, 3, 2024, learner_id) == (2, 300000)
+
+def test_other_connections_keep_summary(make_db):
+    # Trigger không dùng hàm Python nên kết nối sqlite3 thông thường vẫn ghi được và tóm tắt vẫn đúng
+    db = make_db("rows", TEMP_DB)
+    db.add_user(USERNAME, "Giáo Viên", "matkhau")
+    learner_id, = add_learners(db, "Đặng Linh")
+    db.create_payroll(USERNAME, 3, 2024, learner_id)
+    other = sqlite3.connect(db.manager.path)
+    try:
+        with other:
+            other.execute("UPDATE payroll SET checked = 1, salary = 90000 WHERE learner_id = ? AND day IN ('2/3', '3/3')", (learner_id,))
+            other.execute("INSERT INTO learners (name, username) VALUES ('Bùi Mai', ?)", (USERNAME,))
+    finally:
+        other.close()
+    assert db.get_payroll_summary(USERNAME, 3, 2024, learner_id) == (2, 180000)
+    assert [name for _, name in db.search_learners(USERNAME, "bui")] == ["Bùi Mai"]
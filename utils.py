@@ -1,4 +1,12 @@
 from calendar import monthrange, weekday
+from datetime import datetime, timedelta, timezone
+
+# Múi giờ Việt Nam (UTC+7, không có giờ mùa hè), thay cho pytz.timezone('Asia/Ho_Chi_Minh')
+VN_TZ = timezone(timedelta(hours=7), "Asia/Ho_Chi_Minh")
+
+def vn_now():
+    """Thời điểm hiện tại theo giờ Việt Nam."""
+    return datetime.now(VN_TZ)
 
 def format_currency(amount):
     """Định dạng số tiền thành chuỗi với đơn vị VNĐ (ví dụ: 120.000 VNĐ)."""
@@ -15,4 +23,14 @@ def get_weeks_in_month(year, month):
         if wday == 6 or day == days:
             weeks.append(current_week)
             current_week = [None] * 7
-    return weeks
\ No newline at end of file
+    return weeks
+
+def format_percent(value, sign=False):
+    """Định dạng phần trăm với một chữ số thập phân (ví dụ: 12,5%); sign=True luôn hiện dấu (+12,5%)."""
+    return f"{value or 0:{'+' if sign else ''}.1f}%".replace(".", ",")
+
+def format_change(current, previous):
+    """Mức thay đổi so với kỳ trước dạng phần trăm (ví dụ: +12,5%); chuỗi rỗng khi không có kỳ trước để so sánh."""
+    if not previous:
+        return ""
+    return format_percent((current - previous) * 100 / previous, sign=True)